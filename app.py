@@ -2,20 +2,143 @@
 Flask application for choir seating chart generation.
 """
 
+import asyncio
 import csv
 import io
 import json
+import os
 import base64
-from flask import Flask, render_template, request, redirect, url_for, flash
+import threading
+import time
+from datetime import datetime
+from flask import (
+    Flask, Response, render_template, request, redirect, url_for, flash, jsonify,
+    stream_with_context
+)
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.middleware.proxy_fix import ProxyFix
 
 from seating_algorithm import (
     Singer, generate_seating_chart, get_unique_parts,
     calculate_dimensions_with_user_input, generate_random_roster,
-    calculate_min_width
+    calculate_min_width, get_unique_ensembles
+)
+from chart_history import ChartHistory, DEFAULT_HISTORY_DEPTH
+from collaboration import (
+    SEARCH_LIMIT, CollaborationHub, UnknownChartError, start_background_loop
 )
+from riser_geometry import SHAPES, chart_row_sizes, screen_layout
+from venues import VenueLibrary
+from section_balance import BalanceOptions, balance_sections, has_constraints
+from chart_lint import LinterRegistry, UnknownLinterError
+from chart_export import ExportEvent, export_files, index_chart, stream_zip
+from roster_diff import apply_roster_diff, diff_rosters
+from massed_choir import ensemble_views
+from rate_limit import Budget, MemoryBucketStore, RateLimiter, SQLiteBucketStore
 
 app = Flask(__name__)
 app.secret_key = 'dev-secret-key'  # For flash messages
+# Maximum number of undo steps kept per edit session
+app.config['HISTORY_DEPTH'] = int(os.environ.get('HISTORY_DEPTH', DEFAULT_HISTORY_DEPTH))
+
+# Largest request body accepted (uploads, posted charts); larger ones get a 413
+# before anything is read
+app.config['MAX_CONTENT_LENGTH'] = int(os.environ.get('MAX_CONTENT_LENGTH', 2 * 1024 * 1024))
+# Number of reverse proxies in front of the app (Render has one), so the client
+# address used for rate limiting comes from X-Forwarded-For
+if int(os.environ.get('TRUSTED_PROXIES', 0)):
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=int(os.environ['TRUSTED_PROXIES']))
+
+# Per-client request budgets (see rate_limit.py). Expensive routes generate or
+# render a whole chart, parse uploads or build exports; everything else is cheap.
+app.config['RATE_LIMITING'] = os.environ.get('RATE_LIMITING', 'on') != 'off'
+rate_limiter = RateLimiter(
+    [Budget('cheap', capacity=120, refill_rate=2),
+     Budget('expensive', capacity=10, refill_rate=0.2)],
+    # Set RATE_LIMIT_DB to share buckets between worker processes
+    SQLiteBucketStore(os.environ['RATE_LIMIT_DB']) if os.environ.get('RATE_LIMIT_DB')
+    else MemoryBucketStore()
+)
+EXPENSIVE_ENDPOINTS = {'upload', 'configure_post', 'preview', 'edit', 'finalize',
+                       'roster_update', 'export', 'collab_create', 'lint_create'}
+UNLIMITED_ENDPOINTS = {'static', 'limit_metrics', 'service_worker'}
+
+# Chart checks for open editors (see chart_lint.py)
+linters = LinterRegistry()
+
+# Saved riser/chair layouts, one JSON file per venue
+venue_library = VenueLibrary(os.path.join(app.root_path, 'venues'))
+
+# Shared charts for live collaboration. The hub runs on its own event loop
+# thread, started on first use; sessions live in memory in this process.
+collab_hub = CollaborationHub()
+_collab_loop = None
+_collab_loop_lock = threading.Lock()
+
+# Each open event stream holds a worker thread, so streams are capped: they
+# close after COLLAB_STREAM_SECONDS (the browser reconnects and catches up from
+# its last version), and at most COLLAB_MAX_STREAMS are open at once, leaving
+# the rest of gunicorn's 64 threads for ordinary requests.
+app.config['COLLAB_STREAM_SECONDS'] = float(os.environ.get('COLLAB_STREAM_SECONDS', 300))
+app.config['COLLAB_MAX_STREAMS'] = int(os.environ.get('COLLAB_MAX_STREAMS', 40))
+_collab_streams = 0
+_collab_streams_lock = threading.Lock()
+
+# Display settings stored with a shared chart so every editor renders it the same way
+COLLAB_META_KEYS = ('num_singers', 'part_order', 'layout', 'flipped', 'staggered',
+                    'curved', 'shape', 'aisle_after', 'venue', 'row_aisles', 'singers_data',
+                    'ensemble_order')
+
+
+@app.before_request
+def check_content_length():
+    """Refuse oversized bodies up front, before any route reads the form or files."""
+    max_length = app.config['MAX_CONTENT_LENGTH']
+    if max_length and (request.content_length or 0) > max_length:
+        raise RequestEntityTooLarge()
+
+
+@app.before_request
+def check_rate_limit():
+    """Reject the request with a 429 if the client has used up the route's budget."""
+    if not app.config['RATE_LIMITING'] or request.endpoint in UNLIMITED_ENDPOINTS:
+        return None
+    budget = 'expensive' if request.endpoint in EXPENSIVE_ENDPOINTS else 'cheap'
+    decision = rate_limiter.take(request.remote_addr or '', budget)
+    if decision.allowed:
+        return None
+    retry_after = max(1, round(decision.retry_after))
+    message = f'Too many requests. Please wait {retry_after} seconds and try again.'
+    return limit_response(message, 429, {'Retry-After': str(retry_after)})
+
+
+@app.errorhandler(RequestEntityTooLarge)
+def request_too_large(e):
+    rate_limiter.metrics.record_too_large(request.remote_addr or '')
+    limit_mb = app.config['MAX_CONTENT_LENGTH'] / (1024 * 1024)
+    return limit_response(f'That upload is too large (the limit is {limit_mb:g} MB).', 413)
+
+
+def limit_response(message: str, status: int, headers: dict = None):
+    """JSON error for API routes, the start page with a message for page requests."""
+    if request.is_json or request.path.startswith(('/lint', '/collab/')):
+        return jsonify({'error': message}), status, headers or {}
+    flash(message)
+    return render_template('index.html'), status, headers or {}
+
+
+@app.route('/metrics/limits', methods=['GET'])
+def limit_metrics():
+    """Rate limit and upload size rejections since the process started. Returns JSON."""
+    return jsonify(rate_limiter.metrics.snapshot())
+
+
+@app.route('/sw.js', methods=['GET'])
+def service_worker():
+    """Serve the service worker from the site root, so its scope covers every page."""
+    response = app.send_static_file('sw.js')
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
 
 
 @app.route('/', methods=['GET'])
@@ -27,18 +150,10 @@ def index():
 @app.route('/upload', methods=['POST'])
 def upload():
     """Handle CSV upload and show configuration page."""
-    if 'file' not in request.files:
-        flash('No file uploaded')
-        return redirect(url_for('index'))
-
-    file = request.files['file']
-
-    if file.filename == '':
-        flash('No file selected')
-        return redirect(url_for('index'))
-
-    if not file.filename.endswith('.csv'):
-        flash('Please upload a CSV file')
+    try:
+        file = get_uploaded_csv()
+    except ValueError as e:
+        flash(str(e))
         return redirect(url_for('index'))
 
     try:
@@ -108,16 +223,17 @@ def configure_post():
 def show_configure_page(singers: list[Singer]):
     """Show the configuration page for a list of singers."""
     parts = get_unique_parts(singers)
-    singers_data = [
-        {'name': s.name, 'voice_part': s.voice_part, 'height': s.height}
-        for s in singers
-    ]
+    singers_data = [s.to_dict() for s in singers]
     singers_json = base64.b64encode(json.dumps(singers_data).encode()).decode()
 
     return render_template('configure.html',
                            parts=parts,
                            num_singers=len(singers),
-                           singers_data=singers_json)
+                           singers_data=singers_json,
+                           venues=venue_library.all(),
+                           has_constraints=has_constraints(singers),
+                           ensembles=get_unique_ensembles(singers),
+                           tags=sorted({tag for s in singers for tag in s.tags}))
 
 
 @app.route('/preview', methods=['POST'])
@@ -127,7 +243,8 @@ def preview():
         chart_data = generate_chart_from_form()
         # Default staggered to true for new charts
         chart_data['staggered'] = True
-        return render_template('edit.html', **chart_data)
+        return render_template('edit.html', **chart_data,
+                               **start_linting(chart_data['chart_data'], chart_data['singers_data']))
     except ValueError as e:
         flash(str(e))
         return redirect(url_for('index'))
@@ -141,7 +258,8 @@ def edit():
     """Show editable seating chart with drag/drop."""
     try:
         chart_data = get_chart_data_from_form()
-        return render_template('edit.html', **chart_data)
+        return render_template('edit.html', **chart_data,
+                               **start_linting(chart_data['chart_data'], chart_data['singers_data']))
     except ValueError as e:
         flash(str(e))
         return redirect(url_for('index'))
@@ -155,7 +273,17 @@ def finalize():
     """Show finalized seating chart for viewing/download."""
     try:
         chart_data = get_chart_data_from_form()
-        return render_template('finalize.html', **chart_data)
+        # A massed chart can be shown for one ensemble's conductor; chart_data
+        # stays the whole chart, so editing and exporting are unaffected
+        views = ensemble_views(chart_data['chart'])
+        ensemble = request.form.get('ensemble', '').strip()
+        if ensemble in views:
+            chart_data['chart'] = views[ensemble].sub_chart()
+            chart_data['ensemble_size'] = views[ensemble].size
+        else:
+            ensemble = ''
+        return render_template('finalize.html', **chart_data,
+                               ensembles=list(views), ensemble=ensemble)
     except ValueError as e:
         flash(str(e))
         return redirect(url_for('index'))
@@ -164,6 +292,266 @@ def finalize():
         return redirect(url_for('index'))
 
 
+@app.route('/roster/update', methods=['POST'])
+def roster_update():
+    """Apply an uploaded roster to the current chart without regenerating it."""
+    try:
+        file = get_uploaded_csv()
+    except ValueError as e:
+        flash(str(e))
+        return redirect(url_for('index'))
+
+    try:
+        new_singers = parse_csv(file.read().decode('utf-8'))
+        if not new_singers:
+            raise ValueError('No valid singers found in CSV')
+        chart_data = get_chart_data_from_form()
+        chart = chart_data['chart']
+        # Diff against who is in the chart now, so part edits and earlier
+        # updates made in the editor are not seen as changes
+        old_singers = [seat.singer for row in chart for seat in row if seat.singer is not None]
+        diff = diff_rosters(old_singers, new_singers)
+        # A venue's rows, aisles and blocked seats are fixed, so no seats are added
+        update = apply_roster_diff(chart, diff, chart_data['part_order'],
+                                   fixed_rows=bool(chart_data['venue']))
+
+        roster_changes = diff.summary() or ['No changes in the uploaded roster']
+        no_part = [s.name for s in update.unplaced if s.voice_part not in chart_data['part_order']]
+        no_seat = [s.name for s in update.unplaced if s.voice_part in chart_data['part_order']]
+        if no_part:
+            roster_changes.append(f"Not placed (part not in this chart): {', '.join(no_part)}")
+        if no_seat:
+            roster_changes.append(f"Not placed (no free seat in this venue): {', '.join(no_seat)}")
+        chart_json = encode_chart(chart)
+        singers_json = base64.b64encode(json.dumps([s.to_dict() for s in new_singers]).encode()).decode()
+        chart_data.update({
+            'chart_data': chart_json,
+            'singers_data': singers_json,
+            'num_singers': len(new_singers),
+            'rows': len(chart),
+            'seats_per_row': max((len(row) for row in chart), default=0),
+            'stagger_offsets': calculate_stagger_offsets(chart),
+            'riser_layout': get_riser_layout(chart, chart_data['shape'], chart_data['aisle_after'],
+                                             chart_data['staggered']),
+            # Seat positions may have changed, so earlier edits can't be undone
+            'history_data': '',
+            'roster_changes': roster_changes,
+        })
+        return render_template('edit.html', **chart_data, **start_linting(chart_json, singers_json))
+    except ValueError as e:
+        flash(str(e))
+        return redirect(url_for('index'))
+    except Exception as e:
+        flash(f'Error updating roster: {str(e)}')
+        return redirect(url_for('index'))
+
+
+@app.route('/export', methods=['POST'])
+def export():
+    """Stream a zip of handouts (CSV, part lists, JSON, printable HTML, optional ICS)."""
+    try:
+        chart = decode_chart(request.form.get('chart_data', ''))
+        part_order = [p.strip() for p in request.form.get('part_order', '').split(',') if p.strip()]
+        title = request.form.get('title', '').strip() or 'Seating Chart'
+        event = get_export_event(title)
+    except ValueError as e:
+        flash(str(e))
+        return redirect(url_for('index'))
+    except Exception as e:
+        flash(f'Error exporting chart: {str(e)}')
+        return redirect(url_for('index'))
+
+    # One walk of the chart serves both the printable page and the CSV files
+    index = index_chart(chart, part_order)
+    html = app.jinja_env.get_template('export_chart.html').generate(
+        title=title, chart=chart, part_order=part_order, index=index)
+    zip_stream = stream_zip(export_files(chart, part_order, html=html, event=event, index=index))
+    return Response(stream_with_context(zip_stream), mimetype='application/zip',
+                    headers={'Content-Disposition': 'attachment; filename="seating_chart.zip"'})
+
+
+def get_export_event(title: str):
+    """Return concert details for the calendar file, or None if no date was given."""
+    start_str = request.form.get('event_start', '').strip()
+    if not start_str:
+        return None
+    try:
+        start = datetime.fromisoformat(start_str)
+    except ValueError:
+        raise ValueError(f'Invalid concert date: {start_str}')
+    return ExportEvent(title=title, start=start,
+                       location=request.form.get('event_location', '').strip())
+
+
+def run_on_hub(coro):
+    """Run a collaboration hub coroutine on the hub's event loop and wait for it."""
+    global _collab_loop
+    with _collab_loop_lock:
+        if _collab_loop is None:
+            _collab_loop = start_background_loop()
+    return asyncio.run_coroutine_threadsafe(coro, _collab_loop).result()
+
+
+@app.route('/collab', methods=['POST'])
+def collab_create():
+    """Start a live collaboration session for the posted chart."""
+    try:
+        chart_data = get_chart_data_from_form()
+        meta = {key: chart_data[key] for key in COLLAB_META_KEYS}
+        chart_id = run_on_hub(collab_hub.create_session(chart_data['chart'], meta))
+        return redirect(url_for('collab_edit', chart_id=chart_id))
+    except ValueError as e:
+        flash(str(e))
+        return redirect(url_for('index'))
+    except Exception as e:
+        flash(f'Error sharing chart: {str(e)}')
+        return redirect(url_for('index'))
+
+
+@app.route('/collab/<chart_id>', methods=['GET'])
+def collab_edit(chart_id):
+    """Show the editor for a shared chart."""
+    try:
+        chart, meta, version = run_on_hub(collab_hub.snapshot(chart_id))
+    except UnknownChartError:
+        flash('That shared chart no longer exists')
+        return redirect(url_for('index'))
+
+    chart_json = encode_chart(chart)
+    return render_template('edit.html',
+                           chart=chart,
+                           chart_data=chart_json,
+                           rows=len(chart),
+                           seats_per_row=len(chart[0]) if chart else 0,
+                           stagger_offsets=calculate_stagger_offsets(chart),
+                           history_data='',
+                           history_depth=app.config['HISTORY_DEPTH'],
+                           riser_layout=get_riser_layout(chart, meta['shape'], meta['aisle_after'],
+                                                         meta['staggered']),
+                           collab_id=chart_id,
+                           collab_version=version,
+                           **meta,
+                           **start_linting(chart_json, meta['singers_data']))
+
+
+@app.route('/collab/<chart_id>/ops', methods=['POST'])
+def collab_submit(chart_id):
+    """Apply one edit operation to a shared chart. Returns JSON."""
+    data = request.get_json(silent=True) or {}
+    try:
+        op_id = data.get('op_id')
+        result = run_on_hub(collab_hub.submit(
+            chart_id, data['op'], int(data['base_version']), str(data.get('client_id', '')),
+            int(op_id) if op_id is not None else None
+        ))
+    except UnknownChartError:
+        return jsonify({'error': 'Unknown chart'}), 404
+    except (KeyError, TypeError, ValueError, IndexError) as e:
+        return jsonify({'error': f'Invalid operation: {e}'}), 400
+    return jsonify(result)
+
+
+@app.route('/collab/<chart_id>/events', methods=['GET'])
+def collab_events(chart_id):
+    """
+    Stream accepted operations for a shared chart as server-sent events.
+
+    The stream ends after COLLAB_STREAM_SECONDS; EventSource reconnects with
+    Last-Event-ID and picks up any operations it missed.
+    """
+    global _collab_streams
+    since = request.headers.get('Last-Event-ID') or request.args.get('since')
+    with _collab_streams_lock:
+        if _collab_streams >= app.config['COLLAB_MAX_STREAMS']:
+            return jsonify({'error': 'Too many live viewers; retrying shortly'}), 503, \
+                {'Retry-After': '5'}
+        _collab_streams += 1
+
+    def release():
+        global _collab_streams
+        with _collab_streams_lock:
+            _collab_streams -= 1
+
+    try:
+        queue = run_on_hub(collab_hub.subscribe(chart_id, int(since) if since else None))
+    except UnknownChartError:
+        release()
+        return jsonify({'error': 'Unknown chart'}), 404
+
+    deadline = time.monotonic() + app.config['COLLAB_STREAM_SECONDS']
+
+    def stream():
+        yield 'retry: 1000\n\n'
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            try:
+                event = run_on_hub(asyncio.wait_for(queue.get(), timeout=min(15, remaining)))
+            except TimeoutError:
+                yield ': keep-alive\n\n'
+                continue
+            yield f"id: {event['version']}\ndata: {json.dumps(event)}\n\n"
+
+    def close():
+        _collab_loop.call_soon_threadsafe(collab_hub.unsubscribe, chart_id, queue)
+        release()
+
+    response = Response(stream(), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    # Runs even if the client goes away before the stream starts
+    response.call_on_close(close)
+    return response
+
+
+@app.route('/collab/<chart_id>/search', methods=['GET'])
+def collab_search(chart_id):
+    """Find singers in a shared chart by name or part. Returns JSON."""
+    query = request.args.get('q', '')
+    try:
+        limit = min(int(request.args.get('limit', SEARCH_LIMIT)), SEARCH_LIMIT)
+        matches = run_on_hub(collab_hub.find_singers(chart_id, query, limit))
+    except UnknownChartError:
+        return jsonify({'error': 'Unknown chart'}), 404
+    except ValueError:
+        return jsonify({'error': 'Invalid limit'}), 400
+    return jsonify({'matches': matches})
+
+
+@app.route('/lint', methods=['POST'])
+def lint_create():
+    """Lint a chart posted as JSON and keep a linter for incremental updates."""
+    data = request.get_json(silent=True) or {}
+    try:
+        result = start_linting(data['chart_data'], data.get('singers_data', ''))
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({'error': f'Invalid chart: {e}'}), 400
+    return jsonify(result)
+
+
+@app.route('/lint/<lint_id>/ops', methods=['POST'])
+def lint_ops(lint_id):
+    """Apply edit operations to a linter's chart and return the updated findings."""
+    data = request.get_json(silent=True) or {}
+    try:
+        findings = linters.apply(lint_id, data.get('ops', []))
+    except UnknownLinterError:
+        return jsonify({'error': 'Unknown linter'}), 404
+    except (KeyError, TypeError, ValueError, IndexError) as e:
+        return jsonify({'error': f'Invalid operation: {e}'}), 400
+    return jsonify({'findings': [f.to_dict() for f in findings]})
+
+
+def start_linting(chart_json: str, singers_json: str) -> dict:
+    """Lint an encoded chart. Returns the linter id and findings for the editor."""
+    roster = None
+    if singers_json:
+        roster = [s['name'] for s in json.loads(base64.b64decode(singers_json).decode())]
+    # The linter gets its own copy of the chart to apply later edits to
+    lint_id, findings = linters.create(decode_chart(chart_json), roster)
+    return {'lint_id': lint_id, 'findings': [f.to_dict() for f in findings]}
+
+
 def generate_chart_from_form() -> dict:
     """Parse form data and generate a new seating chart."""
     singers_json = request.form.get('singers_data', '')
@@ -177,14 +565,31 @@ def generate_chart_from_form() -> dict:
     if not part_order:
         raise ValueError('Please specify voice part order')
 
-    # Check for variable row sizes first
+    # Massed choirs: keep each ensemble together within every part
+    ensemble_order = get_ensemble_order()
+
+    # A saved venue sets the rows, aisles and blocked seats; then variable row sizes
+    venue = get_venue()
     row_sizes_str = request.form.get('row_sizes', '').strip()
-    if row_sizes_str:
+    if venue:
+        rows = len(venue.rows)
+        seats_per_row = max(venue.row_sizes)
+        venue.check_fit(singers, part_order, layout)
+        try:
+            chart = generate_seating_chart(singers, rows, seats_per_row, part_order, layout,
+                                           venue.row_sizes, venue.blocked_seats,
+                                           venue.aisles, venue.accessible_seats, ensemble_order)
+        except ValueError as e:
+            # Rows and seats come from the venue, so "add rows" is no help here
+            raise ValueError(f"{venue.name} can't seat this roster with the {layout} layout; "
+                             f"use another layout or venue") from e
+    elif row_sizes_str:
         # Parse variable row sizes (back to front)
         row_sizes = [int(s.strip()) for s in row_sizes_str.split(',') if s.strip()]
         rows = len(row_sizes)
         seats_per_row = max(row_sizes)  # For chart allocation
-        chart = generate_seating_chart(singers, rows, seats_per_row, part_order, layout, row_sizes)
+        chart = generate_seating_chart(singers, rows, seats_per_row, part_order, layout, row_sizes,
+                                       ensemble_order=ensemble_order)
     else:
         # Get optional row/seat configuration
         rows_str = request.form.get('rows', '').strip()
@@ -197,18 +602,27 @@ def generate_chart_from_form() -> dict:
             len(singers), len(part_order), layout, user_rows, user_max_per_row
         )
 
-        # For side-by-side layout, ensure seats_per_row is large enough
-        # to handle per-part column widths (cumulative rounding can exceed initial calc)
-        if layout == 'side-by-side':
-            min_width = calculate_min_width(singers, part_order, rows)
-            seats_per_row = max(seats_per_row, min_width)
+        # Ensure seats_per_row is large enough to fit every part: side-by-side
+        # per-part column widths can exceed the initial calc due to cumulative
+        # rounding, and stacked parts can be larger than an even share
+        min_width = calculate_min_width(singers, part_order, rows, layout, ensemble_order)
+        seats_per_row = max(seats_per_row, min_width)
 
-        chart = generate_seating_chart(singers, rows, seats_per_row, part_order, layout)
+        chart = generate_seating_chart(singers, rows, seats_per_row, part_order, layout,
+                                       ensemble_order=ensemble_order)
+
+    # Spread strong singers, pair new singers with veterans, keep pairs apart
+    unmet_constraints = []
+    if request.form.get('balance') == 'true':
+        spread_tags = [t.strip() for t in request.form.get('spread_tags', '').split(',') if t.strip()]
+        report = balance_sections(chart, BalanceOptions(spread_tags=spread_tags,
+                                                        keep_ensembles=ensemble_order is not None))
+        unmet_constraints = [u.message for u in report.unmet]
 
     # Get display options
     flipped = request.form.get('flipped') == 'true'
     staggered = request.form.get('staggered') == 'true'
-    curved = request.form.get('curved') == 'true'
+    shape = get_riser_shape()
 
     # Get aisle position
     aisle_str = request.form.get('aisle_after', '').strip()
@@ -223,15 +637,23 @@ def generate_chart_from_form() -> dict:
         'chart_data': chart_json,
         'num_singers': len(singers),
         'part_order': part_order,
+        'ensemble_order': ensemble_order,
         'layout': layout,
         'rows': rows,
         'seats_per_row': seats_per_row,
         'flipped': flipped,
         'staggered': staggered,
-        'curved': curved,
+        'curved': shape != 'straight',
+        'shape': shape,
+        'riser_layout': get_riser_layout(chart, shape, aisle_after, staggered),
         'aisle_after': aisle_after,
+        'venue': venue.slug if venue else '',
+        'row_aisles': venue.aisles if venue else None,
         'singers_data': request.form.get('singers_data', ''),
-        'stagger_offsets': stagger_offsets
+        'stagger_offsets': stagger_offsets,
+        'history_data': '',
+        'history_depth': app.config['HISTORY_DEPTH'],
+        'unmet_constraints': unmet_constraints
     }
 
 
@@ -250,29 +672,102 @@ def get_chart_data_from_form() -> dict:
     part_order = [p.strip() for p in part_order_str.split(',') if p.strip()]
     flipped = request.form.get('flipped') == 'true'
     staggered = request.form.get('staggered') == 'true'
-    curved = request.form.get('curved') == 'true'
+    shape = get_riser_shape()
     aisle_str = request.form.get('aisle_after', '').strip()
     aisle_after = int(aisle_str) if aisle_str else None
+    venue = get_venue()
 
     stagger_offsets = calculate_stagger_offsets(chart)
 
+    # Carry the undo/redo history along with the chart, trimmed to the configured depth
+    history = ChartHistory.decode(request.form.get('history_data', ''),
+                                  app.config['HISTORY_DEPTH'])
+
     return {
         'chart': chart,
         'chart_data': chart_json,
         'num_singers': int(request.form.get('num_singers', 0)),
         'part_order': part_order,
+        'ensemble_order': get_ensemble_order(),
         'layout': request.form.get('layout', 'side-by-side'),
         'rows': len(chart),
         'seats_per_row': len(chart[0]) if chart else 0,
-        'curved': curved,
+        'curved': shape != 'straight',
+        'shape': shape,
+        'riser_layout': get_riser_layout(chart, shape, aisle_after, staggered),
         'aisle_after': aisle_after,
+        'venue': venue.slug if venue else '',
+        'row_aisles': venue.aisles if venue else None,
         'flipped': flipped,
         'staggered': staggered,
         'singers_data': request.form.get('singers_data', ''),
-        'stagger_offsets': stagger_offsets
+        'stagger_offsets': stagger_offsets,
+        'history_data': history.encode(),
+        'history_depth': history.max_depth
     }
 
 
+def get_uploaded_csv():
+    """
+    Return the uploaded CSV file from the form.
+
+    Raises ValueError with a message for the user if there is no file or it
+    isn't a CSV. An upload over MAX_CONTENT_LENGTH raises RequestEntityTooLarge
+    here, which the 413 handler answers.
+    """
+    if 'file' not in request.files:
+        raise ValueError('No file uploaded')
+    file = request.files['file']
+    if file.filename == '':
+        raise ValueError('No file selected')
+    if not file.filename.endswith('.csv'):
+        raise ValueError('Please upload a CSV file')
+    return file
+
+
+def get_venue():
+    """Return the venue selected in the form, or None."""
+    slug = request.form.get('venue', '').strip()
+    return venue_library.get(slug) if slug else None
+
+
+def get_ensemble_order():
+    """
+    Ensembles in left-to-right order for a massed chart, or None.
+
+    An empty field means ensembles are not kept together. Ensembles left out
+    of the list are placed after the listed ones.
+    """
+    value = request.form.get('ensemble_order', '').strip()
+    if not value:
+        return None
+    return [e.strip() for e in value.split(',') if e.strip()]
+
+
+def get_riser_shape() -> str:
+    """Read the riser shape from the form. The older `curved` flag means an arc."""
+    shape = request.form.get('shape', '').strip()
+    if not shape:
+        shape = 'arc' if request.form.get('curved') == 'true' else 'straight'
+    if shape not in SHAPES:
+        raise ValueError(f'Unknown riser shape: {shape}')
+    return shape
+
+
+def get_riser_layout(chart, shape: str, aisle_after, staggered: bool = False):
+    """
+    Pixel layout for curved and angled risers, or None for straight rows.
+
+    Straight rows keep the flex layout because their stagger depends on how
+    many seats are filled and is recalculated live in the editor. Shaped rows
+    take their stagger from the chart as it is when the page is drawn.
+    """
+    if shape == 'straight' or not chart:
+        return None
+    stagger_offsets = tuple(calculate_stagger_offsets(chart)) if staggered else ()
+    return screen_layout(chart_row_sizes(chart), shape, aisle_after, stagger_offsets)
+
+
 def calculate_stagger_offsets(chart) -> list[bool]:
     """
     Calculate which rows need stagger offset for proper brick pattern.
@@ -304,27 +799,7 @@ def calculate_stagger_offsets(chart) -> list[bool]:
 
 def encode_chart(chart) -> str:
     """Encode a chart to JSON string for form storage."""
-    data = []
-    for row in chart:
-        row_data = []
-        for seat in row:
-            if seat.singer:
-                row_data.append({
-                    'row': seat.row,
-                    'position': seat.position,
-                    'singer': {
-                        'name': seat.singer.name,
-                        'voice_part': seat.singer.voice_part,
-                        'height': seat.singer.height
-                    }
-                })
-            else:
-                row_data.append({
-                    'row': seat.row,
-                    'position': seat.position,
-                    'singer': None
-                })
-        data.append(row_data)
+    data = [[seat.to_dict() for seat in row] for row in chart]
     return base64.b64encode(json.dumps(data).encode()).decode()
 
 
@@ -342,7 +817,9 @@ def decode_chart(chart_json: str):
             row.append(Seat(
                 row=seat_data['row'],
                 position=seat_data['position'],
-                singer=singer
+                singer=singer,
+                blocked=seat_data.get('blocked', False),
+                accessible=seat_data.get('accessible', False)
             ))
         chart.append(row)
     return chart
@@ -378,10 +855,33 @@ def _parse_height(s: str) -> float:
     return float(s)
 
 
+def _parse_attributes(row: dict) -> dict:
+    """Parse the optional section balance and ensemble columns of a CSV row."""
+    attributes = {}
+    ensemble = (row.get('ensemble') or '').strip()
+    if ensemble:
+        attributes['ensemble'] = ensemble
+    for key in ('strength', 'experience'):
+        value = (row.get(key) or '').strip()
+        if value:
+            # A bad value (e.g. "strong") is ignored rather than dropping the singer
+            try:
+                attributes[key] = int(value)
+            except ValueError:
+                pass
+    for key in ('tags', 'keep_apart'):
+        values = [v.strip() for v in (row.get(key) or '').split(';') if v.strip()]
+        if values:
+            attributes[key] = values
+    return attributes
+
+
 def parse_csv(content: str) -> list[Singer]:
     """
     Parse CSV content into Singer objects.
     Accepts any voice_part values and supports decimal heights.
+    Optional columns: strength (1-5), experience (seasons), tags and
+    keep_apart (both semicolon-separated), and ensemble (for massed choirs).
     """
     singers = []
     reader = csv.DictReader(io.StringIO(content))
@@ -396,7 +896,8 @@ def parse_csv(content: str) -> list[Singer]:
                 continue
 
             height = float(height_str)
-            singers.append(Singer(name=name, voice_part=voice_part, height=height))
+            singers.append(Singer(name=name, voice_part=voice_part, height=height,
+                                  **_parse_attributes(row)))
 
         except (ValueError, KeyError):
             continue
@@ -0,0 +1,87 @@
+"""
+Minimum-cost assignment (Hungarian algorithm).
+
+Used to decide which singer takes which seat when several singers are
+interchangeable for a set of seats, e.g. keeping singers close to where they
+sat in the previous piece.
+"""
+
+import math
+from typing import List
+
+
+def solve_assignment(cost: List[List[float]]) -> List[int]:
+    """
+    Assign each row to a distinct column, minimizing the total cost.
+
+    Args:
+        cost: n x m cost matrix with n <= m (rows are workers, columns are jobs).
+              A cost of math.inf forbids that pairing.
+
+    Returns:
+        List where entry i is the column assigned to row i
+
+    Raises:
+        ValueError: if there are more rows than columns, or the forbidden
+            cells leave no complete assignment
+
+    Runs in O(n^2 * m) using the shortest augmenting path formulation with
+    row and column potentials.
+    """
+    n = len(cost)
+    if n == 0:
+        return []
+    m = len(cost[0])
+    if n > m:
+        raise ValueError(f'Cannot assign {n} rows to {m} columns')
+
+    inf = math.inf
+    # 1-indexed potentials and matching; column 0 is a virtual start column
+    u = [0.0] * (n + 1)
+    v = [0.0] * (m + 1)
+    match = [0] * (m + 1)  # match[j] = row assigned to column j (0 = none)
+    way = [0] * (m + 1)
+
+    for i in range(1, n + 1):
+        match[0] = i
+        j0 = 0
+        min_slack = [inf] * (m + 1)
+        used = [False] * (m + 1)
+        while True:
+            used[j0] = True
+            i0 = match[j0]
+            row = cost[i0 - 1]
+            ui0 = u[i0]
+            delta = inf
+            j1 = 0
+            for j in range(1, m + 1):
+                if not used[j]:
+                    slack = row[j - 1] - ui0 - v[j]
+                    if slack < min_slack[j]:
+                        min_slack[j] = slack
+                        way[j] = j0
+                    if min_slack[j] < delta:
+                        delta = min_slack[j]
+                        j1 = j
+            for j in range(m + 1):
+                if used[j]:
+                    u[match[j]] += delta
+                    v[j] -= delta
+                else:
+                    min_slack[j] -= delta
+            if delta == inf:
+                raise ValueError(f'Row {i - 1} cannot be assigned without a forbidden cell')
+            j0 = j1
+            if match[j0] == 0:
+                break
+        # Flip the augmenting path
+        while j0:
+            j1 = way[j0]
+            match[j0] = match[j1]
+            j0 = j1
+
+    result = [0] * n
+    for j in range(1, m + 1):
+        if match[j]:
+            result[match[j] - 1] = j - 1
+    return result
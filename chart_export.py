@@ -0,0 +1,307 @@
+"""
+Handout export: every file a director hands out after finalizing, in one zip.
+
+The zip holds:
+    seating_chart.csv     Every singer with row and seat
+    parts/<part>.csv      One list per voice part
+    ensembles/<name>.csv  One list per ensemble, for massed charts
+    chart.json            The chart in the same schema as the editor's chart_data
+    chart.html            Printable chart (rendered by the caller's template)
+    concert.ics           Optional calendar event for the concert
+
+The chart is indexed once (who sits where, grouped by part) and every file is
+written from that index. Files are written into the zip in small chunks and
+the zip bytes are yielded as soon as they are produced, so a response can
+start streaming before the last file is built and no file is ever held in
+memory whole.
+
+Row numbers in the handouts count from the front (row 1), matching the labels
+on the chart.
+"""
+
+import csv
+import io
+import json
+import re
+import time
+import uuid
+import zipfile
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from seating_algorithm import Seat, Singer
+
+# Rows of CSV (or seats of JSON) written to the zip at a time
+ROWS_PER_CHUNK = 256
+
+Chunks = Iterable[Union[str, bytes]]
+
+
+@dataclass
+class ExportEvent:
+    """Concert details for the optional calendar file."""
+    title: str
+    start: datetime
+    duration_minutes: int = 120
+    location: str = ""
+
+
+@dataclass
+class SeatRecord:
+    row: int       # Counted from the front, as labelled on the chart
+    seat: int      # From 1
+    singer: Singer
+
+
+@dataclass
+class ChartIndex:
+    """Occupied seats, front row first, plus the same records grouped by part and ensemble."""
+    records: List[SeatRecord]
+    by_part: Dict[str, List[SeatRecord]]
+    num_rows: int
+    by_ensemble: Dict[str, List[SeatRecord]] = field(default_factory=dict)
+
+
+def index_chart(chart: List[List[Seat]], part_order: List[str]) -> ChartIndex:
+    """Walk the chart once, collecting every occupied seat."""
+    records = []
+    by_part: Dict[str, List[SeatRecord]] = {part: [] for part in part_order}
+    by_ensemble: Dict[str, List[SeatRecord]] = {}
+    num_rows = len(chart)
+    for r in range(num_rows - 1, -1, -1):
+        for seat in chart[r]:
+            if seat.singer is not None:
+                record = SeatRecord(row=num_rows - r, seat=seat.position + 1, singer=seat.singer)
+                records.append(record)
+                by_part.setdefault(seat.singer.voice_part, []).append(record)
+                if seat.singer.ensemble:
+                    by_ensemble.setdefault(seat.singer.ensemble, []).append(record)
+    return ChartIndex(records=records, by_part=by_part, num_rows=num_rows,
+                      by_ensemble=by_ensemble)
+
+
+def export_files(
+    chart: List[List[Seat]],
+    part_order: List[str],
+    html: Optional[Chunks] = None,
+    event: Optional[ExportEvent] = None,
+    index: Optional[ChartIndex] = None
+) -> Iterator[Tuple[str, Chunks]]:
+    """
+    Yield (file name, chunks) for every handout file.
+
+    Args:
+        chart: The finalized chart
+        part_order: Voice parts in chart order (sets the order of the part lists)
+        html: Optional chunks of a printable chart, e.g. from a streamed template
+        event: Optional concert details for concert.ics
+        index: The chart's index_chart result, if the caller already built it
+    """
+    if index is None:
+        index = index_chart(chart, part_order)
+    yield 'seating_chart.csv', _csv_chunks(
+        ['row', 'seat', 'name', 'voice_part', 'height'],
+        ([r.row, r.seat, r.singer.name, r.singer.voice_part, _height(r.singer)]
+         for r in index.records))
+    used = set()
+    for part, records in index.by_part.items():
+        if records:
+            yield f'parts/{_file_name(part, used)}.csv', _csv_chunks(
+                ['name', 'row', 'seat', 'height'],
+                ([r.singer.name, r.row, r.seat, _height(r.singer)] for r in records))
+    used = set()
+    for ensemble, records in index.by_ensemble.items():
+        yield f'ensembles/{_file_name(ensemble, used)}.csv', _csv_chunks(
+            ['name', 'voice_part', 'row', 'seat', 'height'],
+            ([r.singer.name, r.singer.voice_part, r.row, r.seat, _height(r.singer)]
+             for r in records))
+    yield 'chart.json', _json_chunks(chart)
+    if html is not None:
+        yield 'chart.html', html
+    if event is not None:
+        yield 'concert.ics', _ics_chunks(index, event)
+
+
+def stream_zip(files: Iterable[Tuple[str, Chunks]]) -> Iterator[bytes]:
+    """
+    Build a zip from (name, chunks) pairs, yielding zip bytes as they are written.
+
+    Uses data descriptors (no seeking back to patch headers), so the output
+    can go straight into a streaming HTTP response.
+    """
+    sink = _ZipSink()
+    with zipfile.ZipFile(sink, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, chunks in files:
+            info = zipfile.ZipInfo(name, date_time=time.localtime()[:6])
+            info.compress_type = zipfile.ZIP_DEFLATED
+            with archive.open(info, 'w') as entry:
+                for chunk in chunks:
+                    entry.write(chunk.encode('utf-8') if isinstance(chunk, str) else chunk)
+                    if sink.pending:
+                        yield sink.take()
+            if sink.pending:
+                yield sink.take()
+    if sink.pending:
+        yield sink.take()
+
+
+class _ZipSink:
+    """Write-only, non-seekable file object that hands written bytes back out."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    @property
+    def pending(self) -> bool:
+        return bool(self._chunks)
+
+    def take(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self) -> None:
+        pass
+
+
+def _height(singer: Singer) -> str:
+    return '' if singer.height is None else f'{singer.height:g}'
+
+
+def _file_name(part: str, used: set) -> str:
+    """
+    Make a voice part or ensemble name safe to use as a file name.
+
+    Names that clean up the same way (e.g. "Soprano/1" and "Soprano?1") get a
+    -2, -3, ... suffix, so every zip entry is unique. `used` holds the names
+    already taken in the same folder, compared case-insensitively.
+    """
+    base = re.sub(r'[^\w\- ]+', '_', part).strip() or 'part'
+    name, count = base, 1
+    while name.lower() in used:
+        count += 1
+        name = f'{base}-{count}'
+    used.add(name.lower())
+    return name
+
+
+def _csv_chunks(header: List[str], rows: Iterable[list]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    for count, row in enumerate(rows, 1):
+        writer.writerow(row)
+        if count % ROWS_PER_CHUNK == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _json_chunks(chart: List[List[Seat]]) -> Iterator[str]:
+    """The chart as JSON, one row at a time (same schema as app.encode_chart)."""
+    yield '['
+    for r, row in enumerate(chart):
+        yield (',' if r else '') + json.dumps([seat.to_dict() for seat in row])
+    yield ']'
+
+
+def _ics_escape(text: str) -> str:
+    return (text.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+            .replace('\n', '\\n'))
+
+
+def _ics_fold(line: str) -> str:
+    """Fold a content line to 75 octets as iCalendar requires."""
+    encoded = line.encode('utf-8')
+    if len(encoded) <= 75:
+        return line + '\r\n'
+    parts = []
+    while encoded:
+        limit = 75 if not parts else 74  # Continuation lines start with a space
+        cut = min(limit, len(encoded))
+        while cut < len(encoded) and (encoded[cut] & 0xC0) == 0x80:
+            cut -= 1  # Don't split a UTF-8 character
+        parts.append(encoded[:cut].decode('utf-8'))
+        encoded = encoded[cut:]
+    return '\r\n '.join(parts) + '\r\n'
+
+
+def _ics_chunks(index: ChartIndex, event: ExportEvent) -> Iterator[str]:
+    """A single calendar event whose description says where each part sits."""
+    lines = []
+    for part, records in index.by_part.items():
+        if records:
+            rows = sorted({r.row for r in records})
+            row_text = f'row {rows[0]}' if len(rows) == 1 else f'rows {rows[0]}-{rows[-1]}'
+            lines.append(f'{part}: {len(records)} singers, {row_text}')
+    description = '\n'.join(lines)
+    end = event.start + timedelta(minutes=event.duration_minutes)
+    fmt = '%Y%m%dT%H%M%S'
+
+    yield 'BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//ChoralChart//Seating Chart//EN\r\n'
+    yield 'BEGIN:VEVENT\r\n'
+    yield _ics_fold(f'UID:{uuid.uuid4()}@choralchart')
+    yield _ics_fold(f"DTSTAMP:{datetime.now(timezone.utc).strftime(fmt)}Z")
+    yield _ics_fold(f'DTSTART:{event.start.strftime(fmt)}')
+    yield _ics_fold(f'DTEND:{end.strftime(fmt)}')
+    yield _ics_fold(f'SUMMARY:{_ics_escape(event.title)}')
+    if event.location:
+        yield _ics_fold(f'LOCATION:{_ics_escape(event.location)}')
+    yield _ics_fold(f'DESCRIPTION:{_ics_escape(description)}')
+    yield 'END:VEVENT\r\nEND:VCALENDAR\r\n'
+
+
+def benchmark(num_seats: int = 1000, repeats: int = 5) -> dict:
+    """Time a full handout zip for a chart of about `num_seats` seats."""
+    import tracemalloc
+    from seating_algorithm import generate_random_roster, generate_seating_chart, calculate_min_width
+
+    parts = ['Soprano 1', 'Soprano 2', 'Alto 1', 'Alto 2', 'Tenor 1', 'Tenor 2', 'Bass 1', 'Bass 2']
+    singers = generate_random_roster(num_seats, parts, seed=num_seats)
+    rows = 20
+    chart = generate_seating_chart(singers, rows, calculate_min_width(singers, parts, rows), parts)
+    event = ExportEvent('Spring Concert', datetime(2026, 5, 1, 19, 30), location='Main Hall')
+
+    times = []
+    size = largest_chunk = 0
+    for _ in range(repeats):
+        start = time.perf_counter()
+        size = largest_chunk = 0
+        for chunk in stream_zip(export_files(chart, parts, event=event)):
+            size += len(chunk)
+            largest_chunk = max(largest_chunk, len(chunk))
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    for _ in stream_zip(export_files(chart, parts, event=event)):
+        pass
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'seats': sum(len(row) for row in chart),
+        'singers': len(singers),
+        'best_seconds': min(times),
+        'zip_bytes': size,
+        'largest_chunk_bytes': largest_chunk,
+        'peak_memory_bytes': peak,
+    }
+
+
+if __name__ == '__main__':
+    result = benchmark()
+    print(f"{result['seats']} seats, {result['singers']} singers: "
+          f"{result['best_seconds'] * 1000:.1f} ms, {result['zip_bytes'] / 1024:.0f} KiB zip, "
+          f"largest chunk {result['largest_chunk_bytes'] / 1024:.0f} KiB, "
+          f"peak memory {result['peak_memory_bytes'] / 1024:.0f} KiB")
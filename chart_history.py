@@ -0,0 +1,130 @@
+"""
+Undo/redo history for chart edits.
+
+History is stored as a list of edit operations rather than chart snapshots,
+so each step costs O(changed seats) no matter how large the chart is.
+Operations are plain dicts so the same format is used by the editor's
+JavaScript and by the server when a chart is posted back with its history.
+
+Operation formats:
+    {"type": "swap", "a": [row, pos], "b": [row, pos]}
+    {"type": "set_part", "seat": [row, pos], "old": "Alto", "new": "Soprano"}
+"""
+
+import base64
+import binascii
+import json
+from collections import deque
+from typing import List, Optional
+
+from seating_algorithm import Seat
+
+DEFAULT_HISTORY_DEPTH = 100
+
+
+def apply_operation(chart: List[List[Seat]], op: dict) -> None:
+    """Apply a single edit operation to a chart in place."""
+    if op['type'] == 'swap':
+        (r1, p1), (r2, p2) = op['a'], op['b']
+        seat1, seat2 = chart[r1][p1], chart[r2][p2]
+        if seat1.blocked or seat2.blocked:
+            raise ValueError('Cannot move a singer into a blocked seat')
+        seat1.singer, seat2.singer = seat2.singer, seat1.singer
+    elif op['type'] == 'set_part':
+        r, p = op['seat']
+        singer = chart[r][p].singer
+        if singer is None:
+            raise ValueError(f'No singer at row {r}, seat {p}')
+        singer.voice_part = op['new']
+    else:
+        raise ValueError(f"Unknown operation type: {op['type']}")
+
+
+def invert_operation(op: dict) -> dict:
+    """Return the operation that undoes `op`."""
+    if op['type'] == 'swap':
+        return dict(op)  # A swap is its own inverse
+    if op['type'] == 'set_part':
+        return {**op, 'old': op['new'], 'new': op['old']}
+    raise ValueError(f"Unknown operation type: {op['type']}")
+
+
+class ChartHistory:
+    """
+    Bounded undo/redo stacks of chart edit operations.
+
+    When more than `max_depth` operations are recorded, the oldest ones are
+    evicted and can no longer be undone.
+    """
+
+    def __init__(self, max_depth: int = DEFAULT_HISTORY_DEPTH,
+                 undo_stack: Optional[List[dict]] = None,
+                 redo_stack: Optional[List[dict]] = None):
+        if max_depth < 1:
+            raise ValueError('History depth must be at least 1')
+        self.max_depth = max_depth
+        self.undo_stack = deque(undo_stack or [], maxlen=max_depth)
+        self.redo_stack = deque(redo_stack or [], maxlen=max_depth)
+
+    @property
+    def can_undo(self) -> bool:
+        return bool(self.undo_stack)
+
+    @property
+    def can_redo(self) -> bool:
+        return bool(self.redo_stack)
+
+    def record(self, op: dict) -> None:
+        """Record an operation that has already been applied to the chart."""
+        self.undo_stack.append(op)
+        self.redo_stack.clear()
+
+    def apply(self, chart: List[List[Seat]], op: dict) -> None:
+        """Apply an operation to the chart and record it."""
+        apply_operation(chart, op)
+        self.record(op)
+
+    def undo(self, chart: List[List[Seat]]) -> Optional[dict]:
+        """Undo the most recent operation. Returns it, or None if there is none."""
+        if not self.undo_stack:
+            return None
+        op = self.undo_stack.pop()
+        apply_operation(chart, invert_operation(op))
+        self.redo_stack.append(op)
+        return op
+
+    def redo(self, chart: List[List[Seat]]) -> Optional[dict]:
+        """Redo the most recently undone operation. Returns it, or None."""
+        if not self.redo_stack:
+            return None
+        op = self.redo_stack.pop()
+        apply_operation(chart, op)
+        self.undo_stack.append(op)
+        return op
+
+    def encode(self) -> str:
+        """Encode the history to a base64 JSON string for form storage."""
+        data = {
+            'undo': list(self.undo_stack),
+            'redo': list(self.redo_stack),
+        }
+        return base64.b64encode(json.dumps(data).encode()).decode()
+
+    @classmethod
+    def decode(cls, history_json: str,
+               max_depth: int = DEFAULT_HISTORY_DEPTH) -> 'ChartHistory':
+        """
+        Decode a history string.
+
+        An empty, truncated or tampered string gives an empty history, so a bad
+        history field never stops the chart itself from loading.
+        """
+        if not history_json:
+            return cls(max_depth)
+        try:
+            data = json.loads(base64.b64decode(history_json).decode())
+        except (ValueError, binascii.Error, UnicodeDecodeError):
+            return cls(max_depth)
+        if not isinstance(data, dict):
+            return cls(max_depth)
+        return cls(max_depth, data.get('undo', []), data.get('redo', []))
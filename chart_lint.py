@@ -0,0 +1,289 @@
+"""
+Chart linter.
+
+Runs a set of rules over a chart and returns structured findings the editor
+can list and highlight:
+
+- one_wide: a part is only one singer wide in every row it uses
+- sight_line: a singer is taller than someone directly behind them
+- islands: a part is split into groups that don't touch
+- unplaced: roster singers missing from the chart
+- hole: an empty seat inside a section
+
+Findings are stored by the scope they were computed over (a row, a part, a
+seat's sight line, or the roster). After an edit only the scopes that edit
+can change are re-checked, so a swap on a large chart costs the two rows,
+the parts and the handful of sight lines around the swapped seats.
+"""
+
+import threading
+import uuid
+from collections import Counter, OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from chart_history import apply_operation
+from seating_algorithm import Seat
+
+# A front singer this many inches taller than the singer behind blocks them
+SIGHT_LINE_TOLERANCE = 1.0
+# Linters kept in memory for open editors; the least recently used go first
+MAX_LINTERS = 256
+
+Scope = Tuple
+
+
+@dataclass
+class Finding:
+    rule: str
+    message: str
+    seats: List[Tuple[int, int]] = field(default_factory=list)  # (row, position)
+    severity: str = 'warning'  # "warning" or "error"
+
+    def to_dict(self) -> dict:
+        return {'rule': self.rule, 'message': self.message, 'severity': self.severity,
+                'seats': [list(seat) for seat in self.seats]}
+
+
+class ChartLinter:
+    """
+    Lints a chart and keeps the findings up to date as edits are applied.
+
+    The linter owns its chart: edits must go through apply() so it knows
+    which scopes to re-check.
+    """
+
+    def __init__(self, chart: List[List[Seat]], roster: Optional[Iterable[str]] = None):
+        self.chart = chart
+        self.roster = Counter(roster) if roster is not None else None
+        self._scopes: Dict[Scope, List[Finding]] = {}
+        self._part_seats: Dict[str, Set[Tuple[int, int]]] = {}
+        for row in chart:
+            for seat in row:
+                if seat.singer is not None:
+                    self._part_seats.setdefault(seat.singer.voice_part, set()).add(
+                        (seat.row, seat.position))
+        self._check(self._all_scopes())
+
+    @property
+    def findings(self) -> List[Finding]:
+        """Every current finding, errors first, then by rule and seat."""
+        findings = [f for scope_findings in self._scopes.values() for f in scope_findings]
+        return sorted(findings, key=lambda f: (f.severity != 'error', f.rule, f.seats))
+
+    def apply(self, op: dict) -> None:
+        """Apply an edit operation (see chart_history) and re-check what it touched."""
+        seats = [tuple(op['a']), tuple(op['b'])] if op['type'] == 'swap' else [tuple(op['seat'])]
+        parts = self._parts_at(seats)
+        apply_operation(self.chart, op)
+        for r, p in seats:
+            for part in self._part_seats.values():
+                part.discard((r, p))
+        for r, p in seats:
+            singer = self.chart[r][p].singer
+            if singer is not None:
+                self._part_seats.setdefault(singer.voice_part, set()).add((r, p))
+        parts |= self._parts_at(seats)
+
+        scopes: Set[Scope] = {('row', r) for r, _ in seats}
+        scopes |= {('part', part) for part in parts}
+        for r, p in seats:
+            scopes.add(('sight_line', r, p))
+            # The seat is also "behind" for the singers in front of it
+            scopes |= {('sight_line', r + 1, q) for q in self._overlapping(r, p, r + 1)}
+        self._check(scopes)
+
+    def _parts_at(self, seats: List[Tuple[int, int]]) -> Set[str]:
+        return {self.chart[r][p].singer.voice_part for r, p in seats
+                if self.chart[r][p].singer is not None}
+
+    def _all_scopes(self) -> List[Scope]:
+        scopes: List[Scope] = [('roster',)]
+        scopes += [('row', r) for r in range(len(self.chart))]
+        scopes += [('part', part) for part in self._part_seats]
+        scopes += [('sight_line', seat.row, seat.position) for row in self.chart for seat in row]
+        return scopes
+
+    def _check(self, scopes: Iterable[Scope]) -> None:
+        for scope in scopes:
+            kind = scope[0]
+            if kind == 'row':
+                findings = self._check_row(scope[1])
+            elif kind == 'part':
+                findings = self._check_part(scope[1])
+            elif kind == 'sight_line':
+                findings = self._check_sight_line(scope[1], scope[2])
+            else:
+                findings = self._check_roster()
+            if findings:
+                self._scopes[scope] = findings
+            else:
+                self._scopes.pop(scope, None)
+
+    def _label(self, r: int, p: int) -> str:
+        """Seat label as shown on the chart (rows are numbered from the front)."""
+        return f'row {len(self.chart) - r}, seat {p + 1}'
+
+    def _x(self, r: int, p: int) -> float:
+        """Seat offset from the center of its row, so rows of different widths line up."""
+        return p - (len(self.chart[r]) - 1) / 2
+
+    def _overlapping(self, r: int, p: int, other: int) -> List[int]:
+        """Positions in row `other` within half a seat of seat (r, p)."""
+        if not 0 <= other < len(self.chart) or not 0 <= r < len(self.chart):
+            return []
+        x = self._x(r, p)
+        return [q for q in range(len(self.chart[other]))
+                if abs(self._x(other, q) - x) <= 0.5]
+
+    # Rules
+
+    def _check_row(self, r: int) -> List[Finding]:
+        """
+        hole: empty seats inside a section, with the same part on both sides.
+
+        Gaps between two different parts are left alone: generation centers
+        each part within its own columns, so those are expected. The same goes
+        for gaps between two ensembles' blocks of a part in a massed chart.
+        """
+        row = self.chart[r]
+        holes = []
+        left_section = None
+        gap = []
+        for seat in row:
+            if seat.singer is None:
+                if left_section is not None and not seat.blocked:
+                    gap.append((r, seat.position))
+                continue
+            section = (seat.singer.voice_part, seat.singer.ensemble)
+            if gap and section == left_section:
+                holes.extend(gap)
+            left_section = section
+            gap = []
+        if not holes:
+            return []
+        seats = ', '.join(str(p + 1) for _, p in holes)
+        noun = 'seat' if len(holes) == 1 else 'seats'
+        return [Finding('hole', f'Row {len(self.chart) - r} has an empty gap inside a section '
+                                f'({noun} {seats})', holes)]
+
+    def _check_part(self, part: str) -> List[Finding]:
+        """one_wide and islands for one part."""
+        seats = sorted(self._part_seats.get(part, ()))
+        if len(seats) < 2:
+            return []
+        findings = []
+
+        by_row: Dict[int, List[int]] = {}
+        for r, p in seats:
+            by_row.setdefault(r, []).append(p)
+        if all(len(positions) == 1 for positions in by_row.values()):
+            findings.append(Finding('one_wide', f'{part} is only one singer wide', seats))
+
+        # Runs of adjacent seats in each row, joined across rows when they overlap
+        runs = []
+        for r, positions in sorted(by_row.items()):
+            start = positions[0]
+            for prev, p in zip(positions, positions[1:] + [None]):
+                if p != prev + 1:
+                    runs.append((r, start, prev))
+                    start = p
+        parent = list(range(len(runs)))
+
+        def find(i):
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        for i, (r1, a1, b1) in enumerate(runs):
+            for j in range(i + 1, len(runs)):
+                r2, a2, b2 = runs[j]
+                if r2 > r1 + 1:
+                    break
+                if r2 == r1 + 1:
+                    lo1, hi1 = self._x(r1, a1) - 0.5, self._x(r1, b1) + 0.5
+                    lo2, hi2 = self._x(r2, a2) - 0.5, self._x(r2, b2) + 0.5
+                    if lo1 <= hi2 and lo2 <= hi1:
+                        parent[find(i)] = find(j)
+
+        groups: Dict[int, List[Tuple[int, int]]] = {}
+        for i, (r, a, b) in enumerate(runs):
+            groups.setdefault(find(i), []).extend((r, p) for p in range(a, b + 1))
+        if len(groups) > 1:
+            # Flag everyone outside the largest group
+            largest = max(groups.values(), key=len)
+            stray = sorted(s for group in groups.values() if group is not largest for s in group)
+            findings.append(Finding('islands', f'{part} is split into {len(groups)} separate groups',
+                                    stray))
+        return findings
+
+    def _check_sight_line(self, r: int, p: int) -> List[Finding]:
+        """sight_line: the singer at (r, p) is taller than someone directly behind."""
+        if not 0 <= r < len(self.chart) or not 0 <= p < len(self.chart[r]):
+            return []
+        front = self.chart[r][p].singer
+        if front is None or front.height is None:
+            return []
+        findings = []
+        for q in self._overlapping(r, p, r - 1):
+            behind = self.chart[r - 1][q].singer
+            if behind is not None and behind.height is not None \
+                    and front.height - behind.height > SIGHT_LINE_TOLERANCE:
+                findings.append(Finding(
+                    'sight_line',
+                    f'{front.name} ({self._label(r, p)}) is taller than '
+                    f'{behind.name} behind them',
+                    [(r, p), (r - 1, q)]))
+        return findings
+
+    def _check_roster(self) -> List[Finding]:
+        """unplaced: roster singers who are not in the chart."""
+        if self.roster is None:
+            return []
+        placed = Counter(seat.singer.name for row in self.chart for seat in row
+                         if seat.singer is not None)
+        missing = sorted((self.roster - placed).elements())
+        if not missing:
+            return []
+        return [Finding('unplaced', f'Not placed: {", ".join(missing)}', severity='error')]
+
+
+def lint_chart(chart: List[List[Seat]], roster: Optional[Iterable[str]] = None) -> List[Finding]:
+    """Lint a chart once. `roster` is the names of every singer who should be placed."""
+    return ChartLinter(chart, roster).findings
+
+
+class UnknownLinterError(KeyError):
+    """Raised when a linter id is unknown or has been evicted."""
+
+
+class LinterRegistry:
+    """Linters for open editors, so each edit only re-checks what it changed."""
+
+    def __init__(self, max_linters: int = MAX_LINTERS):
+        self.max_linters = max_linters
+        self._linters: 'OrderedDict[str, ChartLinter]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def create(self, chart: List[List[Seat]],
+               roster: Optional[Iterable[str]] = None) -> Tuple[str, List[Finding]]:
+        """Start linting a chart. Returns the linter id and the initial findings."""
+        linter = ChartLinter(chart, roster)
+        linter_id = uuid.uuid4().hex
+        with self._lock:
+            self._linters[linter_id] = linter
+            while len(self._linters) > self.max_linters:
+                self._linters.popitem(last=False)
+        return linter_id, linter.findings
+
+    def apply(self, linter_id: str, ops: List[dict]) -> List[Finding]:
+        """Apply edit operations to a linter's chart and return the updated findings."""
+        with self._lock:
+            if linter_id not in self._linters:
+                raise UnknownLinterError(linter_id)
+            self._linters.move_to_end(linter_id)
+            linter = self._linters[linter_id]
+            for op in ops:
+                linter.apply(op)
+            return linter.findings
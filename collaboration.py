@@ -0,0 +1,377 @@
+"""
+Live collaborative editing of a chart.
+
+Every shared chart gets a ChartSession holding the authoritative chart, a
+version number and a short log of recent operations. All sessions live in a
+CollaborationHub that runs on a single asyncio event loop: operations are
+applied one at a time in arrival order, so no locking is needed, and every
+accepted operation is broadcast to the chart's subscribers.
+
+Operations use the same format as chart_history.py. Each client sends the
+last version it has seen along with its operation. If any operation accepted
+since then touched one of the same seats, the two moves conflict: the first
+one wins and the late one is rejected. Operations on different seats commute
+and are always accepted. Clients apply their own operations optimistically
+and keep them as pending until the server confirms or rejects them; remote
+operations are applied underneath the pending ones, so every replica
+converges to the server's order.
+
+Sessions are kept in memory, so the hub bounds itself like the linter
+registry: sessions idle for SESSION_IDLE_SECONDS are dropped, and past
+MAX_SESSIONS the least recently used go first. A session with an editor
+still subscribed is never dropped.
+
+The hub does not know about HTTP; app.py bridges it to SSE + POST routes.
+Run this module directly to simulate concurrent clients locally.
+"""
+
+import asyncio
+import copy
+import secrets
+import threading
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from chart_history import apply_operation, invert_operation
+from name_index import SingerSearchIndex
+from seating_algorithm import Seat
+
+# Operations older than this are forgotten; clients further behind must resync.
+OP_LOG_SIZE = 500
+# Most matches returned by a singer search
+SEARCH_LIMIT = 20
+# Shared charts kept in memory; idle ones are dropped, then the least recently used
+MAX_SESSIONS = 256
+SESSION_IDLE_SECONDS = 12 * 60 * 60
+
+
+def operation_seats(op: dict) -> Set[Tuple[int, int]]:
+    """Return the (row, position) seats an operation touches."""
+    if op['type'] == 'swap':
+        return {tuple(op['a']), tuple(op['b'])}
+    if op['type'] == 'set_part':
+        return {tuple(op['seat'])}
+    raise ValueError(f"Unknown operation type: {op['type']}")
+
+
+def clean_operation(op: dict, chart: List[List[Seat]], parts: List[str]) -> dict:
+    """
+    Check an operation from a client and return a copy with only known keys.
+
+    Seats must be [row, position] pairs inside the chart, and a set_part's
+    parts must be strings from `parts` (any string when `parts` is empty).
+    Raises ValueError for anything else, so nothing unchecked is applied or
+    broadcast to other editors.
+    """
+    if not isinstance(op, dict):
+        raise ValueError('Operation must be an object')
+
+    def seat(value) -> List[int]:
+        if (not isinstance(value, list) or len(value) != 2
+                or not all(type(v) is int for v in value)):
+            raise ValueError(f'Invalid seat: {value!r}')
+        row, pos = value
+        if not (0 <= row < len(chart) and 0 <= pos < len(chart[row])):
+            raise ValueError(f'Seat out of range: row {row}, seat {pos}')
+        return [row, pos]
+
+    def part(value) -> str:
+        if not isinstance(value, str) or (parts and value not in parts):
+            raise ValueError(f'Unknown voice part: {value!r}')
+        return value
+
+    if op.get('type') == 'swap':
+        return {'type': 'swap', 'a': seat(op.get('a')), 'b': seat(op.get('b'))}
+    if op.get('type') == 'set_part':
+        return {'type': 'set_part', 'seat': seat(op.get('seat')),
+                'old': part(op.get('old')), 'new': part(op.get('new'))}
+    raise ValueError(f"Unknown operation type: {op.get('type')!r}")
+
+
+class UnknownChartError(KeyError):
+    """Raised when a chart id does not match any shared session."""
+
+
+@dataclass
+class ChartSession:
+    """Authoritative state of one shared chart."""
+    chart: List[List[Seat]]
+    meta: dict = field(default_factory=dict)  # Display settings for the editor
+    version: int = 0
+    log: deque = field(default_factory=lambda: deque(maxlen=OP_LOG_SIZE))
+    # Singer search by seat, built on first use and updated as operations land
+    search_index: Optional[SingerSearchIndex] = field(default=None, repr=False)
+    last_used: float = 0.0
+
+    def submit(self, op: dict, base_version: int, client_id: str = '',
+               op_id: Optional[int] = None) -> dict:
+        """
+        Apply an operation made against `base_version` of the chart.
+
+        `op_id` is the client's own number for the operation, echoed in the
+        broadcast event so the client can match it to its pending entry.
+        Returns a result dict with `accepted` and the current `version`.
+        Raises ValueError for a malformed operation (see clean_operation).
+        """
+        op = clean_operation(op, self.chart, self.meta.get('part_order') or [])
+        seats = operation_seats(op)
+
+        if not self.covers(base_version):
+            # Too far behind to check for conflicts; the client must reload
+            return {'accepted': False, 'version': self.version, 'client_id': client_id}
+
+        for event in self.log:
+            if event['version'] <= base_version:
+                continue
+            # A client's own earlier operations are already applied on its replica
+            if client_id and event['client_id'] == client_id:
+                continue
+            if seats & operation_seats(event['op']):
+                return {'accepted': False, 'version': self.version, 'client_id': client_id}
+
+        apply_operation(self.chart, op)
+        if self.search_index is not None:
+            for row, pos in seats:
+                self._index_seat(self.chart[row][pos])
+        self.version += 1
+        self.log.append({'version': self.version, 'op': op, 'client_id': client_id,
+                         'op_id': op_id})
+        return {'accepted': True, 'version': self.version, 'client_id': client_id}
+
+    def covers(self, version: int) -> bool:
+        """Whether every operation after `version` is still in the log."""
+        oldest = self.log[0]['version'] if self.log else self.version + 1
+        return oldest - 1 <= version <= self.version
+
+    def events_since(self, version: int) -> List[dict]:
+        """Return broadcast events for every logged operation after `version`."""
+        return [event for event in self.log if event['version'] > version]
+
+    def find_singers(self, query: str, limit: int = SEARCH_LIMIT) -> List[dict]:
+        """Return singers whose name or part matches `query`, with their current seats."""
+        if self.search_index is None:
+            self.search_index = SingerSearchIndex()
+            for row in self.chart:
+                for seat in row:
+                    self._index_seat(seat)
+        matches = []
+        for row, pos in self.search_index.search(query, limit):
+            singer = self.chart[row][pos].singer
+            matches.append({'name': singer.name, 'voice_part': singer.voice_part,
+                            'seat': [row, pos]})
+        return matches
+
+    def _index_seat(self, seat: Seat) -> None:
+        key = (seat.row, seat.position)
+        if seat.singer is None:
+            self.search_index.remove(key)
+        else:
+            self.search_index.add(key, seat.singer.name, seat.singer.voice_part)
+
+
+class CollaborationHub:
+    """
+    Registry of shared chart sessions and their subscribers.
+
+    All methods must be called from the hub's event loop thread.
+    """
+
+    def __init__(self, max_sessions: int = MAX_SESSIONS,
+                 idle_seconds: float = SESSION_IDLE_SECONDS,
+                 clock: Callable[[], float] = time.monotonic):
+        # Least recently used first
+        self.sessions: 'OrderedDict[str, ChartSession]' = OrderedDict()
+        self.subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self.max_sessions = max_sessions
+        self.idle_seconds = idle_seconds
+        self.clock = clock
+
+    def get_session(self, chart_id: str) -> ChartSession:
+        self._evict()
+        if chart_id not in self.sessions:
+            raise UnknownChartError(chart_id)
+        session = self.sessions[chart_id]
+        session.last_used = self.clock()
+        self.sessions.move_to_end(chart_id)
+        return session
+
+    async def create_session(self, chart: List[List[Seat]], meta: Optional[dict] = None) -> str:
+        """Start sharing a chart. Returns the new chart id."""
+        chart_id = secrets.token_urlsafe(8)
+        self.sessions[chart_id] = ChartSession(chart=chart, meta=meta or {},
+                                               last_used=self.clock())
+        self.subscribers[chart_id] = set()
+        self._evict()
+        return chart_id
+
+    def _evict(self) -> None:
+        """Drop idle sessions, then the least recently used beyond max_sessions."""
+        cutoff = self.clock() - self.idle_seconds
+        excess = len(self.sessions) - self.max_sessions
+        for chart_id in list(self.sessions):
+            session = self.sessions[chart_id]
+            if excess <= 0 and session.last_used >= cutoff:
+                break  # Everything after this was used more recently
+            if self.subscribers.get(chart_id):
+                continue  # Someone still has it open
+            del self.sessions[chart_id]
+            self.subscribers.pop(chart_id, None)
+            excess -= 1
+
+    async def snapshot(self, chart_id: str) -> Tuple[List[List[Seat]], dict, int]:
+        """Return a copy of the chart, its display settings and its version."""
+        session = self.get_session(chart_id)
+        return copy.deepcopy(session.chart), dict(session.meta), session.version
+
+    async def subscribe(self, chart_id: str, since: Optional[int] = None) -> asyncio.Queue:
+        """
+        Return a queue that receives every accepted operation for the chart.
+
+        If `since` is given, operations after that version are queued first so
+        a reconnecting client does not miss any. If they have already been
+        dropped from the log, a single {"resync": True} event is queued instead.
+        """
+        session = self.get_session(chart_id)
+        queue = asyncio.Queue()
+        if since is not None:
+            if session.covers(since):
+                for event in session.events_since(since):
+                    queue.put_nowait(event)
+            else:
+                queue.put_nowait({'resync': True, 'version': session.version})
+        self.subscribers[chart_id].add(queue)
+        return queue
+
+    async def find_singers(self, chart_id: str, query: str,
+                           limit: int = SEARCH_LIMIT) -> List[dict]:
+        """Search a shared chart's singers by name or part."""
+        return self.get_session(chart_id).find_singers(query, limit)
+
+    def unsubscribe(self, chart_id: str, queue: asyncio.Queue) -> None:
+        self.subscribers.get(chart_id, set()).discard(queue)
+        # Idle time counts from the last viewer leaving, so a reconnect still finds it
+        if chart_id in self.sessions:
+            self.sessions[chart_id].last_used = self.clock()
+            self.sessions.move_to_end(chart_id)
+
+    async def submit(self, chart_id: str, op: dict, base_version: int,
+                     client_id: str = '', op_id: Optional[int] = None) -> dict:
+        """Apply an operation and broadcast it to subscribers if accepted."""
+        session = self.get_session(chart_id)
+        result = session.submit(op, base_version, client_id, op_id)
+        if result['accepted']:
+            event = session.log[-1]
+            for queue in self.subscribers[chart_id]:
+                queue.put_nowait(event)
+        return result
+
+
+def start_background_loop() -> asyncio.AbstractEventLoop:
+    """Run a new event loop in a daemon thread, for use from sync (WSGI) code."""
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, name='collaboration-hub', daemon=True)
+    thread.start()
+    return loop
+
+
+class SimulatedClient:
+    """
+    An editor replica that follows the client protocol used by edit.html.
+
+    The replica is the last confirmed server state with this client's pending
+    operations applied on top. Remote operations are applied underneath the
+    pending ones; rejected operations are dropped.
+    """
+
+    def __init__(self, hub: CollaborationHub, chart_id: str, chart: List[List[Seat]],
+                 client_id: str, version: int = 0):
+        self.hub = hub
+        self.chart_id = chart_id
+        self.chart = chart
+        self.client_id = client_id
+        self.version = version
+        self.pending: List[dict] = []
+
+    def _rewind(self) -> None:
+        for op in reversed(self.pending):
+            apply_operation(self.chart, invert_operation(op))
+
+    def _replay(self) -> None:
+        for op in self.pending:
+            apply_operation(self.chart, op)
+
+    async def edit(self, op: dict) -> bool:
+        """Apply an operation locally and send it. Returns whether it was accepted."""
+        apply_operation(self.chart, op)
+        self.pending.append(op)
+        result = await self.hub.submit(self.chart_id, op, self.version, self.client_id)
+        if not result['accepted']:
+            self._rewind()
+            self.pending.remove(op)
+            self._replay()
+        return result['accepted']
+
+    def receive(self, event: dict) -> None:
+        """Handle a broadcast event."""
+        self.version = event['version']
+        if event['client_id'] == self.client_id:
+            self.pending.pop(0)  # Our own operation, already applied
+            return
+        self._rewind()
+        apply_operation(self.chart, event['op'])
+        self._replay()
+
+
+async def simulate_clients(num_clients: int = 24, ops_per_client: int = 50,
+                           seed: int = 0) -> Tuple[bool, int]:
+    """
+    Simulate concurrent editors making random swaps on one shared chart.
+
+    Returns (converged, rejected): whether every replica ended up identical
+    to the server's chart, and how many operations were rejected as conflicts.
+    """
+    import random
+    from seating_algorithm import generate_random_roster, generate_seating_chart
+
+    rng = random.Random(seed)
+    parts = ['Soprano', 'Alto', 'Tenor', 'Bass']
+    singers = generate_random_roster(60, parts, seed=seed)
+    chart = generate_seating_chart(singers, 5, 14, parts)
+    hub = CollaborationHub()
+    chart_id = await hub.create_session(copy.deepcopy(chart))
+    seats = [(r, p) for r, row in enumerate(chart) for p in range(len(row))]
+    rejected = 0
+
+    async def run(client: SimulatedClient, queue: asyncio.Queue) -> None:
+        nonlocal rejected
+        for _ in range(ops_per_client):
+            a, b = rng.sample(seats, 2)
+            if not await client.edit({'type': 'swap', 'a': list(a), 'b': list(b)}):
+                rejected += 1
+            await asyncio.sleep(0)
+            # Drain only part of the backlog so clients lag behind each other
+            for _ in range(rng.randint(0, queue.qsize())):
+                client.receive(queue.get_nowait())
+
+    # Subscribe everyone before editing starts so each replica sees every event
+    clients = []
+    for i in range(num_clients):
+        queue = await hub.subscribe(chart_id)
+        clients.append((SimulatedClient(hub, chart_id, copy.deepcopy(chart), f'client-{i}'), queue))
+    await asyncio.gather(*(run(client, queue) for client, queue in clients))
+
+    server_chart = hub.get_session(chart_id).chart
+    converged = True
+    for client, queue in clients:
+        while not queue.empty():
+            client.receive(queue.get_nowait())
+        converged &= client.chart == server_chart and not client.pending
+    return converged, rejected
+
+
+if __name__ == '__main__':
+    converged, rejected = asyncio.run(simulate_clients())
+    print(f"{'All replicas converged' if converged else 'Replicas diverged'} "
+          f"({rejected} conflicting operations rejected)")
@@ -0,0 +1,196 @@
+"""
+Multi-piece concert planning.
+
+A concert has several pieces, each with its own part split and layout
+(SATB, SSAATTBB, men only, ...). This module produces one chart per piece
+and keeps singers as close as possible to where they sat in the previous
+piece, so there is as little shuffling between pieces as possible.
+
+Each piece's part sections come from generate_seating_chart as usual. Within
+a section, any singer of that part can take any seat, so the choice of who
+sits where is solved as a minimum-cost assignment: the cost of a seat is the
+distance from the singer's previous seat plus a height penalty that keeps
+taller singers toward the back.
+"""
+
+from dataclasses import dataclass, field, replace
+from typing import Dict, List, Optional, Tuple
+
+from assignment import solve_assignment
+from seating_algorithm import (
+    Seat, Singer, generate_seating_chart, calculate_dimensions_with_user_input,
+    calculate_min_width
+)
+
+# Cost of one inch of height difference from the seat's default occupant,
+# relative to moving one seat. Higher values favor height order over staying put.
+DEFAULT_HEIGHT_WEIGHT = 0.25
+
+
+@dataclass
+class PieceConfig:
+    """Seating configuration for one piece."""
+    name: str
+    part_order: List[str]
+    layout: str = "side-by-side"
+    rows: Optional[int] = None
+    max_per_row: Optional[int] = None
+    row_sizes: Optional[List[int]] = None
+    # Roster part -> part for this piece (e.g. "Soprano 1" -> "Soprano").
+    # Roster parts not listed keep their own name.
+    part_map: Dict[str, str] = field(default_factory=dict)
+    # Singer name -> part for this piece, overriding part_map
+    assignments: Dict[str, str] = field(default_factory=dict)
+
+
+@dataclass
+class ConcertPlan:
+    """Charts for every piece, with the movement between consecutive pieces."""
+    pieces: List[PieceConfig]
+    charts: List[List[List[Seat]]]
+    # Per piece: singers not in the seat they last sat in, and total seats travelled
+    moves: List[int]
+    distances: List[float]
+    # Per piece: roster singers whose part is not in that piece, so they sit it out
+    sitting_out: List[List[str]] = field(default_factory=list)
+
+    @property
+    def total_moves(self) -> int:
+        return sum(self.moves)
+
+
+def plan_concert(
+    singers: List[Singer],
+    pieces: List[PieceConfig],
+    height_weight: float = DEFAULT_HEIGHT_WEIGHT
+) -> ConcertPlan:
+    """
+    Generate a chart for each piece, minimizing movement between pieces.
+
+    Singers whose part for a piece is not in that piece's part_order sit it
+    out (listed in ConcertPlan.sitting_out); when they come back they are
+    placed near where they last sat. Singers in a chart are copies with
+    voice_part set to the piece part.
+
+    Args:
+        singers: The full roster
+        pieces: Piece configurations in concert order
+        height_weight: Cost per inch of height mismatch (see DEFAULT_HEIGHT_WEIGHT)
+
+    Returns:
+        ConcertPlan with one chart per piece
+
+    Raises:
+        ValueError: if a piece's rows cannot hold everyone singing it
+    """
+    charts = []
+    moves = []
+    distances = []
+    sitting_out = []
+    # Roster index -> coordinates of the singer's seat in the last piece they sang
+    previous: Dict[int, Tuple[float, float]] = {}
+
+    for piece in pieces:
+        cast = _piece_cast(singers, piece)
+        singing = {idx for idx, _ in cast}
+        sitting_out.append([s.name for idx, s in enumerate(singers) if idx not in singing])
+        try:
+            chart = _generate_piece_chart([s for _, s in cast], piece)
+        except ValueError as e:
+            raise ValueError(f'{piece.name}: {e}') from e
+        if previous:
+            _reassign_seats(chart, cast, previous, height_weight)
+
+        current = {}
+        roster_index = {id(s): idx for idx, s in cast}
+        for r, row in enumerate(chart):
+            for seat in row:
+                if seat.singer is not None:
+                    current[roster_index[id(seat.singer)]] = _seat_coordinates(chart, r, seat.position)
+
+        moved = [_distance(previous[idx], pos) for idx, pos in current.items()
+                 if idx in previous]
+        moves.append(sum(1 for d in moved if d > 0))
+        distances.append(sum(moved))
+        charts.append(chart)
+        previous.update(current)
+
+    return ConcertPlan(pieces=pieces, charts=charts, moves=moves, distances=distances,
+                       sitting_out=sitting_out)
+
+
+def _piece_cast(singers: List[Singer], piece: PieceConfig) -> List[Tuple[int, Singer]]:
+    """Return (roster index, singer copy with piece part) for everyone singing the piece."""
+    parts = set(piece.part_order)
+    cast = []
+    for idx, singer in enumerate(singers):
+        part = piece.assignments.get(singer.name,
+                                     piece.part_map.get(singer.voice_part, singer.voice_part))
+        if part in parts:
+            cast.append((idx, replace(singer, voice_part=part)))
+    return cast
+
+
+def _generate_piece_chart(singers: List[Singer], piece: PieceConfig) -> List[List[Seat]]:
+    """Generate a piece's chart the same way the app does for a single chart."""
+    if piece.row_sizes:
+        return generate_seating_chart(singers, len(piece.row_sizes), max(piece.row_sizes),
+                                      piece.part_order, piece.layout, piece.row_sizes)
+
+    rows, seats_per_row = calculate_dimensions_with_user_input(
+        len(singers), len(piece.part_order), piece.layout, piece.rows, piece.max_per_row
+    )
+    seats_per_row = max(seats_per_row,
+                        calculate_min_width(singers, piece.part_order, rows, piece.layout))
+    return generate_seating_chart(singers, rows, seats_per_row, piece.part_order, piece.layout)
+
+
+def _reassign_seats(
+    chart: List[List[Seat]],
+    cast: List[Tuple[int, Singer]],
+    previous: Dict[int, Tuple[float, float]],
+    height_weight: float
+) -> None:
+    """Reassign singers to seats within each part so they move as little as possible."""
+    roster_index = {id(s): idx for idx, s in cast}
+    seats_by_part: Dict[str, List[Seat]] = {}
+    for row in chart:
+        for seat in row:
+            if seat.singer is not None:
+                seats_by_part.setdefault(seat.singer.voice_part, []).append(seat)
+
+    for part_seats in seats_by_part.values():
+        part_singers = [seat.singer for seat in part_seats]
+        coords = [_seat_coordinates(chart, seat.row, seat.position) for seat in part_seats]
+        # The generated chart's occupant of each seat sets its target height
+        target_heights = [singer.height for singer in part_singers]
+
+        cost = []
+        for singer in part_singers:
+            prev = previous.get(roster_index[id(singer)])
+            row_cost = []
+            for pos, target in zip(coords, target_heights):
+                c = _distance(prev, pos) if prev is not None else 0.0
+                if singer.height is not None and target is not None:
+                    c += height_weight * abs(singer.height - target)
+                row_cost.append(c)
+            cost.append(row_cost)
+
+        for singer_idx, seat_idx in enumerate(solve_assignment(cost)):
+            part_seats[seat_idx].singer = part_singers[singer_idx]
+
+
+def _seat_coordinates(chart: List[List[Seat]], row: int, position: int) -> Tuple[float, float]:
+    """
+    Return (x, y) for a seat, comparable across charts of different sizes.
+
+    x is measured from the center of the row and y from the front row, so the
+    same physical spot on the risers gets the same coordinates in every piece.
+    """
+    row_width = len(chart[row])
+    return position - (row_width - 1) / 2, len(chart) - 1 - row
+
+
+def _distance(a: Tuple[float, float], b: Tuple[float, float]) -> float:
+    """Seats travelled between two coordinates (rows and seats both count as one)."""
+    return abs(a[0] - b[0]) + abs(a[1] - b[1])
@@ -0,0 +1,119 @@
+"""
+Massed choirs: several ensembles (e.g. school choirs at a festival) combined
+into one chart.
+
+Rosters are combined by tagging every singer with their ensemble; the chart
+itself comes from generate_seating_chart with an ensemble order, which keeps
+each ensemble in its own block within every part.
+
+Each ensemble's conductor gets a view of the massed chart showing only their
+singers. Views are taken from the finished chart in one pass, without
+regenerating, and keep the massed chart's shape, so row and seat numbers on a
+conductor's sub-chart are the ones their singers will actually sit in.
+"""
+
+from dataclasses import dataclass, field, replace
+from typing import Dict, List, Optional, Set, Tuple
+
+from seating_algorithm import Seat, Singer
+
+
+@dataclass
+class EnsembleView:
+    """One ensemble's singers in a massed chart."""
+    ensemble: str
+    seats: List[Seat]           # This ensemble's occupied seats, back row first
+    rows: int                   # Shape of the massed chart
+    row_sizes: List[int]
+    # (row, position) of the massed chart's blocked and accessible seats
+    blocked_seats: Set[Tuple[int, int]] = field(default_factory=set)
+    accessible_seats: Set[Tuple[int, int]] = field(default_factory=set)
+
+    @property
+    def size(self) -> int:
+        return len(self.seats)
+
+    def sub_chart(self) -> List[List[Seat]]:
+        """
+        The massed chart with everyone else's seats left empty.
+
+        Empty seats keep their blocked and accessible flags. Seats are copies,
+        so editing the sub-chart never touches the massed chart.
+        """
+        chart = [[Seat(row=r, position=p, blocked=(r, p) in self.blocked_seats,
+                       accessible=(r, p) in self.accessible_seats)
+                  for p in range(size)]
+                 for r, size in enumerate(self.row_sizes)]
+        for seat in self.seats:
+            chart[seat.row][seat.position] = replace(seat)
+        return chart
+
+
+def combine_rosters(rosters: Dict[str, List[Singer]]) -> List[Singer]:
+    """
+    Merge ensemble rosters into one, tagging each singer with their ensemble.
+
+    The input singers are left unchanged. A singer who already has an
+    ensemble (e.g. from an uploaded roster's ensemble column) keeps it.
+    """
+    combined = []
+    for ensemble, singers in rosters.items():
+        for singer in singers:
+            combined.append(replace(singer, ensemble=singer.ensemble or ensemble,
+                                    tags=list(singer.tags),
+                                    keep_apart=list(singer.keep_apart)))
+    return combined
+
+
+def ensemble_views(chart: List[List[Seat]]) -> Dict[str, EnsembleView]:
+    """
+    Split a massed chart into one view per ensemble, in first-seen order.
+
+    Singers without an ensemble are not in any view.
+    """
+    rows = len(chart)
+    row_sizes = [len(row) for row in chart]
+    # Shared by every view and filled in as the chart is read
+    blocked, accessible = set(), set()
+    views: Dict[str, EnsembleView] = {}
+    for row in chart:
+        for seat in row:
+            if seat.blocked:
+                blocked.add((seat.row, seat.position))
+            if seat.accessible:
+                accessible.add((seat.row, seat.position))
+            if seat.singer is None or not seat.singer.ensemble:
+                continue
+            view = views.get(seat.singer.ensemble)
+            if view is None:
+                view = views[seat.singer.ensemble] = EnsembleView(
+                    ensemble=seat.singer.ensemble, seats=[], rows=rows, row_sizes=row_sizes,
+                    blocked_seats=blocked, accessible_seats=accessible)
+            view.seats.append(seat)
+    return views
+
+
+def extract_ensemble(chart: List[List[Seat]], ensemble: str) -> Optional[List[List[Seat]]]:
+    """One ensemble's sub-chart, or None if none of its singers are in the chart."""
+    view = ensemble_views(chart).get(ensemble)
+    return view.sub_chart() if view is not None else None
+
+
+if __name__ == '__main__':
+    import time
+
+    from seating_algorithm import calculate_min_width, generate_random_roster, generate_seating_chart
+
+    parts = ['Soprano', 'Alto', 'Tenor', 'Bass']
+    schools = [f'School {i + 1}' for i in range(12)]
+    rosters = {school: generate_random_roster(250, parts, seed=i)
+               for i, school in enumerate(schools)}
+    singers = combine_rosters(rosters)
+    start = time.perf_counter()
+    rows = 20
+    width = calculate_min_width(singers, parts, rows, ensemble_order=schools)
+    chart = generate_seating_chart(singers, rows, width, parts, ensemble_order=schools)
+    placed = time.perf_counter()
+    views = ensemble_views(chart)
+    print(f'{len(singers)} singers in {rows}x{width}: placed in {placed - start:.3f}s, '
+          f'{len(views)} views in {time.perf_counter() - placed:.3f}s')
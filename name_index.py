@@ -0,0 +1,158 @@
+"""
+Name normalization and trigram index for matching singer names.
+
+Names are compared after normalization ("Patel, Priya" and "priya  PATEL"
+are the same name; accents and punctuation are ignored). Fuzzy matching uses
+trigram overlap: each name is split into overlapping three-letter pieces and
+an inverted index maps each piece to the names that contain it, so finding
+similar names only looks at names that share a piece instead of comparing
+every pair.
+
+SingerSearchIndex builds on both for type-ahead search: prefix matching on
+the words of each singer's name and part, with trigram matching as the
+fallback for typos.
+"""
+
+import re
+import unicodedata
+from bisect import bisect_left, insort
+from collections import defaultdict
+from typing import Dict, Generic, Hashable, List, Set, Tuple, TypeVar
+
+Key = TypeVar('Key', bound=Hashable)
+
+
+def normalize_name(name: str) -> str:
+    """Lowercase, strip accents and punctuation, and put "Last, First" in first-last order."""
+    if name.count(',') == 1:
+        last, first = name.split(',')
+        name = f'{first} {last}'
+    decomposed = unicodedata.normalize('NFKD', name)
+    ascii_name = ''.join(c for c in decomposed if not unicodedata.combining(c))
+    return ' '.join(re.sub(r"[^\w\s]", '', ascii_name.lower()).split())
+
+
+def trigrams(text: str) -> Set[str]:
+    """Overlapping three-character pieces of `text`, padded so word starts count."""
+    padded = f'  {text} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TrigramIndex(Generic[Key]):
+    """Inverted trigram index from normalized text to caller-supplied keys."""
+
+    def __init__(self):
+        self._postings: Dict[str, Set[Key]] = defaultdict(set)
+        self._grams: Dict[Key, Set[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._grams)
+
+    def add(self, key: Key, text: str) -> None:
+        grams = trigrams(normalize_name(text))
+        self._grams[key] = grams
+        for gram in grams:
+            self._postings[gram].add(key)
+
+    def remove(self, key: Key) -> None:
+        for gram in self._grams.pop(key, ()):
+            self._postings[gram].discard(key)
+
+    def search(self, text: str, min_similarity: float = 0.0,
+               limit: int = 10) -> List[Tuple[Key, float]]:
+        """
+        Return up to `limit` (key, similarity) pairs, best first.
+
+        Similarity is the Dice coefficient of the two trigram sets: 1.0 for
+        identical names, 0.0 for names with no piece in common.
+        """
+        grams = trigrams(normalize_name(text))
+        shared: Dict[Key, int] = defaultdict(int)
+        for gram in grams:
+            for key in self._postings.get(gram, ()):
+                shared[key] += 1
+        scored = []
+        for key, count in shared.items():
+            similarity = 2 * count / (len(grams) + len(self._grams[key]))
+            if similarity >= min_similarity:
+                scored.append((key, similarity))
+        scored.sort(key=lambda item: -item[1])
+        return scored[:limit]
+
+
+class SingerSearchIndex(Generic[Key]):
+    """
+    Type-ahead search over singer names and voice parts.
+
+    Every word of each entry's name and part goes into one sorted token
+    list, so a query is a binary search for its first word followed by a
+    walk over the tokens that start with it. Each keystroke therefore costs
+    the log of the chart size plus the matches found, not a scan of the
+    chart. Queries that match no prefix fall back to the trigram index, so
+    "priya patle" still finds Priya Patel.
+
+    Build it once per chart and keep it current with add/remove (adding an
+    existing key replaces its entry).
+    """
+
+    def __init__(self):
+        self._tokens: List[Tuple[str, int]] = []  # (token, entry id), sorted
+        self._entries: Dict[int, Tuple[Key, List[str]]] = {}
+        self._ids: Dict[Key, int] = {}
+        self._next_id = 0
+        self._fuzzy: TrigramIndex[Key] = TrigramIndex()
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def add(self, key: Key, name: str, part: str = '') -> None:
+        self.remove(key)
+        entry_id = self._next_id
+        self._next_id += 1
+        words = sorted(set(normalize_name(name).split()) | set(normalize_name(part).split()))
+        self._entries[entry_id] = (key, words)
+        self._ids[key] = entry_id
+        for word in words:
+            insort(self._tokens, (word, entry_id))
+        self._fuzzy.add(key, name)
+
+    def remove(self, key: Key) -> None:
+        entry_id = self._ids.pop(key, None)
+        if entry_id is None:
+            return
+        _, words = self._entries.pop(entry_id)
+        for word in words:
+            i = bisect_left(self._tokens, (word, entry_id))
+            del self._tokens[i]
+        self._fuzzy.remove(key)
+
+    def search(self, query: str, limit: int = 20, min_similarity: float = 0.5) -> List[Key]:
+        """
+        Return up to `limit` keys matching `query`.
+
+        Every word of the query must start a word of the entry's name or
+        part ("pri pat", "sop 1"). Prefix matches come back in alphabetical
+        order of the matched word; if there are none, names at least
+        `min_similarity` similar to the query are returned, best first.
+        """
+        words = normalize_name(query).split()
+        if not words or limit <= 0:
+            return []
+        first, rest = words[0], words[1:]
+        found: List[Key] = []
+        seen: Set[int] = set()
+        i = bisect_left(self._tokens, (first, -1))
+        while i < len(self._tokens) and len(found) < limit:
+            token, entry_id = self._tokens[i]
+            if not token.startswith(first):
+                break
+            i += 1
+            if entry_id in seen:
+                continue
+            seen.add(entry_id)
+            key, entry_words = self._entries[entry_id]
+            if all(any(w.startswith(word) for w in entry_words) for word in rest):
+                found.append(key)
+        if found or len(' '.join(words)) < 3:
+            return found
+        return [key for key, _ in self._fuzzy.search(query, min_similarity, limit)]
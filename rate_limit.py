@@ -0,0 +1,210 @@
+"""
+Per-client rate limiting with token buckets.
+
+Each client gets one bucket per budget. A bucket holds up to `capacity`
+tokens and refills at `refill_rate` tokens per second; every request takes
+one token, and a request that finds the bucket empty is rejected with the
+number of seconds until a token is back. Routes are split into budgets by
+cost: cheap routes (editor updates, lookups) get a large, fast-refilling
+bucket, expensive ones (generating and rendering a chart, parsing uploads,
+building exports) a small one.
+
+Buckets live in memory by default, which is right for the single gunicorn
+process in render.yaml. With several worker processes, point the limiter at
+a SQLite file instead so every worker draws from the same buckets.
+"""
+
+import sqlite3
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Tuple
+
+# (tokens, last update time) for one bucket
+BucketState = Tuple[float, float]
+
+# Stored buckets are checked for pruning once every this many requests
+PRUNE_INTERVAL = 1000
+# Clients tracked individually in the rejection metrics
+TOP_CLIENTS = 20
+
+
+@dataclass(frozen=True)
+class Budget:
+    name: str
+    capacity: float      # Burst size: requests allowed back to back
+    refill_rate: float   # Tokens per second, i.e. sustained requests per second
+
+    @property
+    def refill_seconds(self) -> float:
+        """Time for an empty bucket to fill up again."""
+        return self.capacity / self.refill_rate
+
+
+@dataclass
+class Decision:
+    allowed: bool
+    remaining: int          # Whole tokens left after this request
+    retry_after: float = 0  # Seconds until the next request would be allowed
+
+
+class UnknownBudgetError(KeyError):
+    """Raised when a route asks for a budget the limiter does not have."""
+
+
+class MemoryBucketStore:
+    """Buckets for one process, shared by its threads."""
+
+    def __init__(self):
+        self._buckets: Dict[str, BucketState] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def update(self, key: str,
+               change: Callable[[Optional[BucketState]], BucketState]) -> BucketState:
+        """Replace a bucket's state with change(old state) atomically."""
+        with self._lock:
+            state = change(self._buckets.get(key))
+            self._buckets[key] = state
+            return state
+
+    def prune(self, before: float) -> None:
+        """Forget buckets not touched since `before` (they have refilled anyway)."""
+        with self._lock:
+            stale = [key for key, (_, updated) in self._buckets.items() if updated < before]
+            for key in stale:
+                del self._buckets[key]
+
+
+class SQLiteBucketStore:
+    """Buckets in a SQLite file, shared by every process that opens it."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute('CREATE TABLE IF NOT EXISTS buckets ('
+                         'key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)')
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # Autocommit mode; transactions are opened explicitly below
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+        return conn
+
+    def __len__(self) -> int:
+        return self._connect().execute('SELECT COUNT(*) FROM buckets').fetchone()[0]
+
+    def update(self, key: str,
+               change: Callable[[Optional[BucketState]], BucketState]) -> BucketState:
+        conn = self._connect()
+        # IMMEDIATE takes the write lock up front, so the read-modify-write is atomic
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('SELECT tokens, updated FROM buckets WHERE key = ?',
+                               (key,)).fetchone()
+            state = change(tuple(row) if row else None)
+            conn.execute('INSERT OR REPLACE INTO buckets (key, tokens, updated) VALUES (?, ?, ?)',
+                         (key, state[0], state[1]))
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        return state
+
+    def prune(self, before: float) -> None:
+        self._connect().execute('DELETE FROM buckets WHERE updated < ?', (before,))
+
+
+class LimiterMetrics:
+    """Counts of allowed and rejected requests, for the /metrics/limits route."""
+
+    def __init__(self):
+        self.allowed: Counter = Counter()    # By budget
+        self.rejected: Counter = Counter()   # By budget
+        self.too_large = 0                   # Request bodies over the size limit
+        self._clients: Counter = Counter()   # Rejections by client
+        self._lock = threading.Lock()
+
+    def record(self, budget: str, client: str, allowed: bool) -> None:
+        with self._lock:
+            if allowed:
+                self.allowed[budget] += 1
+                return
+            self.rejected[budget] += 1
+            self._clients[client] += 1
+            # Keep the per-client counts from growing without bound
+            if len(self._clients) > 50 * TOP_CLIENTS:
+                self._clients = Counter(dict(self._clients.most_common(TOP_CLIENTS)))
+
+    def record_too_large(self, client: str) -> None:
+        with self._lock:
+            self.too_large += 1
+            self._clients[client] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                'allowed': dict(self.allowed),
+                'rejected': dict(self.rejected),
+                'too_large': self.too_large,
+                'top_rejected_clients': self._clients.most_common(TOP_CLIENTS),
+            }
+
+
+class RateLimiter:
+    """Token-bucket limiter over named budgets."""
+
+    def __init__(self, budgets, store=None, clock: Callable[[], float] = time.time):
+        """
+        Args:
+            budgets: Budget objects; requests name the one they draw from
+            store: MemoryBucketStore (default) or SQLiteBucketStore
+            clock: Seconds since the epoch (wall-clock, so buckets in a shared
+                file mean the same thing to every process)
+        """
+        self.budgets: Dict[str, Budget] = {b.name: b for b in budgets}
+        self.store = store if store is not None else MemoryBucketStore()
+        self.clock = clock
+        self.metrics = LimiterMetrics()
+        self._requests = 0
+        self._lock = threading.Lock()
+
+    def take(self, client: str, budget_name: str, cost: float = 1) -> Decision:
+        """Take `cost` tokens from the client's bucket, if it has them."""
+        if budget_name not in self.budgets:
+            raise UnknownBudgetError(budget_name)
+        budget = self.budgets[budget_name]
+        now = self.clock()
+        decision = Decision(allowed=False, remaining=0)
+
+        def change(state: Optional[BucketState]) -> BucketState:
+            tokens, updated = state if state is not None else (budget.capacity, now)
+            # A clock that went backwards (another process, NTP) refills nothing
+            tokens = min(budget.capacity, tokens + max(0.0, now - updated) * budget.refill_rate)
+            if tokens >= cost:
+                tokens -= cost
+                decision.allowed = True
+            else:
+                decision.retry_after = (cost - tokens) / budget.refill_rate
+            decision.remaining = int(tokens)
+            # Keep the later timestamp, or the time the clock stepped back is refilled twice
+            return tokens, max(updated, now)
+
+        self.store.update(f'{budget.name}:{client}', change)
+        self.metrics.record(budget.name, client, decision.allowed)
+
+        with self._lock:
+            self._requests += 1
+            prune = self._requests % PRUNE_INTERVAL == 0
+        if prune:
+            longest = max(b.refill_seconds for b in self.budgets.values())
+            self.store.prune(now - longest)
+        return decision
+
@@ -0,0 +1,178 @@
+"""
+Seat geometry for riser layouts.
+
+Computes an (x, y, angle) for every seat from the row sizes and the riser
+shape, so the editor and the finalized chart draw curved and angled rows from
+the same coordinates instead of approximating them with CSS.
+
+Coordinates are in seat widths. x is measured from the center line (positive
+to the conductor's right as drawn), y from the front row toward the back, and
+angle is the seat's rotation in degrees (positive is clockwise on screen, so
+seats on the right turn to face the conductor). Results are cached per
+configuration.
+"""
+
+import math
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import List, Optional, Sequence, Tuple
+
+SHAPES = ('straight', 'arc', 'chevron')
+
+# Row depth relative to seat width, matching the on-screen seat proportions
+DEFAULT_ROW_DEPTH = 0.52
+# Widest angle any row of an arc may cover
+DEFAULT_ARC_DEGREES = 100.0
+# How far each wing of a chevron is angled forward
+DEFAULT_CHEVRON_DEGREES = 12.0
+# Extra space for an aisle, in seat widths
+DEFAULT_AISLE_WIDTH = 0.3
+
+# On-screen sizes used by the chart templates (see static/style.css)
+SEAT_WIDTH_PX = 120
+SEAT_HEIGHT_PX = 58
+SEAT_PITCH_PX = 128  # Seat width + gap
+
+
+@dataclass(frozen=True)
+class SeatPosition:
+    x: float
+    y: float
+    angle: float = 0.0
+
+
+def seat_positions(
+    row_sizes: Sequence[int],
+    shape: str = 'straight',
+    stagger_offsets: Optional[Sequence[bool]] = None,
+    aisle_after: Optional[int] = None,
+    row_depth: float = DEFAULT_ROW_DEPTH,
+    arc_degrees: float = DEFAULT_ARC_DEGREES,
+    chevron_degrees: float = DEFAULT_CHEVRON_DEGREES,
+    aisle_width: float = DEFAULT_AISLE_WIDTH
+) -> Tuple[Tuple[SeatPosition, ...], ...]:
+    """
+    Compute the position of every seat.
+
+    Args:
+        row_sizes: Seats per row, back to front (same order as the chart)
+        shape: "straight", "arc" or "chevron"
+        stagger_offsets: Optional per-row flags; flagged rows shift half a seat right
+        aisle_after: Optional seat position that starts after an aisle
+        row_depth: Distance between rows, in seat widths
+        arc_degrees: Widest angle covered by any arc row
+        chevron_degrees: Forward angle of each chevron wing
+        aisle_width: Width of the aisle, in seat widths
+
+    Returns:
+        Tuple of rows (back to front), each a tuple of SeatPosition
+    """
+    if shape not in SHAPES:
+        raise ValueError(f'Unknown riser shape: {shape}')
+    return _seat_positions(tuple(row_sizes), shape,
+                           tuple(stagger_offsets) if stagger_offsets else (),
+                           aisle_after, row_depth, arc_degrees, chevron_degrees, aisle_width)
+
+
+@lru_cache(maxsize=256)
+def _seat_positions(row_sizes, shape, stagger_offsets, aisle_after,
+                    row_depth, arc_degrees, chevron_degrees, aisle_width):
+    num_rows = len(row_sizes)
+    # Straight-line offsets from the center of each row, in seat widths
+    offsets = []
+    for r, width in enumerate(row_sizes):
+        raw = [p + (aisle_width if aisle_after and p >= aisle_after else 0.0)
+               for p in range(width)]
+        center = (raw[0] + raw[-1]) / 2 if raw else 0.0
+        shift = 0.5 if r < len(stagger_offsets) and stagger_offsets[r] else 0.0
+        offsets.append([x - center + shift for x in raw])
+
+    if shape == 'arc':
+        # Concentric arcs around the conductor. The front radius is chosen so
+        # that no row covers more than arc_degrees.
+        half_span = math.radians(arc_degrees) / 2
+        front_radius = 1.0
+        for r, row in enumerate(offsets):
+            if row:
+                depth = (num_rows - 1 - r) * row_depth
+                widest = max(abs(x) for x in row)
+                front_radius = max(front_radius, widest / half_span - depth)
+
+    rows = []
+    for r, row in enumerate(offsets):
+        depth = (num_rows - 1 - r) * row_depth
+        positions = []
+        for offset in row:
+            if shape == 'arc':
+                # Keep seats one seat width apart along the arc
+                radius = front_radius + depth
+                theta = offset / radius
+                positions.append(SeatPosition(
+                    x=radius * math.sin(theta),
+                    y=radius * math.cos(theta) - front_radius,
+                    angle=math.degrees(theta)
+                ))
+            elif shape == 'chevron':
+                wing = math.radians(chevron_degrees)
+                side = math.copysign(1.0, offset) if offset else 0.0
+                positions.append(SeatPosition(
+                    x=offset * math.cos(wing),
+                    y=depth - abs(offset) * math.sin(wing),
+                    angle=side * chevron_degrees
+                ))
+            else:
+                positions.append(SeatPosition(x=offset, y=depth))
+        rows.append(tuple(positions))
+    return tuple(rows)
+
+
+@dataclass(frozen=True)
+class ScreenLayout:
+    """Pixel positions for drawing a chart with absolutely positioned seats."""
+    width: float
+    height: float
+    # Per seat (back to front, left to right): (left, top, top when flipped, angle)
+    seats: Tuple[Tuple[Tuple[float, float, float, float], ...], ...]
+
+
+@lru_cache(maxsize=256)
+def screen_layout(row_sizes: Tuple[int, ...], shape: str,
+                  aisle_after: Optional[int] = None,
+                  stagger_offsets: Tuple[bool, ...] = ()) -> ScreenLayout:
+    """
+    Convert seat positions to pixel offsets for the chart templates.
+
+    Back rows are drawn at the top with the conductor below; the flipped view
+    puts the front row at the top and mirrors each seat's rotation. Rows
+    flagged in stagger_offsets shift half a seat, as in seat_positions.
+    """
+    rows = seat_positions(row_sizes, shape, stagger_offsets, aisle_after)
+    all_positions = [pos for row in rows for pos in row]
+    if not all_positions:
+        return ScreenLayout(width=0, height=0, seats=())
+
+    # Leave room for rotated seat corners
+    margin = SEAT_WIDTH_PX / 2
+    min_x = min(p.x for p in all_positions)
+    max_x = max(p.x for p in all_positions)
+    min_y = min(p.y for p in all_positions)
+    max_y = max(p.y for p in all_positions)
+    width = (max_x - min_x) * SEAT_PITCH_PX + SEAT_WIDTH_PX + 2 * margin
+    height = (max_y - min_y) * SEAT_PITCH_PX + SEAT_HEIGHT_PX + 2 * margin
+
+    seats = []
+    for row in rows:
+        row_seats = []
+        for p in row:
+            left = margin + (p.x - min_x) * SEAT_PITCH_PX
+            top = margin + (max_y - p.y) * SEAT_PITCH_PX
+            top_flipped = margin + (p.y - min_y) * SEAT_PITCH_PX
+            row_seats.append((round(left, 1), round(top, 1), round(top_flipped, 1),
+                              round(p.angle, 2)))
+        seats.append(tuple(row_seats))
+    return ScreenLayout(width=round(width, 1), height=round(height, 1), seats=tuple(seats))
+
+
+def chart_row_sizes(chart: List[list]) -> Tuple[int, ...]:
+    """Return the row sizes of an existing chart."""
+    return tuple(len(row) for row in chart)
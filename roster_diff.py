@@ -0,0 +1,342 @@
+"""
+Roster diffing and incremental chart updates.
+
+When next week's roster is uploaded, singers are matched against the roster
+the chart was built from: first by normalized name, then, for whoever is
+left, by fuzzy name match through a trigram index (so "Jon Smith" picks up
+"John Smith"'s seat). The result is a set of adds, removes and changes that
+is applied to the existing chart instead of regenerating it:
+
+- removed singers leave their seat; gaps left inside a section are closed by
+  sliding that section's singers in the row toward its middle
+- changed singers keep their seat, unless their part (or, in a massed
+  choir, their ensemble) changed, in which case they move like a new singer
+- new singers take an empty seat beside their part, in the row whose heights
+  suit them; in a massed choir, beside their own ensemble's block of that
+  part when it is in the chart. If there is no free seat there, one is added
+  to that row. In a
+  venue, whose rows, aisles and blocked seats are fixed, no seat is added:
+  the nearest free seat is used instead, and if there is none the singer is
+  reported as unplaced
+
+Everyone else stays where they were.
+"""
+
+from dataclasses import dataclass, field, fields
+from typing import Dict, List, Optional, Tuple
+
+from name_index import TrigramIndex, normalize_name
+from seating_algorithm import Seat, Singer
+
+# Minimum trigram similarity for two different spellings to be the same singer
+DEFAULT_MATCH_THRESHOLD = 0.75
+# Candidates considered per unmatched name
+FUZZY_CANDIDATES = 5
+
+
+@dataclass
+class SingerChange:
+    old: Singer
+    new: Singer
+    fields: List[str]  # Attributes that differ, e.g. ["voice_part", "height"]
+
+    @property
+    def renamed(self) -> bool:
+        return 'name' in self.fields
+
+
+@dataclass
+class RosterDiff:
+    added: List[Singer] = field(default_factory=list)
+    removed: List[Singer] = field(default_factory=list)
+    changed: List[SingerChange] = field(default_factory=list)
+    unchanged: int = 0
+
+    @property
+    def is_empty(self) -> bool:
+        return not (self.added or self.removed or self.changed)
+
+    def summary(self) -> List[str]:
+        """Human-readable lines describing the diff."""
+        lines = []
+        if self.added:
+            lines.append(f"Added: {', '.join(s.name for s in self.added)}")
+        if self.removed:
+            lines.append(f"Removed: {', '.join(s.name for s in self.removed)}")
+        for change in self.changed:
+            details = []
+            if change.renamed:
+                details.append(f'matched to {change.old.name}')
+            if 'voice_part' in change.fields:
+                details.append(f'{change.old.voice_part} → {change.new.voice_part}')
+            others = [f for f in change.fields if f not in ('name', 'voice_part')]
+            if others:
+                details.append(f"updated {', '.join(others)}")
+            lines.append(f"{change.new.name}: {'; '.join(details)}")
+        return lines
+
+
+@dataclass
+class RosterUpdate:
+    """What apply_roster_diff did to the chart."""
+    placed: List[Tuple[Singer, Tuple[int, int]]] = field(default_factory=list)
+    vacated: List[Tuple[int, int]] = field(default_factory=list)
+    moved: int = 0             # Unchanged singers shifted to close a gap
+    seats_added: int = 0
+    # Part not in the chart's part order, or no free seat in a fixed venue
+    unplaced: List[Singer] = field(default_factory=list)
+
+
+def diff_rosters(old: List[Singer], new: List[Singer],
+                 threshold: float = DEFAULT_MATCH_THRESHOLD) -> RosterDiff:
+    """
+    Compare two rosters.
+
+    Args:
+        old: The roster the chart was built from
+        new: The uploaded roster
+        threshold: Minimum name similarity (0-1) for a fuzzy match
+
+    Returns:
+        RosterDiff with added, removed and changed singers
+    """
+    diff = RosterDiff()
+
+    # Exact matches on normalized names; duplicates pair up in roster order
+    by_name: Dict[str, List[int]] = {}
+    for idx, singer in enumerate(old):
+        by_name.setdefault(normalize_name(singer.name), []).append(idx)
+    matched_old = set()
+    unmatched_new = []
+    pairs = []
+    for singer in new:
+        candidates = by_name.get(normalize_name(singer.name))
+        if candidates:
+            idx = candidates.pop(0)
+            matched_old.add(idx)
+            pairs.append((old[idx], singer))
+        else:
+            unmatched_new.append(singer)
+
+    # Fuzzy matches among the leftovers, best pairs first
+    index: TrigramIndex[int] = TrigramIndex()
+    for idx, singer in enumerate(old):
+        if idx not in matched_old:
+            index.add(idx, singer.name)
+    candidates = []
+    for new_idx, singer in enumerate(unmatched_new):
+        for old_idx, similarity in index.search(singer.name, threshold, FUZZY_CANDIDATES):
+            # Prefer a same-part match when similarities tie
+            same_part = old[old_idx].voice_part == singer.voice_part
+            candidates.append((similarity, same_part, new_idx, old_idx))
+    candidates.sort(key=lambda c: (-c[0], not c[1], c[2], c[3]))
+    fuzzy_new = set()
+    for _, _, new_idx, old_idx in candidates:
+        if new_idx not in fuzzy_new and old_idx not in matched_old:
+            fuzzy_new.add(new_idx)
+            matched_old.add(old_idx)
+            pairs.append((old[old_idx], unmatched_new[new_idx]))
+
+    diff.added = [s for i, s in enumerate(unmatched_new) if i not in fuzzy_new]
+    diff.removed = [s for i, s in enumerate(old) if i not in matched_old]
+    for old_singer, new_singer in pairs:
+        changed = [f.name for f in fields(Singer)
+                   if getattr(old_singer, f.name) != getattr(new_singer, f.name)]
+        if changed:
+            diff.changed.append(SingerChange(old_singer, new_singer, changed))
+        else:
+            diff.unchanged += 1
+    return diff
+
+
+def apply_roster_diff(chart: List[List[Seat]], diff: RosterDiff,
+                      part_order: List[str], fixed_rows: bool = False) -> RosterUpdate:
+    """
+    Update a chart in place for a roster diff, moving as few singers as possible.
+
+    Singers are found in the chart by name (each chart seat is matched once).
+    With `fixed_rows` (a venue chart) rows are never widened.
+    """
+    update = RosterUpdate()
+    seats_by_name: Dict[str, List[Seat]] = {}
+    for row in chart:
+        for seat in row:
+            if seat.singer is not None:
+                seats_by_name.setdefault(normalize_name(seat.singer.name), []).append(seat)
+
+    def take_seat(singer: Singer) -> Optional[Seat]:
+        seats = seats_by_name.get(normalize_name(singer.name))
+        return seats.pop(0) if seats else None
+
+    affected_rows = set()
+    to_place: List[Singer] = []
+    for singer in diff.removed:
+        seat = take_seat(singer)
+        if seat is not None:
+            seat.singer = None
+            update.vacated.append((seat.row, seat.position))
+            affected_rows.add(seat.row)
+    for change in diff.changed:
+        seat = take_seat(change.old)
+        if seat is None:
+            to_place.append(change.new)
+        elif _block(change.new) == _block(change.old):
+            seat.singer = change.new
+        else:
+            seat.singer = None
+            update.vacated.append((seat.row, seat.position))
+            affected_rows.add(seat.row)
+            to_place.append(change.new)
+    to_place.extend(diff.added)
+
+    # Tallest first, so they get the back-row seats
+    to_place.sort(key=lambda s: -(s.height if s.height is not None else 0))
+    for singer in to_place:
+        if singer.voice_part not in part_order:
+            update.unplaced.append(singer)
+            continue
+        seat = _place_singer(chart, singer, update, fixed_rows)
+        if seat is None:
+            update.unplaced.append(singer)
+            continue
+        update.placed.append((singer, (seat.row, seat.position)))
+        affected_rows.add(seat.row)
+
+    for r in sorted(affected_rows):
+        update.moved += _close_gaps(chart[r])
+    # Report where placed singers ended up after gaps were closed
+    where = {id(seat.singer): (seat.row, seat.position)
+             for row in chart for seat in row if seat.singer is not None}
+    update.placed = [(singer, where[id(singer)]) for singer, _ in update.placed]
+    return update
+
+
+def _place_singer(chart: List[List[Seat]], singer: Singer, update: RosterUpdate,
+                  fixed_rows: bool = False) -> Optional[Seat]:
+    """
+    Seat a singer beside their part, in the row that best fits their height.
+
+    In a massed choir the singer goes beside their own (part, ensemble)
+    block; only if that block isn't in the chart do they join the part.
+    Returns None if rows are fixed and every usable seat is taken.
+    """
+    part_rows: Dict[int, List[Seat]] = {}
+    block_rows: Dict[int, List[Seat]] = {}
+    for row in chart:
+        for seat in row:
+            if seat.singer is not None and seat.singer.voice_part == singer.voice_part:
+                part_rows.setdefault(seat.row, []).append(seat)
+                if seat.singer.ensemble == singer.ensemble:
+                    block_rows.setdefault(seat.row, []).append(seat)
+    if block_rows:
+        part_rows = block_rows
+
+    if not part_rows:
+        # The part isn't in the chart yet: first free seat from the front, else a new seat
+        for row in reversed(chart):
+            for seat in row:
+                if seat.singer is None and not seat.blocked:
+                    seat.singer = singer
+                    return seat
+        if fixed_rows:
+            return None
+        return _insert_seat(chart, len(chart) - 1, len(chart[-1]), singer, update)
+
+    target = _target_row(part_rows, singer)
+    best = None
+    for r, seats in part_rows.items():
+        first, last = seats[0].position, seats[-1].position
+        center = (first + last) / 2
+        row = chart[r]
+        for pos in range(max(0, first - 1), min(len(row), last + 2)):
+            seat = row[pos]
+            if seat.singer is None and not seat.blocked:
+                score = (abs(r - target), abs(pos - center))
+                if best is None or score < best[0]:
+                    best = (score, seat)
+    if best is not None:
+        best[1].singer = singer
+        return best[1]
+
+    if fixed_rows:
+        # The venue can't grow: take the free seat nearest the part's run in the target row
+        row_seats = part_rows[target]
+        center = (row_seats[0].position + row_seats[-1].position) / 2
+        free = [(abs(seat.row - target), abs(seat.position - center), seat.row, seat.position)
+                for row in chart for seat in row if seat.singer is None and not seat.blocked]
+        if not free:
+            return None
+        _, _, r, pos = min(free)
+        chart[r][pos].singer = singer
+        return chart[r][pos]
+
+    # No free seat beside the part: add one at the end of the part's run in the target row
+    row_seats = part_rows[target]
+    return _insert_seat(chart, target, row_seats[-1].position + 1, singer, update)
+
+
+def _target_row(part_rows: Dict[int, List[Seat]], singer: Singer) -> int:
+    """The row whose singers of this part are closest in height to `singer`."""
+    def row_height(seats):
+        heights = sorted(s.singer.height for s in seats if s.singer.height is not None)
+        return heights[len(heights) // 2] if heights else None
+
+    if singer.height is None:
+        # Unknown heights go to the middle of the section
+        rows = sorted(part_rows)
+        return rows[len(rows) // 2]
+    best_row, best_gap = None, None
+    for r, seats in sorted(part_rows.items()):
+        median = row_height(seats)
+        gap = abs(median - singer.height) if median is not None else float('inf')
+        if best_gap is None or gap < best_gap:
+            best_row, best_gap = r, gap
+    return best_row
+
+
+def _insert_seat(chart: List[List[Seat]], r: int, pos: int, singer: Singer,
+                 update: RosterUpdate) -> Seat:
+    """Insert a new seat into row r at pos, shifting the seats after it."""
+    row = chart[r]
+    seat = Seat(row=r, position=pos, singer=singer)
+    row.insert(pos, seat)
+    for p in range(pos + 1, len(row)):
+        row[p].position = p
+    update.seats_added += 1
+    return seat
+
+
+def _close_gaps(row: List[Seat]) -> int:
+    """
+    Close empty seats inside each part's run in a row (each ensemble's run
+    of the part, in a massed choir).
+
+    Singers of the run slide toward its middle, keeping their order, so the
+    gap ends up at the section's edge. Returns how many singers moved.
+    """
+    moved = 0
+    spans: Dict[Tuple[str, Optional[str]], Tuple[int, int]] = {}
+    for seat in row:
+        if seat.singer is not None:
+            block = _block(seat.singer)
+            first, _ = spans.get(block, (seat.position, seat.position))
+            spans[block] = (first, seat.position)
+
+    for block, (first, last) in spans.items():
+        span = [seat for seat in row[first:last + 1] if not seat.blocked]
+        # Only runs that are this block alone (plus empty seats) are packed
+        occupants = [seat.singer for seat in span if seat.singer is not None]
+        if any(_block(s) != block for s in occupants) or len(occupants) == len(span):
+            continue
+        offset = (len(span) - len(occupants)) // 2
+        for i, seat in enumerate(span):
+            singer = occupants[i - offset] if offset <= i < offset + len(occupants) else None
+            if singer is not None and seat.singer is not singer:
+                moved += 1
+            seat.singer = singer
+    return moved
+
+
+def _block(singer: Singer) -> Tuple[str, Optional[str]]:
+    """A singer's (part, ensemble) block; ensemble is None outside massed choirs."""
+    return singer.voice_part, singer.ensemble
@@ -1,11 +1,19 @@
 """
 Seating algorithm for choir chart generation.
 Places singers in straight rows based on voice part and height.
+
+For massed choirs, pass an ensemble order: each part is then split into one
+block per ensemble (part, then ensemble, then height), so every ensemble's
+singers stay together within their section.
 """
 
 import math
-from dataclasses import dataclass
-from typing import List, Optional
+import random
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set, Tuple
+
+# Section boundaries this many seats or fewer from an aisle are moved onto it
+AISLE_SNAP_SEATS = 2
 
 
 @dataclass
@@ -13,6 +21,23 @@ class Singer:
     name: str
     voice_part: str
     height: Optional[float] = None  # in inches, None if unknown
+    # Optional attributes used by section_balance
+    strength: Optional[int] = None      # 1 (developing) to 5 (section leader)
+    experience: Optional[int] = None    # Seasons sung with the choir
+    tags: List[str] = field(default_factory=list)
+    keep_apart: List[str] = field(default_factory=list)  # Names not to seat beside
+    ensemble: Optional[str] = None      # Choir or school in a massed chart
+
+    def to_dict(self) -> dict:
+        """Return the singer as a dict for form storage, leaving out unset attributes."""
+        data = {'name': self.name, 'voice_part': self.voice_part, 'height': self.height}
+        for key in ('strength', 'experience', 'ensemble'):
+            if getattr(self, key) is not None:
+                data[key] = getattr(self, key)
+        for key in ('tags', 'keep_apart'):
+            if getattr(self, key):
+                data[key] = list(getattr(self, key))
+        return data
 
     @property
     def height_display(self) -> str:
@@ -36,6 +61,21 @@ class Seat:
     row: int
     position: int
     singer: Optional[Singer] = None
+    blocked: bool = False      # No chair/riser space here; never seated
+    accessible: bool = False   # Wheelchair-accessible spot
+
+    def to_dict(self) -> dict:
+        """Return the seat as a dict for form storage; venue flags only when set."""
+        data = {
+            'row': self.row,
+            'position': self.position,
+            'singer': self.singer.to_dict() if self.singer else None
+        }
+        if self.blocked:
+            data['blocked'] = True
+        if self.accessible:
+            data['accessible'] = True
+        return data
 
 
 def generate_seating_chart(
@@ -44,7 +84,11 @@ def generate_seating_chart(
     seats_per_row: int,
     part_order: List[str],
     layout: str = "side-by-side",
-    row_sizes: Optional[List[int]] = None
+    row_sizes: Optional[List[int]] = None,
+    blocked_seats: Optional[Set[Tuple[int, int]]] = None,
+    aisles: Optional[List[List[int]]] = None,
+    accessible_seats: Optional[Set[Tuple[int, int]]] = None,
+    ensemble_order: Optional[List[str]] = None
 ) -> List[List[Seat]]:
     """
     Generate a seating chart for straight rows.
@@ -56,48 +100,113 @@ def generate_seating_chart(
         part_order: List of voice parts in left-to-right order
         layout: "side-by-side" (parts next to each other) or "stacked" (parts behind each other)
         row_sizes: Optional list of seats per row (back to front), overrides seats_per_row
+        blocked_seats: Optional (row, position) seats that must stay empty
+        aisles: Optional per-row lists of positions that come right after an aisle;
+                side-by-side sections snap their edges to a nearby aisle
+        accessible_seats: Optional (row, position) seats to mark as accessible
+        ensemble_order: Optional ensembles in left-to-right order within each part.
+                        When given, each part is placed as one block per ensemble.
+                        Ensembles not listed (including singers with none) follow
+                        in the order first seen.
 
     Returns:
         2D list of Seat objects (row 0 = back, row -1 = front)
     """
-    # Group singers by voice part
-    groups = {}
-    for part in part_order:
-        groups[part] = []
-
-    for singer in singers:
-        part = singer.voice_part
-        if part in groups:
-            groups[part].append(singer)
+    # Group singers by voice part, or by (part, ensemble) for massed choirs.
+    # The side-by-side placement treats each group key like a part of its own.
+    if ensemble_order is None:
+        groups = {part: [] for part in part_order}
+        for singer in singers:
+            if singer.voice_part in groups:
+                groups[singer.voice_part].append(singer)
+        keys = part_order
+        blocks = None
+    else:
+        groups, blocks = _group_by_ensemble(singers, part_order, ensemble_order)
+        keys = [key for part in part_order for key in blocks.get(part, [])]
 
     # Sort each group by height (tallest first for back rows).
     # Singers with no height are placed in the middle of the group.
-    for part in groups:
+    for key in groups:
         known = sorted(
-            [s for s in groups[part] if s.height is not None],
+            [s for s in groups[key] if s.height is not None],
             key=lambda s: s.height, reverse=True
         )
-        unknown = [s for s in groups[part] if s.height is None]
+        unknown = [s for s in groups[key] if s.height is None]
         mid = len(known) // 2
-        groups[part] = known[:mid] + unknown + known[mid:]
+        groups[key] = known[:mid] + unknown + known[mid:]
 
     # Initialize empty chart with variable row sizes
+    blocked_seats = blocked_seats or set()
+    accessible_seats = accessible_seats or set()
     chart = []
     for r in range(rows):
         row_width = row_sizes[r] if row_sizes else seats_per_row
         row = []
         for p in range(row_width):
-            row.append(Seat(row=r, position=p, singer=None))
+            row.append(Seat(row=r, position=p, singer=None,
+                            blocked=(r, p) in blocked_seats,
+                            accessible=(r, p) in accessible_seats))
         chart.append(row)
 
+    # Place into the usable seats only. The rows below share Seat objects with
+    # the chart, so blocked seats are simply skipped over.
+    usable = [[seat for seat in row if not seat.blocked] for row in chart]
+    usable_sizes = [len(row) for row in usable]
+    usable_aisles = None
+    if aisles:
+        # Convert aisle positions to indexes among the usable seats
+        usable_aisles = [
+            [sum(1 for seat in usable[r] if seat.position < a) for a in aisles[r]]
+            if r < len(aisles) else []
+            for r in range(rows)
+        ]
+
     if layout == "side-by-side":
-        _place_side_by_side_variable(chart, groups, part_order, row_sizes) if row_sizes else _place_side_by_side(chart, groups, part_order, rows, seats_per_row)
+        if row_sizes or blocked_seats or aisles:
+            _place_side_by_side_variable(usable, groups, keys, usable_sizes, usable_aisles)
+        else:
+            _place_side_by_side(chart, groups, keys, rows, seats_per_row)
     else:  # stacked
-        _place_stacked(chart, groups, part_order, rows, seats_per_row)
+        _place_stacked(usable, groups, part_order, rows, seats_per_row, blocks)
+
+    # Never drop singers silently when the chart is too small for them
+    placed = sum(1 for row in chart for seat in row if seat.singer is not None)
+    expected = sum(len(group) for group in groups.values())
+    if placed != expected:
+        raise ValueError(
+            f'Only {placed} of {expected} singers fit in the chart; '
+            f'add rows or seats per row'
+        )
 
     return chart
 
 
+def _group_by_ensemble(
+    singers: List[Singer],
+    part_order: List[str],
+    ensemble_order: List[str]
+) -> Tuple[Dict[Tuple[str, Optional[str]], List[Singer]], Dict[str, list]]:
+    """
+    Group singers by (part, ensemble) in one pass.
+
+    Returns the groups and, for each part, its group keys in ensemble order
+    (only ensembles that have singers in that part).
+    """
+    rank = {ensemble: i for i, ensemble in enumerate(ensemble_order)}
+    groups: Dict[Tuple[str, Optional[str]], List[Singer]] = {}
+    parts = set(part_order)
+    for singer in singers:
+        if singer.voice_part in parts:
+            if singer.ensemble not in rank:
+                rank[singer.ensemble] = len(rank)
+            groups.setdefault((singer.voice_part, singer.ensemble), []).append(singer)
+    blocks: Dict[str, list] = {}
+    for key in sorted(groups, key=lambda key: rank[key[1]]):
+        blocks.setdefault(key[0], []).append(key)
+    return groups, blocks
+
+
 def _place_side_by_side(
     chart: List[List[Seat]],
     groups: dict,
@@ -127,6 +236,10 @@ def _place_side_by_side(
 
     # Total width needed
     total_width = sum(part_widths)
+    if total_width > seats_per_row:
+        raise ValueError(
+            f'Voice parts need {total_width} seats per row but only {seats_per_row} are available'
+        )
 
     # Center offset for the whole chart
     chart_offset = (seats_per_row - total_width) // 2
@@ -146,77 +259,112 @@ def _place_side_by_side_variable(
     chart: List[List[Seat]],
     groups: dict,
     part_order: List[str],
-    row_sizes: List[int]
+    row_sizes: List[int],
+    aisles: Optional[List[List[int]]] = None
 ) -> None:
     """
     Place voice parts side by side with variable row widths.
     Each part gets a strict column section - no mixing between parts.
+    Section edges within AISLE_SNAP_SEATS of an aisle are moved onto the aisle.
     """
     num_parts = len(part_order)
     rows = len(row_sizes)
     if num_parts == 0 or rows == 0:
         return
 
-    total_singers = sum(len(groups[part]) for part in part_order)
+    counts = [len(groups[part]) for part in part_order]
+    total_singers = sum(counts)
     if total_singers == 0:
         return
 
-    # Calculate the proportion each part should take
-    part_proportions = []
-    for part in part_order:
-        count = len(groups[part])
-        proportion = count / total_singers if total_singers > 0 else 0
-        part_proportions.append(proportion)
-
-    # Create queues for each voice part (tallest first)
-    queues = {part: list(groups[part]) for part in part_order}
-
-    # For each row, divide it into sections for each part
-    for row_idx in range(rows):
-        row_width = row_sizes[row_idx]
+    if total_singers > sum(row_sizes):
+        raise ValueError(
+            f'Row sizes only have {sum(row_sizes)} seats for {total_singers} singers'
+        )
 
-        # Calculate how many seats each part gets in this row
+    # For each row, divide it into sections for each part in proportion to its size
+    section_widths = []
+    for row_width in row_sizes:
         part_seats = []
         remaining_width = row_width
-        for i, part in enumerate(part_order):
-            if i == len(part_order) - 1:
+        for i in range(num_parts):
+            if i == num_parts - 1:
                 # Last part gets remaining width
                 seats = remaining_width
             else:
-                seats = round(row_width * part_proportions[i])
+                seats = round(row_width * counts[i] / total_singers)
                 seats = min(seats, remaining_width)
             part_seats.append(seats)
             remaining_width -= seats
-
-        # Calculate starting position for each part (centered as a group)
-        total_used = sum(part_seats)
-        start_offset = (row_width - total_used) // 2
-
-        # Place each part's singers in their section
-        current_pos = start_offset
-        for i, part in enumerate(part_order):
-            section_width = part_seats[i]
-            if section_width <= 0:
+        section_widths.append(part_seats)
+
+    if aisles:
+        for row_idx, row_aisles in enumerate(aisles):
+            _snap_sections_to_aisles(section_widths[row_idx], row_aisles)
+
+    # Rounding can leave a part with fewer seats than singers across all rows.
+    # Move seats to it from parts with spare seats, taking from each donor's
+    # widest section so sections stay balanced.
+    capacity = [sum(widths[i] for widths in section_widths) for i in range(num_parts)]
+    for i in range(num_parts):
+        while capacity[i] < counts[i]:
+            donor = max(range(num_parts), key=lambda j: capacity[j] - counts[j])
+            row_idx = max(range(rows), key=lambda r: section_widths[r][donor])
+            section_widths[row_idx][donor] -= 1
+            section_widths[row_idx][i] += 1
+            capacity[donor] -= 1
+            capacity[i] += 1
+
+    # Fill each part's sections back to front, tallest first
+    row_starts = [0] * rows
+    for i, part in enumerate(part_order):
+        queue = groups[part]
+        next_singer = 0
+        seats_after = capacity[i]
+        for row_idx in range(rows):
+            section_width = section_widths[row_idx][i]
+            start = row_starts[row_idx]
+            row_starts[row_idx] += section_width
+            seats_after -= section_width
+
+            remaining_singers = counts[i] - next_singer
+            if section_width <= 0 or remaining_singers <= 0:
                 continue
 
-            # How many singers to place from this part in this row?
-            # Distribute evenly across rows based on remaining singers
+            # Distribute evenly across the remaining rows, but never leave more
+            # singers than the later rows' sections can hold
             remaining_rows = rows - row_idx
-            remaining_singers = len(queues[part])
-            if remaining_rows > 0 and remaining_singers > 0:
-                # Place ceil(remaining/remaining_rows) but capped by section width
-                to_place = min(section_width, math.ceil(remaining_singers / remaining_rows))
+            to_place = max(math.ceil(remaining_singers / remaining_rows),
+                           remaining_singers - seats_after)
+            to_place = min(section_width, to_place)
+
+            # Center within the section
+            section_offset = (section_width - to_place) // 2
+            for j in range(to_place):
+                chart[row_idx][start + section_offset + j].singer = queue[next_singer]
+                next_singer += 1
 
-                # Center within the section
-                section_offset = (section_width - to_place) // 2
 
-                for j in range(to_place):
-                    if queues[part]:
-                        pos = current_pos + section_offset + j
-                        if pos < len(chart[row_idx]):
-                            chart[row_idx][pos].singer = queues[part].pop(0)
+def _snap_sections_to_aisles(part_seats: List[int], row_aisles: List[int]) -> None:
+    """
+    Move each boundary between sections onto the nearest aisle within
+    AISLE_SNAP_SEATS seats, so a part doesn't spill a seat or two across it.
 
-            current_pos += section_width
+    Boundaries further from every aisle stay put, and a boundary never moves
+    past the neighbouring ones. Only side-by-side rows are snapped; stacked
+    layout fills whole rows and ignores aisles.
+    """
+    boundary = 0
+    for i in range(len(part_seats) - 1):
+        boundary += part_seats[i]
+        shifts = sorted((aisle - boundary for aisle in row_aisles
+                         if abs(aisle - boundary) <= AISLE_SNAP_SEATS), key=abs)
+        for shift in shifts:
+            if part_seats[i] + shift >= 0 and part_seats[i + 1] - shift >= 0:
+                part_seats[i] += shift
+                part_seats[i + 1] -= shift
+                boundary += shift
+                break
 
 
 def _place_stacked(
@@ -224,86 +372,120 @@ def _place_stacked(
     groups: dict,
     part_order: List[str],
     rows: int,
-    seats_per_row: int
+    seats_per_row: int,
+    blocks: Optional[Dict[str, list]] = None
 ) -> None:
     """
     Place voice parts stacked (back to front).
     Parts are arranged in horizontal bands from back to front.
+    With `blocks` (part -> group keys), a part with several groups places them
+    side by side within its band, each as wide as it needs.
     """
     num_parts = len(part_order)
     if num_parts == 0:
         return
 
-    # Divide rows among parts
-    rows_per_part = rows // num_parts
-    extra_rows = rows % num_parts
-
     current_row = 0
-    for i, part in enumerate(part_order):
-        # Give extra rows to back parts
-        part_rows = rows_per_part + (1 if i < extra_rows else 0)
+    for part, part_rows in zip(part_order, stacked_part_rows(rows, num_parts)):
         end_row = current_row + part_rows
-
-        _place_section(chart, groups[part],
-                       start_row=current_row, end_row=end_row,
-                       start_pos=0, end_pos=seats_per_row)
+        keys = blocks.get(part, []) if blocks is not None else [part]
+
+        if len(keys) <= 1:
+            singers = groups[keys[0]] if keys else []
+            _place_section(chart, singers,
+                           start_row=current_row, end_row=end_row,
+                           start_pos=0, end_pos=seats_per_row)
+        elif part_rows > 0:
+            widths = [math.ceil(len(groups[key]) / part_rows) for key in keys]
+            start = max(0, (seats_per_row - sum(widths)) // 2)
+            for key, width in zip(keys, widths):
+                _place_section(chart, groups[key],
+                               start_row=current_row, end_row=end_row,
+                               start_pos=start, end_pos=start + width)
+                start += width
         current_row = end_row
 
 
+def stacked_part_rows(rows: int, num_parts: int) -> List[int]:
+    """Divide rows among parts for stacked layout, giving extra rows to back parts."""
+    rows_per_part, extra_rows = divmod(rows, num_parts)
+    return [rows_per_part + (1 if i < extra_rows else 0) for i in range(num_parts)]
+
+
 def _place_section(chart: List[List[Seat]], singers: List[Singer],
                    start_row: int, end_row: int,
                    start_pos: int, end_pos: int) -> None:
     """
     Place a group of singers in a rectangular section of the chart.
     Fills from back row to front, centered within each row.
+    Rows shorter than end_pos only use the seats they have.
     """
-    section_width = end_pos - start_pos
     num_rows = end_row - start_row
     total_singers = len(singers)
 
-    if total_singers == 0 or section_width == 0 or num_rows == 0:
+    if total_singers == 0 or end_pos <= start_pos or num_rows == 0:
         return
 
+    widths = [max(0, min(end_pos, len(chart[row])) - start_pos)
+              for row in range(start_row, end_row)]
+    seats_after = sum(widths)
+
     singer_idx = 0
-    for row in range(start_row, end_row):
+    for row, section_width in zip(range(start_row, end_row), widths):
+        seats_after -= section_width
         # Calculate how many singers go in this row
         remaining = total_singers - singer_idx
         if remaining <= 0:
             break
 
-        # Fill full rows, last row gets remainder
+        # Fill evenly, but never leave more singers than the rows in front can hold.
+        # The last row places all remaining.
         rows_left = end_row - row
-        if rows_left > 1:
-            # Not the last row - try to fill evenly
-            singers_this_row = min(section_width, math.ceil(remaining / rows_left))
-        else:
-            # Last row - place all remaining
-            singers_this_row = min(section_width, remaining)
+        singers_this_row = max(math.ceil(remaining / rows_left), remaining - seats_after)
+        singers_this_row = min(section_width, singers_this_row)
 
         # Calculate centering offset
         offset = (section_width - singers_this_row) // 2
 
         # Place singers centered in this row
         for i in range(singers_this_row):
-            if singer_idx < total_singers:
-                pos = start_pos + offset + i
-                chart[row][pos].singer = singers[singer_idx]
-                singer_idx += 1
+            pos = start_pos + offset + i
+            chart[row][pos].singer = singers[singer_idx]
+            singer_idx += 1
 
 
-def calculate_min_width(singers: List[Singer], part_order: List[str], rows: int) -> int:
+def calculate_min_width(singers: List[Singer], part_order: List[str], rows: int,
+                        layout: str = "side-by-side",
+                        ensemble_order: Optional[List[str]] = None) -> int:
     """
-    Calculate the minimum seats_per_row needed for side-by-side layout.
+    Calculate the minimum seats_per_row needed to fit every singer.
 
-    This accounts for per-part column widths which can exceed ceil(total/rows)
-    due to cumulative rounding.
+    For side-by-side layout this accounts for per-part column widths which can
+    exceed ceil(total/rows) due to cumulative rounding. For stacked layout it
+    is the width needed by the part with the most singers per row. With an
+    ensemble order, every ensemble block within a part is rounded up separately.
     """
+    if ensemble_order is not None:
+        return _ensemble_min_width(singers, part_order, rows, layout, ensemble_order)
+
     # Count singers per part
     part_counts = {part: 0 for part in part_order}
     for singer in singers:
         if singer.voice_part in part_counts:
             part_counts[singer.voice_part] += 1
 
+    if layout == "stacked":
+        width = 0
+        for part, part_rows in zip(part_order, stacked_part_rows(rows, len(part_order))):
+            count = part_counts[part]
+            if count > 0 and part_rows == 0:
+                raise ValueError(
+                    f'Stacked layout needs at least {len(part_order)} rows (one per voice part)'
+                )
+            if count > 0:
+                width = max(width, math.ceil(count / part_rows))
+        return width
+
     # Calculate width needed for each part
     total_width = 0
     for part in part_order:
@@ -314,6 +496,31 @@ def calculate_min_width(singers: List[Singer], part_order: List[str], rows: int)
     return total_width
 
 
+def _ensemble_min_width(singers: List[Singer], part_order: List[str], rows: int,
+                        layout: str, ensemble_order: List[str]) -> int:
+    """
+    Minimum seats per row when each (part, ensemble) block gets its own columns.
+
+    Every block is as wide as it needs to be to fit its singers in the rows it
+    has: all rows side by side, or its part's band of rows when stacked, where
+    the widest band sets the width.
+    """
+    groups, blocks = _group_by_ensemble(singers, part_order, ensemble_order)
+    if layout == "stacked":
+        width = 0
+        for part, part_rows in zip(part_order, stacked_part_rows(rows, len(part_order))):
+            keys = blocks.get(part, [])
+            if keys and part_rows == 0:
+                raise ValueError(
+                    f'Stacked layout needs at least {len(part_order)} rows (one per voice part)'
+                )
+            if keys:
+                width = max(width, sum(math.ceil(len(groups[key]) / part_rows) for key in keys))
+        return width
+    return sum(math.ceil(len(groups[key]) / rows)
+               for part in part_order for key in blocks.get(part, []))
+
+
 def calculate_chart_dimensions(num_singers: int, num_parts: int, layout: str) -> tuple[int, int]:
     """
     Calculate reasonable row and seat counts for a given number of singers.
@@ -356,6 +563,17 @@ def get_unique_parts(singers: List[Singer]) -> List[str]:
     return parts
 
 
+def get_unique_ensembles(singers: List[Singer]) -> List[str]:
+    """Extract unique ensemble names from singers, preserving first-seen order."""
+    seen = set()
+    ensembles = []
+    for singer in singers:
+        if singer.ensemble and singer.ensemble not in seen:
+            seen.add(singer.ensemble)
+            ensembles.append(singer.ensemble)
+    return ensembles
+
+
 def calculate_dimensions_with_user_input(
     num_singers: int,
     num_parts: int,
@@ -400,6 +618,53 @@ def calculate_dimensions_with_user_input(
     return calculate_chart_dimensions(num_singers, num_parts, layout)
 
 
+# First names by gender
+FEMALE_NAMES = [
+    "Mary", "Patricia", "Jennifer", "Linda", "Elizabeth", "Barbara", "Susan",
+    "Jessica", "Sarah", "Karen", "Emma", "Ava", "Sophia", "Isabella", "Mia",
+    "Charlotte", "Amelia", "Harper", "Evelyn", "Abigail", "Emily", "Ella",
+    "Madison", "Scarlett", "Victoria", "Grace", "Chloe", "Lily", "Hannah",
+    "Natalie", "Zoe", "Leah", "Hazel", "Violet", "Aurora", "Savannah",
+    "Audrey", "Bella", "Claire", "Lucy", "Anna", "Caroline",
+    # Diverse additions
+    "Maria", "Sofia", "Fatima", "Aisha", "Yuki", "Mei", "Priya", "Amara",
+    "Zara", "Layla", "Nadia", "Rosa", "Valentina", "Camila", "Aaliyah",
+    "Keiko", "Sasha", "Ingrid", "Chiara", "Lena", "Yasmin", "Nour",
+    "Xiomara", "Adaeze", "Taraji", "Esperanza", "Miriam", "Hana", "Ines",
+    "Celestine", "Amina", "Rania", "Yolanda", "Bianca", "Svetlana"
+]
+
+MALE_NAMES = [
+    "James", "John", "Robert", "Michael", "William", "David", "Richard",
+    "Joseph", "Thomas", "Charles", "Oliver", "Elijah", "Lucas", "Mason",
+    "Logan", "Alexander", "Ethan", "Jacob", "Liam", "Noah", "Aiden",
+    "Benjamin", "Henry", "Sebastian", "Jack", "Daniel", "Matthew", "Owen",
+    "Ryan", "Nathan", "Connor", "Andrew", "Isaac", "Joshua", "Dylan",
+    "Luke", "Gabriel", "Anthony", "Christian", "Jonathan", "Samuel", "Eric",
+    # Diverse additions
+    "Carlos", "Mateo", "Diego", "Jamal", "Andre", "Kwame", "Rafael",
+    "Hiroshi", "Wei", "Arjun", "Ibrahim", "Omar", "Luca", "Nikolai",
+    "Tomas", "Ezra", "Kofi", "Malik", "Santiago", "Jin", "Ravi", "Ahmed",
+    "Emeka", "Soren", "Dmitri", "Tariq", "Yusuf", "Pascal", "Desmond",
+    "Oluwaseun", "Alejandro", "Takeshi", "Vikram", "Bastian", "Seamus"
+]
+
+LAST_NAMES = [
+    "Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller",
+    "Davis", "Rodriguez", "Martinez", "Hernandez", "Lopez", "Gonzalez",
+    "Wilson", "Anderson", "Thomas", "Taylor", "Moore", "Jackson", "Martin",
+    "Lee", "Perez", "Thompson", "White", "Harris", "Sanchez", "Clark",
+    "Ramirez", "Lewis", "Robinson", "Walker", "Young", "Allen", "King",
+    "Wright", "Scott", "Torres", "Nguyen", "Hill", "Flores", "Green",
+    # Diverse additions
+    "Kim", "Chen", "Park", "Patel", "Singh", "Kumar", "Ali", "Khan",
+    "Hassan", "Okafor", "Mensah", "Diallo", "Rosario", "Santos", "Reyes",
+    "Romero", "Nakamura", "Tanaka", "Yamamoto", "Ivanov", "Johansson",
+    "Mueller", "Bianchi", "Dubois", "Osei", "Achebe", "Kowalski",
+    "Petrov", "Andersen", "Fernandez", "Adeyemi", "Wakahisa", "Abubakar"
+]
+
+
 def generate_random_roster(
     num_singers: int,
     parts: List[str],
@@ -410,122 +675,91 @@ def generate_random_roster(
     """
     Generate a random roster of singers for testing.
 
+    Uses its own random.Random instance, so concurrent calls don't interfere
+    and the same seed always gives the same roster. Names and heights are
+    drawn in bulk per part, so very large rosters (100k+) for load testing
+    and benchmarks are fast.
+
     Args:
         num_singers: Number of singers to generate
         parts: List of voice parts to distribute among
         height_range: (min_height, max_height) in inches
         distribution: Optional list of counts per part (must sum to num_singers)
-                     If None, distributes evenly with round-robin
+                     If None, distributes evenly with ±5 variation per part
         seed: Optional random seed for reproducibility
 
     Returns:
         List of Singer objects
     """
-    import random
-
-    if seed is not None:
-        random.seed(seed)
-
-    # First names by gender
-    female_names = [
-        "Mary", "Patricia", "Jennifer", "Linda", "Elizabeth", "Barbara", "Susan",
-        "Jessica", "Sarah", "Karen", "Emma", "Ava", "Sophia", "Isabella", "Mia",
-        "Charlotte", "Amelia", "Harper", "Evelyn", "Abigail", "Emily", "Ella",
-        "Madison", "Scarlett", "Victoria", "Grace", "Chloe", "Lily", "Hannah",
-        "Natalie", "Zoe", "Leah", "Hazel", "Violet", "Aurora", "Savannah",
-        "Audrey", "Bella", "Claire", "Lucy", "Anna", "Caroline",
-        # Diverse additions
-        "Maria", "Sofia", "Fatima", "Aisha", "Yuki", "Mei", "Priya", "Amara",
-        "Zara", "Layla", "Nadia", "Rosa", "Valentina", "Camila", "Aaliyah",
-        "Keiko", "Sasha", "Ingrid", "Chiara", "Lena", "Yasmin", "Nour",
-        "Xiomara", "Adaeze", "Taraji", "Esperanza", "Miriam", "Hana", "Ines",
-        "Celestine", "Amina", "Rania", "Yolanda", "Bianca", "Svetlana"
-    ]
-
-    male_names = [
-        "James", "John", "Robert", "Michael", "William", "David", "Richard",
-        "Joseph", "Thomas", "Charles", "Oliver", "Elijah", "Lucas", "Mason",
-        "Logan", "Alexander", "Ethan", "Jacob", "Liam", "Noah", "Aiden",
-        "Benjamin", "Henry", "Sebastian", "Jack", "Daniel", "Matthew", "Owen",
-        "Ryan", "Nathan", "Connor", "Andrew", "Isaac", "Joshua", "Dylan",
-        "Luke", "Gabriel", "Anthony", "Christian", "Jonathan", "Samuel", "Eric",
-        # Diverse additions
-        "Carlos", "Mateo", "Diego", "Jamal", "Andre", "Kwame", "Rafael",
-        "Hiroshi", "Wei", "Arjun", "Ibrahim", "Omar", "Luca", "Nikolai",
-        "Tomas", "Ezra", "Kofi", "Malik", "Santiago", "Jin", "Ravi", "Ahmed",
-        "Emeka", "Soren", "Dmitri", "Tariq", "Yusuf", "Pascal", "Desmond",
-        "Oluwaseun", "Alejandro", "Takeshi", "Vikram", "Bastian", "Seamus"
-    ]
-
-    last_names = [
-        "Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller",
-        "Davis", "Rodriguez", "Martinez", "Hernandez", "Lopez", "Gonzalez",
-        "Wilson", "Anderson", "Thomas", "Taylor", "Moore", "Jackson", "Martin",
-        "Lee", "Perez", "Thompson", "White", "Harris", "Sanchez", "Clark",
-        "Ramirez", "Lewis", "Robinson", "Walker", "Young", "Allen", "King",
-        "Wright", "Scott", "Torres", "Nguyen", "Hill", "Flores", "Green",
-        # Diverse additions
-        "Kim", "Chen", "Park", "Patel", "Singh", "Kumar", "Ali", "Khan",
-        "Hassan", "Okafor", "Mensah", "Diallo", "Rosario", "Santos", "Reyes",
-        "Romero", "Nakamura", "Tanaka", "Yamamoto", "Ivanov", "Johansson",
-        "Mueller", "Bianchi", "Dubois", "Osei", "Achebe", "Kowalski",
-        "Petrov", "Andersen", "Fernandez", "Adeyemi", "Wakahisa", "Abubakar"
-    ]
-
-    def get_gender(part: str):
-        """Return 'female', 'male', or None (random) based on voice part."""
-        part_lower = part.lower()
-        if any(p in part_lower for p in ['soprano', 'alto', 'mezzo']):
-            return 'female'
-        if any(p in part_lower for p in ['tenor', 'baritone', 'bass', 'bari']):
-            return 'male'
-        return None  # Unknown part — pick randomly
-
-    def get_name(part: str) -> str:
-        gender = get_gender(part)
+    rng = random.Random(seed)
+
+    if distribution:
+        # Use specified distribution
+        part_counts = [(parts[i % len(parts)], count) for i, count in enumerate(distribution)]
+    else:
+        part_counts = list(zip(parts, _vary_part_counts(num_singers, len(parts), rng)))
+
+    min_h, max_h = height_range
+    span = max_h - min_h
+    singers = []
+    for part, count in part_counts:
+        gender = _get_gender(part)
         if gender == 'female':
-            first = random.choice(female_names)
+            first_names = FEMALE_NAMES
         elif gender == 'male':
-            first = random.choice(male_names)
+            first_names = MALE_NAMES
         else:
-            first = random.choice(random.choice([female_names, male_names]))
-        return f"{first} {random.choice(last_names)}"
+            first_names = FEMALE_NAMES + MALE_NAMES  # Unknown part — pick randomly
+        firsts = rng.choices(first_names, k=count)
+        lasts = rng.choices(LAST_NAMES, k=count)
+        singers.extend(
+            Singer(name=f"{first} {last}", voice_part=part,
+                   height=round((min_h + span * rng.random()) * 2) / 2)
+            for first, last in zip(firsts, lasts)
+        )
 
-    singers = []
-    min_h, max_h = height_range
+    return singers
 
-    if distribution:
-        # Use specified distribution
-        for part_idx, count in enumerate(distribution):
-            part = parts[part_idx % len(parts)]
-            for _ in range(count):
-                name = get_name(part)
-                base_height = random.uniform(min_h, max_h)
-                height = round(base_height * 2) / 2
-                singers.append(Singer(name=name, voice_part=part, height=height))
-    else:
-        # Even distribution with ±5 variation per part
-        base = num_singers // len(parts)
-        extra = num_singers % len(parts)
-        counts = [base + (1 if i < extra else 0) for i in range(len(parts))]
-        for i in range(len(counts)):
-            counts[i] = max(1, counts[i] + random.randint(-5, 5))
-        # Adjust total back to num_singers
-        diff = num_singers - sum(counts)
-        while diff != 0:
-            i = random.randrange(len(counts))
-            if diff > 0:
-                counts[i] += 1
-                diff -= 1
-            elif diff < 0 and counts[i] > 1:
-                counts[i] -= 1
-                diff += 1
-
-        for part, count in zip(parts, counts):
-            for _ in range(count):
-                name = get_name(part)
-                base_height = random.uniform(min_h, max_h)
-                height = round(base_height * 2) / 2
-                singers.append(Singer(name=name, voice_part=part, height=height))
-
-    return singers
\ No newline at end of file
+
+def _get_gender(part: str) -> Optional[str]:
+    """Return 'female', 'male', or None (random) based on voice part."""
+    part_lower = part.lower()
+    if any(p in part_lower for p in ['soprano', 'alto', 'mezzo']):
+        return 'female'
+    if any(p in part_lower for p in ['tenor', 'baritone', 'bass', 'bari']):
+        return 'male'
+    return None
+
+
+def _vary_part_counts(num_singers: int, num_parts: int, rng: random.Random) -> List[int]:
+    """
+    Split num_singers across parts evenly, then vary each part by ±5.
+
+    The varied counts are scaled back to exactly num_singers in closed form:
+    any shortfall is spread evenly across parts, and any excess is taken from
+    parts in proportion to how far they sit above the minimum of one singer.
+    """
+    base, extra = divmod(num_singers, num_parts)
+    min_count = 1 if num_singers >= num_parts else 0
+    counts = [max(min_count, base + (1 if i < extra else 0) + rng.randint(-5, 5))
+              for i in range(num_parts)]
+
+    diff = num_singers - sum(counts)
+    if diff > 0:
+        share, leftover = divmod(diff, num_parts)
+        counts = [c + share for c in counts]
+        for i in rng.sample(range(num_parts), leftover):
+            counts[i] += 1
+    elif diff < 0:
+        excess = -diff
+        headroom = [c - min_count for c in counts]
+        total_headroom = sum(headroom)
+        taken = [excess * h // total_headroom for h in headroom]
+        counts = [c - t for c, t in zip(counts, taken)]
+        # Rounding leaves fewer than num_parts to remove, one each from random parts with room left
+        leftover = excess - sum(taken)
+        candidates = [i for i in range(num_parts) if counts[i] > min_count]
+        for i in rng.sample(candidates, leftover):
+            counts[i] -= 1
+
+    return counts
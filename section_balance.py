@@ -0,0 +1,383 @@
+"""
+Section balance and blend constraints.
+
+Height order decides which seats each part gets; this module then decides
+who sits where within each part so that:
+
+- strong singers (and singers sharing a chosen tag) are spread through the
+  section instead of clumped together,
+- new singers sit next to an experienced singer,
+- pairs of singers who should be kept apart are not seated side by side.
+
+In a massed chart (BalanceOptions.keep_ensembles) each ensemble's block of a
+part is its own section, so singers never move between ensembles.
+
+Each part's seats stay fixed, so every section is an assignment problem:
+singers x seats, solved with the Hungarian algorithm. The neighbour
+constraints depend on where everyone else sits, so the costs are rebuilt
+from the current seating and the sections re-solved until nothing improves
+or the time budget runs out. Singers who keep breaking a constraint get an
+extra penalty on their seat each round, which stops the search cycling
+between the same few seatings. The best seating found is kept, and any
+constraint it does not meet is reported.
+
+Singers without strength or experience recorded are never counted as strong,
+new or experienced.
+"""
+
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set, Tuple
+
+from assignment import solve_assignment
+from seating_algorithm import Seat, Singer
+
+# Strength is 1 (developing) to 5 (section leader)
+STRONG_SINGER = 4
+# Experience is seasons sung with the choir
+NEW_SINGER_SEASONS = 1      # Fewer seasons than this is a new singer
+VETERAN_SEASONS = 3         # At least this many is an experienced singer
+
+DEFAULT_TIME_BUDGET = 1.0   # Seconds for the whole chart
+MAX_ROUNDS = 30
+
+# Costs are in seats moved; one inch of height mismatch costs a quarter seat
+DEFAULT_HEIGHT_WEIGHT = 0.25
+SPREAD_WEIGHT = 1.0         # Per seat between a spread singer and their target seat
+NEIGHBOUR_WEIGHT = 8.0      # For breaking a neighbour constraint
+PENALTY_STEP = 2.0          # Added each round a singer keeps breaking a constraint
+STAY_WEIGHT = 0.01          # Per seat moved in a round; keeps ties where they are
+
+
+@dataclass
+class BalanceOptions:
+    spread_strong: bool = True
+    pair_new_singers: bool = True
+    keep_apart: bool = True
+    # Tags whose singers should be spread through their section (e.g. "descant")
+    spread_tags: List[str] = field(default_factory=list)
+    height_weight: float = DEFAULT_HEIGHT_WEIGHT
+    time_budget: float = DEFAULT_TIME_BUDGET
+    # Massed charts: treat each ensemble's block of a part as its own section
+    keep_ensembles: bool = False
+
+
+@dataclass
+class UnmetConstraint:
+    kind: str              # "spread", "new_singer" or "keep_apart"
+    singers: List[str]
+    message: str
+
+
+@dataclass
+class BalanceReport:
+    unmet: List[UnmetConstraint]
+    rounds: int
+    elapsed: float
+    timed_out: bool = False
+
+    @property
+    def satisfied(self) -> bool:
+        return not self.unmet
+
+
+def has_constraints(singers: List[Singer]) -> bool:
+    """Return True if any singer has balance attributes set."""
+    return any(s.strength is not None or s.experience is not None or s.tags or s.keep_apart
+               for s in singers)
+
+
+def balance_sections(chart: List[List[Seat]],
+                     options: Optional[BalanceOptions] = None) -> BalanceReport:
+    """
+    Rearrange singers within each part to meet the balance constraints.
+
+    The chart is changed in place; each part keeps exactly the seats it had.
+
+    Args:
+        chart: A generated chart
+        options: Which constraints to apply, and the time budget
+
+    Returns:
+        BalanceReport listing the constraints that could not be met
+    """
+    options = options or BalanceOptions()
+    start = time.perf_counter()
+    deadline = start + options.time_budget
+
+    sections = _sections(chart, options)
+    # Cost matrix rows follow each section's original singer order
+    roster = _snapshot(sections)
+    index = {part: {id(s): i for i, s in enumerate(singers)} for part, singers in roster.items()}
+    avoid = _keep_apart_names(chart) if options.keep_apart else {}
+    base_costs = {part: _base_costs(seats, options) for part, seats in sections.items()}
+    penalties = {part: [[0.0] * len(seats) for _ in seats] for part, seats in sections.items()}
+
+    def score() -> Tuple[int, float]:
+        """(constraints broken, total base cost); lower is better."""
+        total = sum(base_costs[part][index[part][id(seat.singer)]][j]
+                    for part, seats in sections.items() for j, seat in enumerate(seats))
+        return len(_violations(chart, avoid, options)), total
+
+    best, best_score = _snapshot(sections), score()
+    rounds = 0
+    timed_out = False
+    while rounds < MAX_ROUNDS:
+        if time.perf_counter() >= deadline:
+            timed_out = True
+            break
+        rounds += 1
+        for part, seats in sections.items():
+            singers = roster[part]
+            cost = _round_costs(chart, seats, singers, base_costs[part], penalties[part],
+                                avoid, options)
+            for singer_idx, seat_idx in enumerate(solve_assignment(cost)):
+                seats[seat_idx].singer = singers[singer_idx]
+
+        current = score()
+        if current < best_score:
+            best, best_score = _snapshot(sections), current
+        violations = _violations(chart, avoid, options)
+        if not violations:
+            break
+        # Make the seats of singers still breaking a constraint dearer next round
+        for _, involved, _ in violations:
+            for seat in involved:
+                part = _section_key(seat.singer, options)
+                singer_idx = index[part][id(seat.singer)]
+                seat_idx = sections[part].index(seat)
+                penalties[part][singer_idx][seat_idx] += PENALTY_STEP
+
+    _restore(sections, best)
+    unmet = [UnmetConstraint(kind, [seat.singer.name for seat in seats], message)
+             for kind, seats, message in _violations(chart, avoid, options)]
+    return BalanceReport(unmet=unmet, rounds=rounds,
+                         elapsed=time.perf_counter() - start, timed_out=timed_out)
+
+
+# A section is a part, or one ensemble's block of a part in a massed chart
+SectionKey = Tuple[str, Optional[str]]
+
+
+def _section_key(singer: Singer, options: BalanceOptions) -> SectionKey:
+    return singer.voice_part, singer.ensemble if options.keep_ensembles else None
+
+
+def _section_name(section: SectionKey) -> str:
+    part, ensemble = section
+    return f'{part} ({ensemble})' if ensemble else part
+
+
+def _sections(chart: List[List[Seat]], options: BalanceOptions) -> Dict[SectionKey, List[Seat]]:
+    """Occupied seats grouped by the occupant's section."""
+    sections: Dict[SectionKey, List[Seat]] = {}
+    for row in chart:
+        for seat in row:
+            if seat.singer is not None:
+                sections.setdefault(_section_key(seat.singer, options), []).append(seat)
+    return sections
+
+
+def _snapshot(sections: Dict[SectionKey, List[Seat]]) -> Dict[SectionKey, List[Singer]]:
+    return {part: [seat.singer for seat in seats] for part, seats in sections.items()}
+
+
+def _restore(sections: Dict[SectionKey, List[Seat]],
+             snapshot: Dict[SectionKey, List[Singer]]) -> None:
+    for part, seats in sections.items():
+        for seat, singer in zip(seats, snapshot[part]):
+            seat.singer = singer
+
+
+def _neighbours(chart: List[List[Seat]], seat: Seat) -> List[Seat]:
+    """Seats directly beside a seat in the same row; blocked seats break the row."""
+    row = chart[seat.row]
+    result = []
+    for pos in (seat.position - 1, seat.position + 1):
+        if 0 <= pos < len(row) and not row[pos].blocked:
+            result.append(row[pos])
+    return result
+
+
+def _keep_apart_names(chart: List[List[Seat]]) -> Dict[str, Set[str]]:
+    """Name -> names not to sit beside, made symmetric."""
+    avoid: Dict[str, Set[str]] = {}
+    for row in chart:
+        for seat in row:
+            if seat.singer is not None:
+                for other in seat.singer.keep_apart:
+                    avoid.setdefault(seat.singer.name, set()).add(other)
+                    avoid.setdefault(other, set()).add(seat.singer.name)
+    return avoid
+
+
+def _is_strong(singer: Singer) -> bool:
+    return singer.strength is not None and singer.strength >= STRONG_SINGER
+
+
+def _is_new(singer: Singer) -> bool:
+    return singer.experience is not None and singer.experience < NEW_SINGER_SEASONS
+
+
+def _is_veteran(singer: Singer) -> bool:
+    return singer.experience is not None and singer.experience >= VETERAN_SEASONS
+
+
+def _spread_groups(singers: List[Singer], options: BalanceOptions) -> List[Tuple[str, List[int]]]:
+    """(label, singer indexes) for each group that should be spread out."""
+    groups = []
+    if options.spread_strong:
+        groups.append(('Strong singers', [i for i, s in enumerate(singers) if _is_strong(s)]))
+    for tag in options.spread_tags:
+        groups.append((f"Singers tagged '{tag}'", [i for i, s in enumerate(singers) if tag in s.tags]))
+    return [(label, members) for label, members in groups if len(members) > 1]
+
+
+def _spread_targets(seats: List[Seat], count: int) -> List[int]:
+    """
+    Pick `count` seats spread evenly through a section.
+
+    Each row of the section gets a share of the targets in proportion to its
+    size (never more than every other seat), spaced evenly along the row.
+    """
+    rows: Dict[int, List[int]] = {}
+    for idx, seat in enumerate(seats):
+        rows.setdefault(seat.row, []).append(idx)
+    for indexes in rows.values():
+        indexes.sort(key=lambda i: seats[i].position)
+
+    caps = {r: (len(indexes) + 1) // 2 for r, indexes in rows.items()}
+    shares = {r: count * len(indexes) / len(seats) for r, indexes in rows.items()}
+    quotas = {r: min(caps[r], int(shares[r])) for r in rows}
+    remaining = count - sum(quotas.values())
+    # Hand out the rest to the rows with the largest leftover share
+    for r in sorted(rows, key=lambda r: shares[r] - quotas[r], reverse=True) * 2:
+        if remaining <= 0:
+            break
+        if quotas[r] < caps[r]:
+            quotas[r] += 1
+            remaining -= 1
+
+    targets = []
+    for r, indexes in rows.items():
+        width, quota = len(indexes), quotas[r]
+        targets.extend(indexes[int((t + 0.5) * width / quota)] for t in range(quota))
+    return targets
+
+
+def _base_costs(seats: List[Seat], options: BalanceOptions) -> List[List[float]]:
+    """
+    Costs that do not depend on where anyone else sits.
+
+    The generated chart's occupant of each seat sets its target height, so
+    height order is kept unless a constraint is worth breaking it for.
+    """
+    singers = [seat.singer for seat in seats]
+    target_heights = [s.height for s in singers]
+    cost = []
+    for singer in singers:
+        row_cost = []
+        for target in target_heights:
+            c = 0.0
+            if singer.height is not None and target is not None:
+                c += options.height_weight * abs(singer.height - target)
+            row_cost.append(c)
+        cost.append(row_cost)
+
+    for _, members in _spread_groups(singers, options):
+        if len(members) > (len(seats) + 1) // 2:
+            continue  # Too many to keep apart; the group only adds noise
+        targets = [(seats[t].position, seats[t].row)
+                   for t in _spread_targets(seats, len(members))]
+        for seat_idx, seat in enumerate(seats):
+            distance = min(abs(seat.position - x) + abs(seat.row - y) for x, y in targets)
+            for singer_idx in members:
+                cost[singer_idx][seat_idx] += SPREAD_WEIGHT * distance
+    return cost
+
+
+def _round_costs(chart, seats, singers, base, penalties, avoid, options) -> List[List[float]]:
+    """
+    Base costs plus neighbour costs given where everyone currently sits.
+
+    Pairwise constraints are one-way: a singer only moves away from singers
+    earlier in the section's order (or in another section), who are in turn
+    judged against singers earlier still. Without this, both singers of a
+    pair step aside at the same time and can land next to each other again.
+    New singers look for any veteran, since veterans never chase new singers.
+    """
+    rank = {id(s): i for i, s in enumerate(singers)}
+    spread_group = {}
+    for label, members in _spread_groups(singers, options):
+        if len(members) <= (len(seats) + 1) // 2:
+            for i in members:
+                spread_group.setdefault(i, set()).update(members)
+
+    # Break ties in favour of staying put, so the singers others are judged
+    # against don't wander between rounds
+    current = {id(seat.singer): seat for seat in seats}
+    cost = []
+    for i, singer in enumerate(singers):
+        here = current[id(singer)]
+        cost.append([c + STAY_WEIGHT * (abs(seat.position - here.position) + abs(seat.row - here.row))
+                     for c, seat in zip(base[i], seats)])
+
+    for i, singer in enumerate(singers):
+        new = options.pair_new_singers and _is_new(singer)
+        apart = avoid.get(singer.name)
+        group = spread_group.get(i)
+        if not new and not apart and not group:
+            continue
+        for j, seat in enumerate(seats):
+            nearby = [n.singer for n in _neighbours(chart, seat)
+                      if n.singer is not None and n.singer is not singer]
+            earlier = [s for s in nearby if rank.get(id(s), -1) < i]
+            if new and not any(_is_veteran(s) for s in nearby):
+                cost[i][j] += NEIGHBOUR_WEIGHT
+            if apart and any(s.name in apart for s in earlier):
+                cost[i][j] += NEIGHBOUR_WEIGHT
+            if group and any(rank.get(id(s), -1) in group for s in earlier
+                             if _section_key(s, options) == _section_key(singer, options)):
+                cost[i][j] += NEIGHBOUR_WEIGHT
+    for i, row in enumerate(penalties):
+        cost[i] = [c + p for c, p in zip(cost[i], row)]
+    return cost
+
+
+def _violations(chart: List[List[Seat]], avoid: Dict[str, Set[str]],
+                options: BalanceOptions) -> List[Tuple[str, List[Seat], str]]:
+    """(kind, seats involved, message) for every constraint the chart breaks."""
+    violations = []
+    sections = _sections(chart, options)
+    spreadable = {}
+    for part, seats in sections.items():
+        for label, members in _spread_groups([seat.singer for seat in seats], options):
+            if len(members) <= (len(seats) + 1) // 2:
+                spreadable[part, label] = {id(seats[i].singer) for i in members}
+
+    for row in chart:
+        for seat in row:
+            singer = seat.singer
+            if singer is None:
+                continue
+            neighbours = _neighbours(chart, seat)
+            if options.pair_new_singers and _is_new(singer):
+                if not any(n.singer is not None and _is_veteran(n.singer) for n in neighbours):
+                    violations.append(('new_singer', [seat],
+                                       f'{singer.name} is new and has no experienced singer beside them'))
+            # Pairs are reported once, from the left-hand seat
+            right = [n for n in neighbours if n.position == seat.position + 1 and n.singer]
+            for n in right:
+                if n.singer.name in avoid.get(singer.name, ()):
+                    violations.append(('keep_apart', [seat, n],
+                                       f'{singer.name} and {n.singer.name} are seated together'))
+                section = _section_key(singer, options)
+                if _section_key(n.singer, options) != section:
+                    continue
+                for (part, label), members in spreadable.items():
+                    if part == section and id(singer) in members and id(n.singer) in members:
+                        violations.append(('spread', [seat, n],
+                                           f'{label} {singer.name} and {n.singer.name} '
+                                           f'are seated together in {_section_name(part)}'))
+    return violations
+
@@ -0,0 +1,462 @@
+/*
+ * Placement engine for the browser: a line-for-line port of
+ * generate_seating_chart and its helpers in seating_algorithm.py, plus
+ * calculate_stagger_offsets from app.py, so the editor can regenerate a
+ * chart with new rows or widths without a round trip to the server.
+ *
+ * Singers are plain objects in the Singer.to_dict() format and charts come
+ * back in the chart_data format (Seat.to_dict() rows), so the output is the
+ * same JSON the server would produce. tests/test_placement_js.py checks that
+ * against the Python engine; any change here must be made there too.
+ *
+ * Loads as a browser global (window.Placement) or a CommonJS module.
+ */
+(function (root, factory) {
+    if (typeof module === 'object' && module.exports) {
+        module.exports = factory();
+    } else {
+        root.Placement = factory();
+    }
+}(typeof self !== 'undefined' ? self : this, function () {
+    'use strict';
+
+    // Python's round(): halves go to the even neighbour
+    function pyRound(x) {
+        const floor = Math.floor(x);
+        const diff = x - floor;
+        if (diff > 0.5) return floor + 1;
+        if (diff < 0.5) return floor;
+        return floor % 2 === 0 ? floor : floor + 1;
+    }
+
+    function sum(values) {
+        return values.reduce((a, b) => a + b, 0);
+    }
+
+    // Index of the first largest key, like Python's max(range(n), key=...)
+    function argmax(n, key) {
+        let best = 0;
+        for (let i = 1; i < n; i++) {
+            if (key(i) > key(best)) best = i;
+        }
+        return best;
+    }
+
+    function seatKey(row, position) {
+        return `${row},${position}`;
+    }
+
+    function groupByPart(singers, partOrder) {
+        const groups = new Map();
+        partOrder.forEach(part => groups.set(part, []));
+        singers.forEach(singer => {
+            if (groups.has(singer.voice_part)) groups.get(singer.voice_part).push(singer);
+        });
+        return sortByHeight(groups);
+    }
+
+    // Tallest first for back rows; singers with no height go in the middle of the group
+    function sortByHeight(groups) {
+        groups.forEach((group, key) => {
+            const known = group.filter(s => s.height !== null && s.height !== undefined)
+                .sort((a, b) => b.height - a.height);
+            const unknown = group.filter(s => s.height === null || s.height === undefined);
+            const mid = Math.floor(known.length / 2);
+            groups.set(key, known.slice(0, mid).concat(unknown, known.slice(mid)));
+        });
+        return groups;
+    }
+
+    /**
+     * Group singers by (part, ensemble), like _group_by_ensemble. Group keys
+     * are JSON strings of [part, ensemble]; `blocks` maps each part to its
+     * keys in ensemble order.
+     */
+    function groupByEnsemble(singers, partOrder, ensembleOrder) {
+        const rank = new Map(ensembleOrder.map((ensemble, i) => [ensemble, i]));
+        const groups = new Map();
+        const ensembleOf = new Map();
+        const parts = new Set(partOrder);
+        singers.forEach(singer => {
+            if (!parts.has(singer.voice_part)) return;
+            const ensemble = singer.ensemble === undefined ? null : singer.ensemble;
+            if (!rank.has(ensemble)) rank.set(ensemble, rank.size);
+            const key = JSON.stringify([singer.voice_part, ensemble]);
+            if (!groups.has(key)) {
+                groups.set(key, []);
+                ensembleOf.set(key, ensemble);
+            }
+            groups.get(key).push(singer);
+        });
+        const blocks = new Map();
+        Array.from(groups.keys())
+            .sort((a, b) => rank.get(ensembleOf.get(a)) - rank.get(ensembleOf.get(b)))
+            .forEach(key => {
+                const part = JSON.parse(key)[0];
+                if (!blocks.has(part)) blocks.set(part, []);
+                blocks.get(part).push(key);
+            });
+        return {groups: groups, blocks: blocks};
+    }
+
+    /**
+     * Generate a seating chart. Same arguments as the Python function; the
+     * optional venue arguments go in `options`:
+     *   rowSizes: seats per row, back to front
+     *   blockedSeats / accessibleSeats: arrays of [row, position]
+     *   aisles: per-row arrays of positions that come right after an aisle
+     *   ensembleOrder: ensembles left to right within each part (massed choirs)
+     * Returns rows of seat dicts (row 0 = back). Throws Error when singers don't fit.
+     */
+    function generateSeatingChart(singers, rows, seatsPerRow, partOrder,
+                                  layout = 'side-by-side', options = {}) {
+        const rowSizes = options.rowSizes && options.rowSizes.length ? options.rowSizes : null;
+        const aisles = options.aisles || null;
+        const blocked = new Set((options.blockedSeats || []).map(s => seatKey(s[0], s[1])));
+        const accessible = new Set((options.accessibleSeats || []).map(s => seatKey(s[0], s[1])));
+        let groups, keys, blocks = null;
+        if (options.ensembleOrder) {
+            ({groups, blocks} = groupByEnsemble(singers, partOrder, options.ensembleOrder));
+            sortByHeight(groups);
+            keys = [].concat(...partOrder.map(part => blocks.get(part) || []));
+        } else {
+            groups = groupByPart(singers, partOrder);
+            keys = partOrder;
+        }
+
+        const chart = [];
+        for (let r = 0; r < rows; r++) {
+            const rowWidth = rowSizes ? rowSizes[r] : seatsPerRow;
+            const row = [];
+            for (let p = 0; p < rowWidth; p++) {
+                row.push({row: r, position: p, singer: null,
+                          blocked: blocked.has(seatKey(r, p)),
+                          accessible: accessible.has(seatKey(r, p))});
+            }
+            chart.push(row);
+        }
+
+        // Place into the usable seats only (the rows share seat objects with the chart)
+        const usable = chart.map(row => row.filter(seat => !seat.blocked));
+        const usableSizes = usable.map(row => row.length);
+        let usableAisles = null;
+        if (aisles && aisles.length) {
+            usableAisles = [];
+            for (let r = 0; r < rows; r++) {
+                usableAisles.push(r < aisles.length
+                    ? aisles[r].map(a => usable[r].filter(seat => seat.position < a).length)
+                    : []);
+            }
+        }
+
+        if (layout === 'side-by-side') {
+            if (rowSizes || blocked.size || (aisles && aisles.length)) {
+                placeSideBySideVariable(usable, groups, keys, usableSizes, usableAisles);
+            } else {
+                placeSideBySide(chart, groups, keys, rows, seatsPerRow);
+            }
+        } else {
+            placeStacked(usable, groups, partOrder, rows, seatsPerRow, blocks);
+        }
+
+        let placed = 0;
+        chart.forEach(row => row.forEach(seat => { if (seat.singer) placed++; }));
+        let expected = 0;
+        groups.forEach(group => { expected += group.length; });
+        if (placed !== expected) {
+            throw new Error(`Only ${placed} of ${expected} singers fit in the chart; ` +
+                            'add rows or seats per row');
+        }
+        return chart.map(row => row.map(seatToDict));
+    }
+
+    function seatToDict(seat) {
+        const data = {row: seat.row, position: seat.position, singer: seat.singer};
+        if (seat.blocked) data.blocked = true;
+        if (seat.accessible) data.accessible = true;
+        return data;
+    }
+
+    function placeSideBySide(chart, groups, partOrder, rows, seatsPerRow) {
+        if (partOrder.length === 0) return;
+        const total = sum(partOrder.map(part => groups.get(part).length));
+        if (total === 0) return;
+
+        const partWidths = partOrder.map(part => {
+            const count = groups.get(part).length;
+            return count > 0 ? Math.ceil(count / rows) : 0;
+        });
+        const totalWidth = sum(partWidths);
+        if (totalWidth > seatsPerRow) {
+            throw new Error(`Voice parts need ${totalWidth} seats per row but only ` +
+                            `${seatsPerRow} are available`);
+        }
+
+        let currentPos = Math.floor((seatsPerRow - totalWidth) / 2);
+        partOrder.forEach((part, i) => {
+            if (partWidths[i] > 0) {
+                placeSection(chart, groups.get(part), 0, rows, currentPos, currentPos + partWidths[i]);
+                currentPos += partWidths[i];
+            }
+        });
+    }
+
+    function placeSideBySideVariable(chart, groups, partOrder, rowSizes, aisles) {
+        const numParts = partOrder.length;
+        const rows = rowSizes.length;
+        if (numParts === 0 || rows === 0) return;
+
+        const counts = partOrder.map(part => groups.get(part).length);
+        const total = sum(counts);
+        if (total === 0) return;
+        if (total > sum(rowSizes)) {
+            throw new Error(`Row sizes only have ${sum(rowSizes)} seats for ${total} singers`);
+        }
+
+        // Divide each row into sections in proportion to part sizes
+        const sectionWidths = rowSizes.map(rowWidth => {
+            const partSeats = [];
+            let remaining = rowWidth;
+            for (let i = 0; i < numParts; i++) {
+                let seats;
+                if (i === numParts - 1) {
+                    seats = remaining;
+                } else {
+                    seats = Math.min(pyRound(rowWidth * counts[i] / total), remaining);
+                }
+                partSeats.push(seats);
+                remaining -= seats;
+            }
+            return partSeats;
+        });
+
+        if (aisles) {
+            aisles.forEach((rowAisles, r) => snapSectionsToAisles(sectionWidths[r], rowAisles));
+        }
+
+        // Move seats from parts with spare seats to parts that rounding left short
+        const capacity = partOrder.map((_, i) => sum(sectionWidths.map(widths => widths[i])));
+        for (let i = 0; i < numParts; i++) {
+            while (capacity[i] < counts[i]) {
+                const donor = argmax(numParts, j => capacity[j] - counts[j]);
+                const r = argmax(rows, k => sectionWidths[k][donor]);
+                sectionWidths[r][donor] -= 1;
+                sectionWidths[r][i] += 1;
+                capacity[donor] -= 1;
+                capacity[i] += 1;
+            }
+        }
+
+        // Fill each part's sections back to front, tallest first
+        const rowStarts = new Array(rows).fill(0);
+        partOrder.forEach((part, i) => {
+            const queue = groups.get(part);
+            let next = 0;
+            let seatsAfter = capacity[i];
+            for (let r = 0; r < rows; r++) {
+                const width = sectionWidths[r][i];
+                const start = rowStarts[r];
+                rowStarts[r] += width;
+                seatsAfter -= width;
+
+                const remaining = counts[i] - next;
+                if (width <= 0 || remaining <= 0) continue;
+
+                let toPlace = Math.max(Math.ceil(remaining / (rows - r)), remaining - seatsAfter);
+                toPlace = Math.min(width, toPlace);
+                const offset = Math.floor((width - toPlace) / 2);
+                for (let j = 0; j < toPlace; j++) {
+                    chart[r][start + offset + j].singer = queue[next++];
+                }
+            }
+        });
+    }
+
+    // Section boundaries this many seats or fewer from an aisle are moved onto it
+    const AISLE_SNAP_SEATS = 2;
+
+    function snapSectionsToAisles(partSeats, rowAisles) {
+        let boundary = 0;
+        for (let i = 0; i < partSeats.length - 1; i++) {
+            boundary += partSeats[i];
+            const shifts = rowAisles.map(aisle => aisle - boundary)
+                .filter(shift => Math.abs(shift) <= AISLE_SNAP_SEATS)
+                .sort((x, y) => Math.abs(x) - Math.abs(y));
+            for (const shift of shifts) {
+                if (partSeats[i] + shift >= 0 && partSeats[i + 1] - shift >= 0) {
+                    partSeats[i] += shift;
+                    partSeats[i + 1] -= shift;
+                    boundary += shift;
+                    break;
+                }
+            }
+        }
+    }
+
+    function placeStacked(chart, groups, partOrder, rows, seatsPerRow, blocks = null) {
+        if (partOrder.length === 0) return;
+        let currentRow = 0;
+        stackedPartRows(rows, partOrder.length).forEach((partRows, i) => {
+            const endRow = currentRow + partRows;
+            const keys = blocks ? (blocks.get(partOrder[i]) || []) : [partOrder[i]];
+            if (keys.length <= 1) {
+                const section = keys.length ? groups.get(keys[0]) : [];
+                placeSection(chart, section, currentRow, endRow, 0, seatsPerRow);
+            } else if (partRows > 0) {
+                const widths = keys.map(key => Math.ceil(groups.get(key).length / partRows));
+                let start = Math.max(0, Math.floor((seatsPerRow - sum(widths)) / 2));
+                keys.forEach((key, k) => {
+                    placeSection(chart, groups.get(key), currentRow, endRow, start, start + widths[k]);
+                    start += widths[k];
+                });
+            }
+            currentRow = endRow;
+        });
+    }
+
+    function stackedPartRows(rows, numParts) {
+        const perPart = Math.floor(rows / numParts);
+        const extra = rows % numParts;
+        return Array.from({length: numParts}, (_, i) => perPart + (i < extra ? 1 : 0));
+    }
+
+    function placeSection(chart, singers, startRow, endRow, startPos, endPos) {
+        const numRows = endRow - startRow;
+        const total = singers.length;
+        if (total === 0 || endPos <= startPos || numRows === 0) return;
+
+        const widths = [];
+        for (let r = startRow; r < endRow; r++) {
+            widths.push(Math.max(0, Math.min(endPos, chart[r].length) - startPos));
+        }
+        let seatsAfter = sum(widths);
+
+        let next = 0;
+        for (let r = startRow; r < endRow; r++) {
+            const width = widths[r - startRow];
+            seatsAfter -= width;
+            const remaining = total - next;
+            if (remaining <= 0) break;
+
+            // Fill evenly, but never leave more singers than the rows in front can hold
+            let count = Math.max(Math.ceil(remaining / (endRow - r)), remaining - seatsAfter);
+            count = Math.min(width, count);
+            const offset = Math.floor((width - count) / 2);
+            for (let i = 0; i < count; i++) {
+                chart[r][startPos + offset + i].singer = singers[next++];
+            }
+        }
+    }
+
+    function calculateMinWidth(singers, partOrder, rows, layout = 'side-by-side',
+                               ensembleOrder = null) {
+        if (ensembleOrder) return ensembleMinWidth(singers, partOrder, rows, layout, ensembleOrder);
+        const counts = new Map(partOrder.map(part => [part, 0]));
+        singers.forEach(s => {
+            if (counts.has(s.voice_part)) counts.set(s.voice_part, counts.get(s.voice_part) + 1);
+        });
+
+        if (layout === 'stacked') {
+            let width = 0;
+            stackedPartRows(rows, partOrder.length).forEach((partRows, i) => {
+                const count = counts.get(partOrder[i]);
+                if (count > 0 && partRows === 0) {
+                    throw new Error(`Stacked layout needs at least ${partOrder.length} rows ` +
+                                    '(one per voice part)');
+                }
+                if (count > 0) width = Math.max(width, Math.ceil(count / partRows));
+            });
+            return width;
+        }
+        return sum(partOrder.map(part => {
+            const count = counts.get(part);
+            return count > 0 ? Math.ceil(count / rows) : 0;
+        }));
+    }
+
+    function ensembleMinWidth(singers, partOrder, rows, layout, ensembleOrder) {
+        const {groups, blocks} = groupByEnsemble(singers, partOrder, ensembleOrder);
+        const blockWidths = (part, partRows) => sum((blocks.get(part) || []).map(
+            key => Math.ceil(groups.get(key).length / partRows)));
+        if (layout === 'stacked') {
+            let width = 0;
+            stackedPartRows(rows, partOrder.length).forEach((partRows, i) => {
+                if (!blocks.has(partOrder[i])) return;
+                if (partRows === 0) {
+                    throw new Error(`Stacked layout needs at least ${partOrder.length} rows ` +
+                                    '(one per voice part)');
+                }
+                width = Math.max(width, blockWidths(partOrder[i], partRows));
+            });
+            return width;
+        }
+        return sum(partOrder.map(part => blockWidths(part, rows)));
+    }
+
+    function calculateChartDimensions(numSingers, numParts, layout) {
+        let rows = Math.max(2, Math.ceil(numSingers / 12));
+        if (layout === 'stacked') {
+            while (rows % numParts !== 0) rows++;
+        }
+        let seatsPerRow = Math.ceil(numSingers / rows);
+        if (layout === 'side-by-side') {
+            while (seatsPerRow % numParts !== 0) seatsPerRow++;
+        }
+        return [rows, seatsPerRow];
+    }
+
+    function calculateDimensionsWithUserInput(numSingers, numParts, layout, userRows, userMaxPerRow) {
+        if (userRows && userMaxPerRow) return [userRows, userMaxPerRow];
+        if (userRows) {
+            let seatsPerRow = Math.ceil(numSingers / userRows);
+            if (layout === 'side-by-side') {
+                while (seatsPerRow % numParts !== 0) seatsPerRow++;
+            }
+            return [userRows, seatsPerRow];
+        }
+        if (userMaxPerRow) {
+            let rows = Math.ceil(numSingers / userMaxPerRow);
+            if (layout === 'stacked') {
+                while (rows % numParts !== 0) rows++;
+            }
+            return [rows, userMaxPerRow];
+        }
+        return calculateChartDimensions(numSingers, numParts, layout);
+    }
+
+    /**
+     * Build a chart the way /preview does for a plain (no venue, no row sizes)
+     * configuration: work out rows and width from the optional user values,
+     * widen rows until every part fits, then place everyone.
+     */
+    function generateFromSettings(singers, partOrder, layout, userRows, userMaxPerRow,
+                                  ensembleOrder = null) {
+        let [rows, seatsPerRow] = calculateDimensionsWithUserInput(
+            singers.length, partOrder.length, layout, userRows, userMaxPerRow);
+        seatsPerRow = Math.max(seatsPerRow,
+                               calculateMinWidth(singers, partOrder, rows, layout, ensembleOrder));
+        return generateSeatingChart(singers, rows, seatsPerRow, partOrder, layout,
+                                    {ensembleOrder: ensembleOrder});
+    }
+
+    // Which rows need a half-seat offset for a brick pattern (rows of seat dicts)
+    function calculateStaggerOffsets(chart) {
+        if (!chart.length) return [];
+        const offsets = [false];
+        for (let i = 1; i < chart.length; i++) {
+            const current = chart[i].filter(seat => seat.singer).length;
+            const prev = chart[i - 1].filter(seat => seat.singer).length;
+            offsets.push(current % 2 === prev % 2 ? !offsets[i - 1] : offsets[i - 1]);
+        }
+        return offsets;
+    }
+
+    return {
+        generateSeatingChart,
+        generateFromSettings,
+        calculateMinWidth,
+        calculateChartDimensions,
+        calculateDimensionsWithUserInput,
+        calculateStaggerOffsets
+    };
+}));
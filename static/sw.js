@@ -0,0 +1,69 @@
+/*
+ * Service worker: keeps the app's static assets (styles, the placement
+ * engine, html2canvas) and the start page in a local cache. This only helps
+ * an already-open editor: swaps, undo, search and regenerating
+ * (static/placement.js) run in that page without the server. Reaching the
+ * editor, uploading, finalizing and exporting are form posts and still need
+ * a connection.
+ *
+ * Static assets are served from the cache and refreshed in the background;
+ * the start page is fetched from the network first and only read from the
+ * cache when offline. Form posts and API calls are never cached.
+ */
+const CACHE = 'choralchart-v2';
+const PRECACHE = [
+    '/',
+    '/static/style.css',
+    '/static/placement.js',
+    'https://cdnjs.cloudflare.com/ajax/libs/html2canvas/1.4.1/html2canvas.min.js'
+];
+
+self.addEventListener('install', event => {
+    // One unreachable asset (e.g. the CDN) shouldn't stop the rest being cached
+    event.waitUntil(caches.open(CACHE).then(cache =>
+        Promise.all(PRECACHE.map(url => cache.add(url).catch(() => {})))));
+    self.skipWaiting();
+});
+
+self.addEventListener('activate', event => {
+    event.waitUntil(caches.keys()
+        .then(keys => Promise.all(keys.filter(key => key !== CACHE).map(key => caches.delete(key))))
+        .then(() => self.clients.claim()));
+});
+
+function isStaticAsset(url) {
+    return (url.origin === self.location.origin && url.pathname.startsWith('/static/'))
+        || url.origin === 'https://cdnjs.cloudflare.com';
+}
+
+self.addEventListener('fetch', event => {
+    const request = event.request;
+    if (request.method !== 'GET') return;
+    const url = new URL(request.url);
+
+    if (isStaticAsset(url)) {
+        // Stale-while-revalidate
+        event.respondWith(caches.open(CACHE).then(cache => cache.match(request).then(cached => {
+            const fresh = fetch(request).then(response => {
+                if (response.ok) cache.put(request, response.clone());
+                return response;
+            });
+            if (cached) {
+                fresh.catch(() => {});
+                return cached;
+            }
+            return fresh;
+        })));
+    } else if (request.mode === 'navigate' && url.origin === self.location.origin && url.pathname === '/') {
+        // Network first for the start page, cached copy when offline
+        event.respondWith(fetch(request)
+            .then(response => {
+                if (response.ok) {
+                    const copy = response.clone();
+                    caches.open(CACHE).then(cache => cache.put('/', copy));
+                }
+                return response;
+            })
+            .catch(() => caches.match('/')));
+    }
+});
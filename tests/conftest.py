@@ -0,0 +1,14 @@
+"""Shared test setup."""
+
+import pytest
+
+from app import app
+
+
+@pytest.fixture(autouse=True)
+def no_rate_limiting():
+    """Most tests post many charts from one client; rate limit tests turn it back on."""
+    enabled = app.config['RATE_LIMITING']
+    app.config['RATE_LIMITING'] = False
+    yield
+    app.config['RATE_LIMITING'] = enabled
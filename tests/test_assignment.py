@@ -0,0 +1,58 @@
+"""Tests for the minimum-cost assignment solver."""
+
+import itertools
+import math
+import random
+
+import pytest
+
+from assignment import solve_assignment
+
+
+def brute_force(cost):
+    """Cheapest total over every way of giving each row its own column."""
+    n, m = len(cost), len(cost[0])
+    return min(sum(cost[i][j] for i, j in enumerate(cols))
+               for cols in itertools.permutations(range(m), n))
+
+
+def total(cost, assignment):
+    return sum(cost[i][j] for i, j in enumerate(assignment))
+
+
+def test_matches_brute_force_on_small_matrices():
+    rng = random.Random(1)
+    for _ in range(300):
+        n = rng.randint(1, 5)
+        m = rng.randint(n, 6)
+        cost = [[rng.choice([rng.randint(0, 9), rng.random() * 10]) for _ in range(m)]
+                for _ in range(n)]
+        assignment = solve_assignment(cost)
+        assert len(set(assignment)) == n
+        assert all(0 <= j < m for j in assignment)
+        assert total(cost, assignment) == pytest.approx(brute_force(cost))
+
+
+def test_forbidden_cells_are_avoided():
+    rng = random.Random(2)
+    checked = 0
+    for _ in range(300):
+        n = rng.randint(1, 5)
+        m = rng.randint(n, 6)
+        cost = [[math.inf if rng.random() < 0.3 else rng.randint(0, 9) for _ in range(m)]
+                for _ in range(n)]
+        best = brute_force(cost)
+        if best == math.inf:
+            with pytest.raises(ValueError):
+                solve_assignment(cost)
+        else:
+            assert total(cost, solve_assignment(cost)) == best
+            checked += 1
+    assert checked > 100
+
+
+def test_shapes():
+    assert solve_assignment([]) == []
+    assert solve_assignment([[5, 1, 3]]) == [1]
+    with pytest.raises(ValueError):
+        solve_assignment([[1], [2]])
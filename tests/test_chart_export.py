@@ -0,0 +1,113 @@
+"""Tests for the handout zip export."""
+
+import base64
+import csv
+import io
+import json
+import zipfile
+from datetime import datetime
+
+from app import app, encode_chart
+from chart_export import ExportEvent, benchmark, export_files, stream_zip
+from seating_algorithm import calculate_min_width, generate_random_roster, generate_seating_chart
+
+PARTS = ['Soprano', 'Alto', 'Tenor', 'Bass']
+
+
+def make_chart(num_singers=40, rows=4):
+    singers = generate_random_roster(num_singers, PARTS, seed=num_singers)
+    return generate_seating_chart(singers, rows, calculate_min_width(singers, PARTS, rows), PARTS)
+
+
+def read_zip(chunks):
+    return zipfile.ZipFile(io.BytesIO(b''.join(chunks)))
+
+
+def test_zip_contents():
+    chart = make_chart()
+    event = ExportEvent('Spring Concert, 2026', datetime(2026, 5, 1, 19, 30), location='Main Hall')
+    archive = read_zip(stream_zip(export_files(chart, PARTS, html=['<html>', '</html>'], event=event)))
+
+    names = archive.namelist()
+    assert names == ['seating_chart.csv', 'parts/Soprano.csv', 'parts/Alto.csv', 'parts/Tenor.csv',
+                     'parts/Bass.csv', 'chart.json', 'chart.html', 'concert.ics']
+
+    rows = list(csv.DictReader(io.StringIO(archive.read('seating_chart.csv').decode())))
+    assert len(rows) == 40
+    # Front row first, numbered from 1 as on the chart
+    assert rows[0]['row'] == '1'
+    front_names = {seat.singer.name for seat in chart[-1] if seat.singer}
+    assert rows[0]['name'] in front_names
+
+    altos = list(csv.DictReader(io.StringIO(archive.read('parts/Alto.csv').decode())))
+    assert len(altos) == sum(1 for row in chart for seat in row
+                             if seat.singer and seat.singer.voice_part == 'Alto')
+
+    # Same schema the editor uses for chart_data
+    expected = json.loads(base64.b64decode(encode_chart(chart)))
+    assert json.loads(archive.read('chart.json')) == expected
+
+    ics = archive.read('concert.ics').decode()
+    assert 'SUMMARY:Spring Concert\\, 2026' in ics
+    assert 'DTSTART:20260501T193000' in ics
+    assert all(len(line.encode()) <= 75 for line in ics.split('\r\n'))
+
+
+
+def test_colliding_file_names_are_made_unique():
+    parts = ['Soprano/1', 'Soprano?1', 'soprano_1', 'Alto']
+    singers = generate_random_roster(32, parts, distribution=[8, 8, 8, 8], seed=5)
+    chart = generate_seating_chart(singers, 2, calculate_min_width(singers, parts, 2), parts)
+    archive = read_zip(stream_zip(export_files(chart, parts)))
+    names = archive.namelist()
+    assert len(names) == len(set(names))
+    assert [n for n in names if n.startswith('parts/')] == [
+        'parts/Soprano_1.csv', 'parts/Soprano_1-2.csv', 'parts/soprano_1-3.csv', 'parts/Alto.csv']
+    assert len(list(csv.DictReader(io.StringIO(archive.read('parts/Soprano_1-2.csv').decode())))) == 8
+
+
+def test_zip_is_streamed_in_pieces():
+    chunks = list(stream_zip(export_files(make_chart(1000, 20), PARTS)))
+    assert len(chunks) > 5
+    read_zip(chunks).testzip()
+
+
+def test_export_benchmark_1000_seats():
+    result = benchmark(1000, repeats=3)
+    assert result['seats'] >= 1000
+    # Generous bound: a handout zip for a thousand seats takes tens of milliseconds
+    assert result['best_seconds'] < 1.0
+    assert result['largest_chunk_bytes'] < result['zip_bytes']
+
+
+def test_export_route():
+    chart = make_chart()
+    response = app.test_client().post('/export', data={
+        'chart_data': encode_chart(chart),
+        'part_order': ', '.join(PARTS),
+        'title': 'Fall Concert',
+        'event_start': '2026-11-20T19:00',
+    })
+    assert response.status_code == 200
+    assert response.mimetype == 'application/zip'
+    archive = read_zip([response.data])
+    html = archive.read('chart.html').decode()
+    assert 'Fall Concert' in html and 'Row 1' in html
+    assert 'concert.ics' in archive.namelist()
+
+
+def test_export_route_indexes_chart_once(monkeypatch):
+    import app as app_module
+    import chart_export
+    original, calls = chart_export.index_chart, []
+
+    def counting_index(chart, part_order):
+        calls.append(1)
+        return original(chart, part_order)
+
+    monkeypatch.setattr(app_module, 'index_chart', counting_index)
+    monkeypatch.setattr(chart_export, 'index_chart', counting_index)
+    response = app.test_client().post('/export', data={
+        'chart_data': encode_chart(make_chart()), 'part_order': ', '.join(PARTS)})
+    assert len(read_zip([response.data]).namelist()) > 1
+    assert len(calls) == 1
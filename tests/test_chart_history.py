@@ -0,0 +1,120 @@
+"""Tests for undo/redo history of chart edits."""
+
+import copy
+
+import pytest
+
+from app import app, encode_chart
+from chart_history import ChartHistory, apply_operation, invert_operation
+from seating_algorithm import Seat, Singer, generate_random_roster, generate_seating_chart
+
+
+def small_chart():
+    return [[Seat(0, 0, Singer('Ana', 'Alto', 64)), Seat(0, 1, Singer('Ben', 'Bass', 70)),
+             Seat(0, 2), Seat(0, 3, blocked=True)]]
+
+
+def swap(a, b):
+    return {'type': 'swap', 'a': [0, a], 'b': [0, b]}
+
+
+def set_part(pos, old, new):
+    return {'type': 'set_part', 'seat': [0, pos], 'old': old, 'new': new}
+
+
+def test_apply_undo_redo_round_trip():
+    chart = small_chart()
+    original = copy.deepcopy(chart)
+    history = ChartHistory()
+    history.apply(chart, swap(0, 2))
+    history.apply(chart, set_part(1, 'Bass', 'Tenor'))
+    edited = copy.deepcopy(chart)
+    assert chart[0][2].singer.name == 'Ana' and chart[0][1].singer.voice_part == 'Tenor'
+
+    assert history.undo(chart) == set_part(1, 'Bass', 'Tenor')
+    assert history.undo(chart) == swap(0, 2)
+    assert chart == original
+    assert history.undo(chart) is None and not history.can_undo
+
+    history.redo(chart)
+    history.redo(chart)
+    assert chart == edited
+    assert history.redo(chart) is None and not history.can_redo
+
+
+def test_invert_returns_a_new_operation():
+    for op in [swap(0, 1), set_part(0, 'Alto', 'Soprano')]:
+        inverse = invert_operation(op)
+        assert inverse is not op
+        chart = small_chart()
+        apply_operation(chart, op)
+        apply_operation(chart, inverse)
+        assert chart == small_chart()
+
+
+def test_invalid_operations():
+    chart = small_chart()
+    with pytest.raises(ValueError):
+        apply_operation(chart, swap(0, 3))  # Blocked seat
+    with pytest.raises(ValueError):
+        apply_operation(chart, set_part(2, 'Alto', 'Bass'))  # Empty seat
+    with pytest.raises(ValueError):
+        apply_operation(chart, {'type': 'rotate'})
+
+
+def test_new_apply_clears_redo():
+    chart = small_chart()
+    history = ChartHistory()
+    history.apply(chart, swap(0, 1))
+    history.undo(chart)
+    assert history.can_redo
+    history.apply(chart, swap(1, 2))
+    assert not history.can_redo
+    assert list(history.undo_stack) == [swap(1, 2)]
+
+
+def test_max_depth_keeps_newest():
+    chart = small_chart()
+    history = ChartHistory(max_depth=3)
+    ops = [swap(0, 1), swap(1, 2), swap(0, 2), set_part(0, 'Bass', 'Tenor'), swap(0, 1)]
+    for op in ops:
+        history.apply(chart, op)
+    assert list(history.undo_stack) == ops[-3:]
+    for _ in range(3):
+        history.undo(chart)
+    assert history.undo(chart) is None
+    assert list(history.redo_stack) == ops[:-4:-1]
+    with pytest.raises(ValueError):
+        ChartHistory(max_depth=0)
+
+
+def test_encode_decode_round_trip():
+    chart = small_chart()
+    history = ChartHistory(max_depth=10)
+    history.apply(chart, swap(0, 2))
+    history.apply(chart, set_part(1, 'Bass', 'Tenor'))
+    history.undo(chart)
+    decoded = ChartHistory.decode(history.encode(), 10)
+    assert list(decoded.undo_stack) == [swap(0, 2)]
+    assert list(decoded.redo_stack) == [set_part(1, 'Bass', 'Tenor')]
+    # Decoding into a shallower history keeps the newest entries
+    deep = ChartHistory(max_depth=10, undo_stack=[swap(0, 1), swap(1, 2), swap(0, 2)])
+    assert list(ChartHistory.decode(deep.encode(), 2).undo_stack) == [swap(1, 2), swap(0, 2)]
+    assert not ChartHistory.decode('').can_undo
+
+
+def test_decoding_garbage_gives_empty_history():
+    for garbage in ['abc', '!!!!', 'aGVsbG8=', 'W10=', '//79']:
+        history = ChartHistory.decode(garbage, 5)
+        assert not history.can_undo and not history.can_redo
+        assert history.max_depth == 5
+
+
+def test_tampered_history_does_not_break_editor():
+    singers = generate_random_roster(12, ['Soprano', 'Alto'], seed=1)
+    chart = generate_seating_chart(singers, 2, 6, ['Soprano', 'Alto'])
+    form = {'chart_data': encode_chart(chart), 'part_order': 'Soprano, Alto',
+            'singers_data': '', 'num_singers': '12', 'history_data': 'eyJ1bmRv'}
+    response = app.test_client().post('/edit', data=form)
+    assert response.status_code == 200
+    assert b'id="chart"' in response.data
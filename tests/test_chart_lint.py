@@ -0,0 +1,90 @@
+"""Tests for the chart linter."""
+
+import random
+
+import pytest
+
+from app import app, encode_chart
+from chart_lint import ChartLinter, LinterRegistry, UnknownLinterError, lint_chart
+from seating_algorithm import (
+    Seat, Singer, calculate_min_width, generate_random_roster, generate_seating_chart
+)
+
+PARTS = ['Soprano', 'Alto', 'Tenor', 'Bass']
+
+
+def make_chart(rows):
+    """Build a chart from rows of (name, part, height) tuples or None for empty seats."""
+    return [[Seat(r, p, Singer(*cell) if cell else None) for p, cell in enumerate(row)]
+            for r, row in enumerate(rows)]
+
+
+def rules(findings):
+    return sorted(f.rule for f in findings)
+
+
+def test_generated_chart_is_clean():
+    singers = generate_random_roster(40, PARTS, seed=4)
+    chart = generate_seating_chart(singers, 4, calculate_min_width(singers, PARTS, 4), PARTS)
+    findings = lint_chart(chart, [s.name for s in singers])
+    assert 'unplaced' not in rules(findings)
+    assert 'islands' not in rules(findings)
+    assert 'hole' not in rules(findings)
+
+
+def test_each_rule():
+    chart = make_chart([
+        [('A', 'Alto', 60), None, ('B', 'Alto', 70), ('T', 'Tenor', 70)],
+        [('C', 'Alto', 65), ('D', 'Soprano', 72), ('E', 'Alto', 66), ('U', 'Tenor', 70)],
+    ])
+    findings = lint_chart(chart, ['A', 'B', 'C', 'D', 'E', 'T', 'U', 'Missing'])
+    assert rules(findings) == ['hole', 'islands', 'one_wide', 'sight_line', 'unplaced']
+    assert findings[0].rule == 'unplaced' and findings[0].severity == 'error'
+    by_rule = {f.rule: f for f in findings}
+    assert by_rule['hole'].seats == [(0, 1)]
+    # C (front) is taller than A directly behind; D has no one behind
+    assert by_rule['sight_line'].seats == [(1, 0), (0, 0)]
+    assert by_rule['islands'].seats == [(0, 2), (1, 2)]
+    assert 'Tenor' in by_rule['one_wide'].message
+
+
+def test_incremental_matches_full_lint():
+    rng = random.Random(7)
+    for seed in range(30):
+        singers = generate_random_roster(rng.randint(5, 60), PARTS, seed=seed)
+        rows = rng.randint(1, 5)
+        width = calculate_min_width(singers, PARTS, rows) + rng.randint(0, 3)
+        chart = generate_seating_chart(singers, rows, width, PARTS)
+        linter = ChartLinter(chart, [s.name for s in singers])
+        seats = [(seat.row, seat.position) for row in chart for seat in row]
+        for _ in range(40):
+            a, b = rng.sample(seats, 2) if len(seats) > 1 else (seats[0], seats[0])
+            if rng.random() < 0.2 and chart[a[0]][a[1]].singer is not None:
+                singer = chart[a[0]][a[1]].singer
+                linter.apply({'type': 'set_part', 'seat': list(a),
+                              'old': singer.voice_part, 'new': rng.choice(PARTS)})
+            else:
+                linter.apply({'type': 'swap', 'a': list(a), 'b': list(b)})
+            assert linter.findings == lint_chart(chart, [s.name for s in singers])
+
+
+def test_registry_evicts_oldest():
+    registry = LinterRegistry(max_linters=2)
+    chart = make_chart([[('A', 'Alto', 60), ('B', 'Alto', 62)]])
+    first, _ = registry.create(chart)
+    registry.create(make_chart([[('A', 'Alto', 60)]]))
+    registry.create(make_chart([[('A', 'Alto', 60)]]))
+    with pytest.raises(UnknownLinterError):
+        registry.apply(first, [])
+
+
+def test_lint_routes():
+    chart = make_chart([[('A', 'Alto', 60), ('B', 'Alto', 62), None, ('C', 'Alto', 61)]])
+    client = app.test_client()
+    created = client.post('/lint', json={'chart_data': encode_chart(chart)}).get_json()
+    assert [f['rule'] for f in created['findings']] == ['hole', 'islands']
+
+    response = client.post(f"/lint/{created['lint_id']}/ops",
+                           json={'ops': [{'type': 'swap', 'a': [0, 2], 'b': [0, 3]}]})
+    assert response.get_json() == {'findings': []}
+    assert client.post('/lint/missing/ops', json={'ops': []}).status_code == 404
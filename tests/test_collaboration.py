@@ -0,0 +1,185 @@
+"""Tests for live collaborative editing."""
+
+import asyncio
+
+import pytest
+
+from collaboration import ChartSession, CollaborationHub, UnknownChartError, simulate_clients
+from seating_algorithm import Seat, Singer
+
+
+def small_chart():
+    return [[Seat(0, p, Singer(f'Singer {p}', 'Alto', 60 + p)) for p in range(4)],
+            [Seat(1, p, Singer(f'Singer {4 + p}', 'Bass', 70 + p)) for p in range(4)]]
+
+
+def swap(a, b):
+    return {'type': 'swap', 'a': list(a), 'b': list(b)}
+
+
+def names(chart):
+    return [[seat.singer.name if seat.singer else None for seat in row] for row in chart]
+
+
+def test_stale_conflicting_swap_rejected():
+    session = ChartSession(chart=small_chart())
+    assert session.submit(swap((0, 0), (0, 1)), 0, 'alice')['accepted']
+    # Bob has not seen version 1 and moves one of the same seats
+    result = session.submit(swap((0, 1), (1, 1)), 0, 'bob')
+    assert not result['accepted']
+    assert result['version'] == 1
+    assert names(session.chart)[0][:2] == ['Singer 1', 'Singer 0']
+
+
+def test_concurrent_non_overlapping_operations_both_applied():
+    session = ChartSession(chart=small_chart())
+    assert session.submit(swap((0, 0), (0, 1)), 0, 'alice')['accepted']
+    assert session.submit({'type': 'set_part', 'seat': [1, 3], 'old': 'Bass', 'new': 'Tenor'},
+                          0, 'bob')['accepted']
+    assert session.version == 2
+    assert names(session.chart)[0][:2] == ['Singer 1', 'Singer 0']
+    assert session.chart[1][3].singer.voice_part == 'Tenor'
+
+
+def test_own_earlier_operations_never_conflict():
+    session = ChartSession(chart=small_chart())
+    assert session.submit(swap((0, 0), (0, 1)), 0, 'alice')['accepted']
+    assert session.submit(swap((0, 1), (0, 2)), 0, 'alice')['accepted']
+
+
+def test_out_of_range_seat_is_an_error():
+    with pytest.raises(ValueError):
+        ChartSession(chart=small_chart()).submit(swap((0, 0), (5, 0)), 0)
+
+
+@pytest.mark.parametrize('op', [
+    {'type': 'set_part', 'seat': [0, 0], 'old': 'Alto', 'new': '<img src=x onerror=alert(1)>'},
+    {'type': 'set_part', 'seat': [0, 0], 'old': 'Alto', 'new': {'a': 1}},
+    {'type': 'set_part', 'seat': [0, 0], 'old': None, 'new': 'Bass'},
+    {'type': 'set_part', 'seat': ['0', 0], 'old': 'Alto', 'new': 'Bass'},
+    {'type': 'swap', 'a': [0, 0], 'b': [0, -1]},
+    {'type': 'swap', 'a': [0, 0, 1], 'b': [0, 1]},
+    {'type': 'rotate', 'seat': [0, 0]},
+    ['swap'],
+])
+def test_malformed_operations_rejected(op):
+    session = ChartSession(chart=small_chart(), meta={'part_order': ['Alto', 'Bass']})
+    with pytest.raises(ValueError):
+        session.submit(op, 0, 'mallory')
+    assert session.version == 0 and not session.log
+
+
+def test_logged_operations_keep_only_known_keys():
+    session = ChartSession(chart=small_chart(), meta={'part_order': ['Alto', 'Bass']})
+    session.submit({'type': 'set_part', 'seat': [0, 0], 'old': 'Alto', 'new': 'Bass',
+                    'extra': '<script>'}, 0)
+    assert session.log[-1]['op'] == {'type': 'set_part', 'seat': [0, 0], 'old': 'Alto', 'new': 'Bass'}
+
+
+def test_events_echo_the_client_operation_id():
+    import app as app_module
+    chart_id = app_module.run_on_hub(app_module.collab_hub.create_session(small_chart()))
+    client = app_module.app.test_client()
+    response = client.post(f'/collab/{chart_id}/ops', json={
+        'op': swap((0, 0), (0, 1)), 'base_version': 0, 'client_id': 'alice', 'op_id': 7})
+    assert response.get_json()['accepted']
+    event = app_module.collab_hub.get_session(chart_id).log[-1]
+    assert (event['client_id'], event['op_id']) == ('alice', 7)
+
+
+def test_submit_route_rejects_unknown_parts():
+    import app as app_module
+    chart_id = app_module.run_on_hub(app_module.collab_hub.create_session(
+        small_chart(), {'part_order': ['Alto', 'Bass']}))
+    client = app_module.app.test_client()
+    response = client.post(f'/collab/{chart_id}/ops', json={
+        'op': {'type': 'set_part', 'seat': [0, 0], 'old': 'Alto', 'new': {'a': 1}},
+        'base_version': 0})
+    assert response.status_code == 400
+    assert app_module.collab_hub.get_session(chart_id).version == 0
+
+
+def test_hub_broadcasts_accepted_operations():
+    async def scenario():
+        hub = CollaborationHub()
+        chart_id = await hub.create_session(small_chart())
+        queue = await hub.subscribe(chart_id)
+        await hub.submit(chart_id, swap((0, 0), (1, 0)), 0, 'alice')
+        await hub.submit(chart_id, swap((1, 0), (1, 1)), 0, 'bob')  # Conflicts
+        events = [queue.get_nowait() for _ in range(queue.qsize())]
+        late = await hub.subscribe(chart_id, since=0)
+        return events, late.qsize()
+
+    events, replayed = asyncio.run(scenario())
+    assert [(e['version'], e['client_id']) for e in events] == [(1, 'alice')]
+    assert replayed == 1
+
+
+def test_unknown_chart():
+    with pytest.raises(UnknownChartError):
+        CollaborationHub().get_session('missing')
+
+
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_replicas_converge(seed):
+    converged, rejected = asyncio.run(simulate_clients(num_clients=12, ops_per_client=30,
+                                                       seed=seed))
+    assert converged
+    assert rejected > 0
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_hub_evicts_idle_and_least_recently_used_sessions():
+    async def scenario():
+        clock = FakeClock()
+        hub = CollaborationHub(max_sessions=2, idle_seconds=100, clock=clock)
+        first = await hub.create_session(small_chart())
+        second = await hub.create_session(small_chart())
+        hub.get_session(first)
+        third = await hub.create_session(small_chart())
+        lru = set(hub.sessions)
+
+        # A session someone is viewing survives, however long it sits idle
+        queue = await hub.subscribe(third)
+        clock.now += 500
+        await hub.create_session(small_chart())
+        idle = set(hub.sessions)
+        hub.unsubscribe(third, queue)
+        kept_after_leaving = third in hub.sessions
+        return first, second, third, lru, idle, kept_after_leaving
+
+    first, second, third, lru, idle, kept_after_leaving = asyncio.run(scenario())
+    assert lru == {first, third}
+    assert third in idle and first not in idle and len(idle) == 2
+    assert kept_after_leaving
+
+
+def test_event_stream_ends_and_replays_on_reconnect(monkeypatch):
+    import app as app_module
+    monkeypatch.setitem(app_module.app.config, 'COLLAB_STREAM_SECONDS', 0.2)
+    chart_id = app_module.run_on_hub(app_module.collab_hub.create_session(small_chart()))
+    app_module.run_on_hub(app_module.collab_hub.submit(chart_id, swap((0, 0), (0, 1)), 0, 'a'))
+    client = app_module.app.test_client()
+
+    # The stream closes by itself; a reconnect from version 0 gets the missed event
+    with client.get(f'/collab/{chart_id}/events', headers={'Last-Event-ID': '0'}) as response:
+        body = response.get_data(as_text=True)
+    assert body.startswith('retry: 1000')
+    assert 'id: 1\n' in body
+    assert app_module._collab_streams == 0
+
+
+def test_event_streams_are_capped(monkeypatch):
+    import app as app_module
+    monkeypatch.setitem(app_module.app.config, 'COLLAB_MAX_STREAMS', 0)
+    chart_id = app_module.run_on_hub(app_module.collab_hub.create_session(small_chart()))
+    response = app_module.app.test_client().get(f'/collab/{chart_id}/events')
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '5'
@@ -0,0 +1,85 @@
+"""Tests for multi-piece concert planning."""
+
+import time
+
+import pytest
+
+from concert_planner import PieceConfig, plan_concert
+from seating_algorithm import generate_random_roster
+
+PARTS = ['Soprano 1', 'Soprano 2', 'Alto', 'Tenor', 'Bass']
+
+
+def seats_by_name(chart):
+    return {seat.singer.name: (seat.row, seat.position)
+            for row in chart for seat in row if seat.singer is not None}
+
+
+def test_same_setup_twice_moves_nobody():
+    singers = generate_random_roster(40, PARTS, seed=1)
+    piece = PieceConfig('Anthem', PARTS, rows=4)
+    plan = plan_concert(singers, [piece, PieceConfig('Encore', PARTS, rows=4)])
+    assert plan.moves == [0, 0]
+    assert seats_by_name(plan.charts[0]) == seats_by_name(plan.charts[1])
+
+
+def test_seats_stay_stable_across_pieces():
+    singers = generate_random_roster(48, PARTS, seed=3)
+    pieces = [
+        PieceConfig('SSATB', PARTS, rows=4),
+        # Sopranos merge into one section
+        PieceConfig('SATB', ['Soprano', 'Alto', 'Tenor', 'Bass'], rows=4,
+                    part_map={'Soprano 1': 'Soprano', 'Soprano 2': 'Soprano'}),
+        PieceConfig('SSATB again', PARTS, rows=4),
+    ]
+    plan = plan_concert(singers, pieces)
+    # Back in the first setup, everyone returns to their first seat
+    assert seats_by_name(plan.charts[2]) == seats_by_name(plan.charts[0])
+
+    # Singers travel less than when height order is all that counts
+    height_only = plan_concert(singers, pieces, height_weight=1e6)
+    assert plan.distances[1] < height_only.distances[1]
+
+    # Each part keeps the seats generation gave it
+    for piece, chart in zip(pieces, plan.charts):
+        expected = plan_concert(singers, [piece]).charts[0]
+        assert ([[seat.singer and seat.singer.voice_part for seat in row] for row in chart]
+                == [[seat.singer and seat.singer.voice_part for seat in row] for row in expected])
+
+
+def test_returning_singers_sit_near_their_old_seats():
+    singers = generate_random_roster(40, ['Soprano', 'Alto', 'Tenor', 'Bass'], seed=5)
+    pieces = [PieceConfig('Full', ['Soprano', 'Alto', 'Tenor', 'Bass'], rows=4),
+              PieceConfig('Treble', ['Soprano', 'Alto'], rows=4),
+              PieceConfig('Full again', ['Soprano', 'Alto', 'Tenor', 'Bass'], rows=4)]
+    plan = plan_concert(singers, pieces)
+    men = {s.name for s in singers if s.voice_part in ('Tenor', 'Bass')}
+    assert set(plan.sitting_out[1]) == men
+    assert plan.sitting_out[0] == plan.sitting_out[2] == []
+    first, last = seats_by_name(plan.charts[0]), seats_by_name(plan.charts[2])
+    assert all(first[name] == last[name] for name in men)
+
+
+def test_reports_singers_who_do_not_fit():
+    singers = generate_random_roster(20, ['Soprano', 'Alto'], seed=2)
+    pieces = [PieceConfig('Opener', ['Soprano', 'Alto'], rows=2),
+              PieceConfig('Tiny stage', ['Soprano', 'Alto'], row_sizes=[6, 6])]
+    with pytest.raises(ValueError, match='Tiny stage: .*12 seats for 20 singers'):
+        plan_concert(singers, pieces)
+
+
+def test_replanning_a_concert_is_interactive():
+    singers = generate_random_roster(200, PARTS, seed=9)
+    satb = PieceConfig('SATB', ['Soprano', 'Alto', 'Tenor', 'Bass'], rows=5,
+                       part_map={'Soprano 1': 'Soprano', 'Soprano 2': 'Soprano'})
+    pieces = [PieceConfig(f'Piece {i}', PARTS, rows=5 + i % 2) if i % 3 else satb
+              for i in range(9)]
+    times = []
+    for _ in range(3):
+        start = time.perf_counter()
+        plan = plan_concert(singers, pieces)
+        times.append(time.perf_counter() - start)
+    assert len(plan.charts) == 9
+    # A fraction of a second here: generous for slow machines, but low enough
+    # to catch a regression to a slower matching
+    assert min(times) < 1.0, f'200 singers over 9 pieces took {min(times):.2f}s'
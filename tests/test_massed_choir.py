@@ -0,0 +1,219 @@
+"""Tests for massed choirs: ensemble blocks within parts and per-ensemble views."""
+
+import io
+import time
+import zipfile
+
+from app import app, encode_chart, parse_csv
+from massed_choir import combine_rosters, ensemble_views, extract_ensemble
+from seating_algorithm import (
+    Singer, calculate_min_width, generate_random_roster, generate_seating_chart,
+    get_unique_ensembles
+)
+from section_balance import BalanceOptions, balance_sections
+
+PARTS = ['Soprano', 'Alto', 'Tenor', 'Bass']
+
+
+def massed_roster(ensembles, per_ensemble, seed=0):
+    return combine_rosters({name: generate_random_roster(per_ensemble, PARTS, seed=seed + i)
+                            for i, name in enumerate(ensembles)})
+
+
+def massed_chart(singers, ensembles, rows, layout='side-by-side'):
+    width = calculate_min_width(singers, PARTS, rows, layout, ensembles)
+    return generate_seating_chart(singers, rows, width, PARTS, layout, ensemble_order=ensembles)
+
+
+def block_columns(chart):
+    """(part, ensemble) -> set of columns it uses."""
+    columns = {}
+    for row in chart:
+        for seat in row:
+            if seat.singer is not None:
+                key = (seat.singer.voice_part, seat.singer.ensemble)
+                columns.setdefault(key, set()).add(seat.position)
+    return columns
+
+
+def assert_blocks_in_order(chart, keys):
+    """Every row reads left to right in `keys` order; a part's blocks never share a column."""
+    rank = {key: i for i, key in enumerate(keys)}
+    for row in chart:
+        ranks = [rank[seat.singer.voice_part, seat.singer.ensemble]
+                 for seat in row if seat.singer is not None]
+        assert ranks == sorted(ranks)
+    columns = list(block_columns(chart).items())
+    for i, (key_a, a) in enumerate(columns):
+        for key_b, b in columns[i + 1:]:
+            if key_a[0] == key_b[0]:
+                assert not a & b
+
+
+def test_combine_rosters_tags_copies():
+    school = [Singer('Ana', 'Alto', 64, tags=['descant'])]
+    combined = combine_rosters({'North': school, 'South': [Singer('Ben', 'Bass', 70, ensemble='Band')]})
+    assert [(s.name, s.ensemble) for s in combined] == [('Ana', 'North'), ('Ben', 'Band')]
+    assert school[0].ensemble is None
+    combined[0].tags.append('solo')
+    assert school[0].tags == ['descant']
+    assert get_unique_ensembles(combined) == ['North', 'Band']
+
+
+def test_side_by_side_keeps_ensembles_together_in_part_order():
+    ensembles = ['North', 'South', 'East']
+    singers = massed_roster(ensembles, 37)
+    chart = massed_chart(singers, ['South', 'North', 'East'], 4)
+    assert sum(seat.singer is not None for row in chart for seat in row) == len(singers)
+    assert_blocks_in_order(chart, [(p, e) for p in PARTS for e in ['South', 'North', 'East']])
+
+
+def test_height_order_within_each_ensemble():
+    ensembles = ['North', 'South', 'East']
+    singers = massed_roster(ensembles, 60, seed=4)
+    chart = massed_chart(singers, ensembles, 5)
+    for part in PARTS:
+        for ensemble in ensembles:
+            heights = [[seat.singer.height for seat in row
+                        if seat.singer is not None
+                        and (seat.singer.voice_part, seat.singer.ensemble) == (part, ensemble)]
+                       for row in chart]
+            heights = [row for row in heights if row]
+            # Back rows are at least as tall as every row in front of them
+            for back, front in zip(heights, heights[1:]):
+                assert min(back) >= max(front)
+
+
+def test_stacked_blocks_side_by_side_within_each_band():
+    ensembles = ['North', 'South']
+    singers = massed_roster(ensembles, 48, seed=2)
+    chart = massed_chart(singers, ensembles, 8, layout='stacked')
+    assert sum(seat.singer is not None for row in chart for seat in row) == len(singers)
+    for band, part in enumerate(PARTS):
+        band_rows = chart[band * 2:band * 2 + 2]
+        assert {seat.singer.voice_part for row in band_rows for seat in row if seat.singer} == {part}
+    assert_blocks_in_order(chart, [(p, e) for p in PARTS for e in ensembles])
+
+
+def test_unlisted_ensembles_follow_listed_ones():
+    singers = massed_roster(['North', 'South', 'East'], 24)
+    singers += [Singer(f'Guest {i}', PARTS[i % 4], 65) for i in range(8)]
+    chart = massed_chart(singers, ['East'], 3)
+    assert_blocks_in_order(chart, [(p, e) for p in PARTS
+                                   for e in ['East', 'North', 'South', None]])
+
+
+def test_variable_rows_and_blocked_seats_keep_blocks():
+    ensembles = ['North', 'South']
+    singers = massed_roster(ensembles, 40, seed=7)
+    chart = generate_seating_chart(singers, 4, 24, PARTS, row_sizes=[24, 22, 20, 18],
+                                   blocked_seats={(0, 5), (2, 10)}, ensemble_order=ensembles)
+    assert sum(seat.singer is not None for row in chart for seat in row) == len(singers)
+    assert all(seat.singer is None for row in chart for seat in row if seat.blocked)
+    for row in chart:
+        order = [(PARTS.index(seat.singer.voice_part), ensembles.index(seat.singer.ensemble))
+                 for seat in row if seat.singer is not None]
+        assert order == sorted(order)
+
+
+def test_without_ensemble_order_ensembles_are_ignored():
+    singers = massed_roster(['North', 'South'], 30)
+    plain = [Singer(s.name, s.voice_part, s.height) for s in singers]
+    chart = generate_seating_chart(singers, 4, calculate_min_width(singers, PARTS, 4), PARTS)
+    expected = generate_seating_chart(plain, 4, calculate_min_width(plain, PARTS, 4), PARTS)
+    assert ([[seat.singer and seat.singer.name for seat in row] for row in chart]
+            == [[seat.singer and seat.singer.name for seat in row] for row in expected])
+
+
+def test_thousands_of_singers():
+    ensembles = [f'School {i}' for i in range(15)]
+    singers = massed_roster(ensembles, 200)
+    start = time.perf_counter()
+    chart = massed_chart(singers, ensembles, 20)
+    views = ensemble_views(chart)
+    elapsed = time.perf_counter() - start
+    assert sum(view.size for view in views.values()) == len(singers) == 3000
+    assert elapsed < 2
+    assert_blocks_in_order(chart, [(p, e) for p in PARTS for e in ensembles])
+
+
+def test_views_keep_seat_numbers_and_are_copies():
+    ensembles = ['North', 'South', 'East']
+    singers = massed_roster(ensembles, 30)
+    chart = massed_chart(singers, ensembles, 4)
+    views = ensemble_views(chart)
+    assert list(views) == ['North', 'South', 'East']
+
+    sub_chart = views['South'].sub_chart()
+    assert [len(row) for row in sub_chart] == [len(row) for row in chart]
+    for row, massed_row in zip(sub_chart, chart):
+        for seat, massed in zip(row, massed_row):
+            if massed.singer is not None and massed.singer.ensemble == 'South':
+                assert seat.singer is massed.singer
+            else:
+                assert seat.singer is None
+
+    seat = views['South'].seats[0]
+    sub_chart[seat.row][seat.position].singer = None
+    assert chart[seat.row][seat.position].singer is not None
+
+    assert extract_ensemble(chart, 'West') is None
+    east = extract_ensemble(chart, 'East')
+    assert sum(seat.singer is not None for row in east for seat in row) == views['East'].size
+
+
+def test_views_keep_blocked_and_accessible_seats():
+    ensembles = ['North', 'South']
+    singers = massed_roster(ensembles, 20, seed=8)
+    accessible = {(3, 0), (3, 17)}
+    chart = generate_seating_chart(singers, 4, 24, PARTS, row_sizes=[24, 22, 20, 18],
+                                   blocked_seats={(0, 5), (2, 10)}, accessible_seats=accessible,
+                                   ensemble_order=ensembles)
+    for view in ensemble_views(chart).values():
+        sub_chart = view.sub_chart()
+        for row, massed_row in zip(sub_chart, chart):
+            for seat, massed in zip(row, massed_row):
+                assert (seat.blocked, seat.accessible) == (massed.blocked, massed.accessible)
+        assert {(r, p) for r, p in accessible if sub_chart[r][p].accessible} == accessible
+
+
+def test_balance_keeps_ensemble_blocks():
+    ensembles = ['North', 'South']
+    singers = massed_roster(ensembles, 40, seed=3)
+    for i, singer in enumerate(singers):
+        singer.strength = 5 if i % 3 == 0 else 2
+    chart = massed_chart(singers, ensembles, 4)
+    before = {(seat.row, seat.position): (seat.singer.voice_part, seat.singer.ensemble)
+              for row in chart for seat in row if seat.singer}
+    balance_sections(chart, BalanceOptions(keep_ensembles=True, time_budget=1))
+    after = {(seat.row, seat.position): (seat.singer.voice_part, seat.singer.ensemble)
+             for row in chart for seat in row if seat.singer}
+    assert after == before
+
+
+def test_upload_configure_and_conductor_view():
+    csv_text = 'name,voice_part,height,ensemble\n' + ''.join(
+        f'{school} {i},{PARTS[i % 4]},{60 + i % 12},{school}\n'
+        for school in ['North High', 'South High'] for i in range(16))
+    singers = parse_csv(csv_text)
+    assert get_unique_ensembles(singers) == ['North High', 'South High']
+
+    client = app.test_client()
+    page = client.post('/upload', data={'file': (io.BytesIO(csv_text.encode()), 'massed.csv')},
+                       content_type='multipart/form-data').get_data(as_text=True)
+    assert 'Massed Choir' in page
+    assert 'value="North High, South High"' in page
+
+    chart = massed_chart(singers, ['South High', 'North High'], 4)
+    form = {'chart_data': encode_chart(chart), 'part_order': ', '.join(PARTS),
+            'singers_data': '', 'num_singers': '32',
+            'ensemble_order': 'South High, North High'}
+    page = client.post('/finalize', data={**form, 'ensemble': 'North High'}).get_data(as_text=True)
+    assert 'North High: 16 of 32 singers' in page
+    assert 'South High 0' not in page
+    assert 'name="ensemble_order" value="South High, North High"' in page
+
+    response = client.post('/export', data={'chart_data': form['chart_data'],
+                                            'part_order': form['part_order']})
+    names = zipfile.ZipFile(io.BytesIO(response.data)).namelist()
+    assert {'ensembles/North High.csv', 'ensembles/South High.csv'} <= set(names)
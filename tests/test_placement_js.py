@@ -0,0 +1,224 @@
+"""
+Tests for offline editing: static/placement.js, the browser port of the
+placement engine, and the service worker.
+
+Every parity case is run through both engines and the charts must be
+identical JSON. The parity tests need node and are skipped without it.
+"""
+
+import glob
+import json
+import os
+import random
+import shutil
+import subprocess
+
+import pytest
+
+from app import app, calculate_stagger_offsets, decode_chart, encode_chart, parse_csv
+from seating_algorithm import (
+    calculate_dimensions_with_user_input, calculate_min_width, generate_random_roster,
+    generate_seating_chart, get_unique_parts
+)
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+SAMPLE_DIR = os.path.join(ROOT, 'sample_rosters')
+NODE = shutil.which('node')
+
+requires_node = pytest.mark.skipif(NODE is None, reason='node is not installed')
+
+# Reads cases from stdin and prints one result per case
+RUNNER = """
+const Placement = require(process.argv[1]);
+let input = '';
+process.stdin.on('data', chunk => { input += chunk; });
+process.stdin.on('end', () => {
+    const results = JSON.parse(input).map(c => {
+        try {
+            const chart = c.settings
+                ? Placement.generateFromSettings(c.singers, c.part_order, c.layout,
+                                                 c.user_rows, c.user_max_per_row,
+                                                 c.ensemble_order)
+                : Placement.generateSeatingChart(c.singers, c.rows, c.seats_per_row,
+                                                 c.part_order, c.layout, c.options);
+            return {chart: chart, stagger: Placement.calculateStaggerOffsets(chart)};
+        } catch (e) {
+            return {error: e.message};
+        }
+    });
+    process.stdout.write(JSON.stringify(results));
+});
+"""
+
+
+def run_js(cases):
+    result = subprocess.run(
+        [NODE, '-e', RUNNER, os.path.abspath(os.path.join(ROOT, 'static', 'placement.js'))],
+        input=json.dumps(cases), capture_output=True, text=True, check=True)
+    return json.loads(result.stdout)
+
+
+def python_result(singers, part_order, layout, rows=None, seats_per_row=None, options=None,
+                  user_rows=None, user_max_per_row=None, ensemble_order=None):
+    """The Python engine's output for one case, in the same shape as the runner's."""
+    options = options or {}
+    ensemble_order = options.get('ensembleOrder', ensemble_order)
+    try:
+        if rows is None:
+            # Same steps as generate_chart_from_form without a venue
+            rows, seats_per_row = calculate_dimensions_with_user_input(
+                len(singers), len(part_order), layout, user_rows, user_max_per_row)
+            seats_per_row = max(seats_per_row, calculate_min_width(
+                singers, part_order, rows, layout, ensemble_order))
+        chart = generate_seating_chart(
+            singers, rows, seats_per_row, part_order, layout,
+            options.get('rowSizes'),
+            {tuple(s) for s in options.get('blockedSeats', [])},
+            options.get('aisles'),
+            {tuple(s) for s in options.get('accessibleSeats', [])},
+            ensemble_order)
+    except ValueError as e:
+        return {'error': str(e)}
+    # Round-trip through the editor's encoding, so both sides are plain JSON
+    chart_json = json.loads(json.dumps([[seat.to_dict() for seat in row] for row in chart]))
+    stagger = calculate_stagger_offsets(decode_chart(encode_chart(chart)))
+    return {'chart': chart_json, 'stagger': stagger}
+
+
+def js_case(singers, part_order, layout, rows=None, seats_per_row=None, options=None,
+            user_rows=None, user_max_per_row=None, ensemble_order=None):
+    case = {'singers': [s.to_dict() for s in singers], 'part_order': part_order,
+            'layout': layout}
+    if rows is None:
+        case.update(settings=True, user_rows=user_rows, user_max_per_row=user_max_per_row,
+                    ensemble_order=ensemble_order)
+    else:
+        case.update(rows=rows, seats_per_row=seats_per_row, options=options or {})
+    return case
+
+
+def assert_parity(cases):
+    expected = [python_result(**case) for case in cases]
+    actual = run_js([js_case(**case) for case in cases])
+    for case, want, got in zip(cases, expected, actual):
+        assert got == want, f"{case['layout']} {case.get('rows')}x{case.get('seats_per_row')}"
+
+
+def sample_rosters():
+    for path in sorted(glob.glob(os.path.join(SAMPLE_DIR, '*.csv'))):
+        with open(path, encoding='utf-8') as f:
+            yield os.path.basename(path), parse_csv(f.read())
+
+
+@requires_node
+@pytest.mark.parametrize('layout', ['side-by-side', 'stacked'])
+def test_sample_rosters_match(layout):
+    cases = []
+    for _, singers in sample_rosters():
+        parts = get_unique_parts(singers)
+        # Automatic dimensions, and the row / width choices offered on the configure page
+        cases.append(dict(singers=singers, part_order=parts, layout=layout))
+        for user_rows in range(1, 9):
+            cases.append(dict(singers=singers, part_order=parts, layout=layout,
+                              user_rows=user_rows))
+        for user_max in (6, 10, 13, 20):
+            cases.append(dict(singers=singers, part_order=parts, layout=layout,
+                              user_max_per_row=user_max))
+        # A reversed part order, and one too narrow to fit (both engines must refuse)
+        cases.append(dict(singers=singers, part_order=parts[::-1], layout=layout,
+                          user_rows=3, user_max_per_row=40))
+        cases.append(dict(singers=singers, part_order=parts, layout=layout,
+                          rows=2, seats_per_row=3))
+    assert_parity(cases)
+
+
+@requires_node
+def test_variable_rows_and_venues_match():
+    rng = random.Random(11)
+    cases = []
+    for name, singers in sample_rosters():
+        parts = get_unique_parts(singers)
+        for _ in range(6):
+            rows = rng.randint(2, 6)
+            row_sizes = [rng.randint(len(singers) // rows, len(singers) // rows + 8)
+                         for _ in range(rows)]
+            blocked = [[r, rng.randrange(size)] for r, size in enumerate(row_sizes)
+                       if rng.random() < 0.5]
+            aisles = [[rng.randint(1, size - 1)] if size > 1 else [] for size in row_sizes]
+            accessible = [[rows - 1, 0]]
+            options = {'rowSizes': row_sizes, 'blockedSeats': blocked, 'aisles': aisles,
+                       'accessibleSeats': accessible}
+            cases.append(dict(singers=singers, part_order=parts, layout='side-by-side',
+                              rows=rows, seats_per_row=max(row_sizes), options=options))
+    assert_parity(cases)
+
+
+@requires_node
+def test_random_rosters_match():
+    """Unknown heights, height ties and parts left out of the part order."""
+    rng = random.Random(5)
+    cases = []
+    for seed in range(150):
+        parts = [f'Part {i}' for i in range(rng.randint(1, 6))]
+        singers = generate_random_roster(rng.randint(1, 120), parts, seed=seed)
+        for singer in singers:
+            if rng.random() < 0.2:
+                singer.height = None
+            elif rng.random() < 0.3:
+                singer.height = 66
+        part_order = parts[:-1] if len(parts) > 1 and rng.random() < 0.2 else parts
+        layout = rng.choice(['side-by-side', 'stacked'])
+        cases.append(dict(singers=singers, part_order=part_order, layout=layout,
+                          user_rows=rng.choice([None, rng.randint(1, 10)])))
+    assert_parity(cases)
+
+
+@requires_node
+def test_massed_choirs_match():
+    """Ensemble blocks, including unlisted ensembles and singers with none."""
+    rng = random.Random(8)
+    cases = []
+    for seed in range(80):
+        parts = [f'Part {i}' for i in range(rng.randint(1, 5))]
+        ensembles = [f'Choir {i}' for i in range(rng.randint(1, 6))]
+        singers = generate_random_roster(rng.randint(1, 300), parts, seed=seed)
+        for singer in singers:
+            if rng.random() < 0.9:
+                singer.ensemble = rng.choice(ensembles)
+            if rng.random() < 0.1:
+                singer.height = None
+        order = rng.sample(ensembles, rng.randint(0, len(ensembles)))
+        layout = rng.choice(['side-by-side', 'stacked'])
+        cases.append(dict(singers=singers, part_order=parts, layout=layout,
+                          user_rows=rng.choice([None, rng.randint(1, 12)]),
+                          ensemble_order=order))
+        if layout == 'side-by-side':
+            rows = rng.randint(2, 8)
+            row_sizes = [len(singers) // rows + rng.randint(len(ensembles), 12)
+                         for _ in range(rows)]
+            blocked = [[r, rng.randrange(size)] for r, size in enumerate(row_sizes)]
+            cases.append(dict(singers=singers, part_order=parts, layout=layout,
+                              rows=rows, seats_per_row=max(row_sizes),
+                              options={'rowSizes': row_sizes, 'blockedSeats': blocked,
+                                       'ensembleOrder': order}))
+    assert_parity(cases)
+
+
+def test_service_worker_served_from_root():
+    response = app.test_client().get('/sw.js')
+    assert response.status_code == 200
+    assert response.headers['Cache-Control'] == 'no-cache'
+    assert b'/static/placement.js' in response.data
+
+
+def test_regenerate_offered_for_plain_charts_only():
+    singers = generate_random_roster(20, ['Soprano', 'Alto'], seed=1)
+    chart = generate_seating_chart(singers, 2, 10, ['Soprano', 'Alto'])
+    form = {'chart_data': encode_chart(chart), 'part_order': 'Soprano, Alto',
+            'singers_data': '', 'num_singers': '20'}
+    client = app.test_client()
+    page = client.post('/edit', data=form).get_data(as_text=True)
+    assert 'placement.js' in page
+    assert 'id="regenerate-form"' in page
+    page = client.post('/edit', data={**form, 'shape': 'arc'}).get_data(as_text=True)
+    assert 'id="regenerate-form"' not in page
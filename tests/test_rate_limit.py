@@ -0,0 +1,173 @@
+"""Tests for per-client rate limiting."""
+
+import io
+import threading
+
+import pytest
+
+import app as app_module
+from app import app
+from rate_limit import (
+    Budget, MemoryBucketStore, RateLimiter, SQLiteBucketStore, UnknownBudgetError
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def limiter(monkeypatch):
+    """Small budgets on a fake clock, installed in the app with limiting enabled."""
+    limiter = RateLimiter([Budget('cheap', 5, 1), Budget('expensive', 2, 0.5)], clock=FakeClock())
+    monkeypatch.setattr(app_module, 'rate_limiter', limiter)
+    app.config['RATE_LIMITING'] = True
+    return limiter
+
+
+def test_bucket_drains_and_refills():
+    clock = FakeClock()
+    limiter = RateLimiter([Budget('expensive', capacity=3, refill_rate=0.5)], clock=clock)
+    assert [limiter.take('a', 'expensive').allowed for _ in range(4)] == [True, True, True, False]
+    rejected = limiter.take('a', 'expensive')
+    assert rejected.retry_after == pytest.approx(2.0)
+
+    # Other clients have their own buckets
+    assert limiter.take('b', 'expensive').allowed
+
+    clock.now += 2
+    assert limiter.take('a', 'expensive').allowed
+    assert not limiter.take('a', 'expensive').allowed
+
+    # An idle bucket refills to capacity, never beyond
+    clock.now += 3600
+    assert limiter.take('a', 'expensive').remaining == 2
+
+
+def test_clock_going_backwards_does_not_refill():
+    clock = FakeClock()
+    limiter = RateLimiter([Budget('cheap', 1, 1)], clock=clock)
+    assert limiter.take('a', 'cheap').allowed
+    clock.now -= 50
+    assert not limiter.take('a', 'cheap').allowed
+    # Catching up again only refills the time that really passed since the first take
+    clock.now += 50.5
+    assert not limiter.take('a', 'cheap').allowed
+    clock.now += 0.5
+    assert limiter.take('a', 'cheap').allowed
+
+
+def test_unknown_budget():
+    with pytest.raises(UnknownBudgetError):
+        RateLimiter([Budget('cheap', 1, 1)]).take('a', 'expensive')
+
+
+def test_metrics_and_prune():
+    clock = FakeClock()
+    store = MemoryBucketStore()
+    limiter = RateLimiter([Budget('cheap', 1, 1)], store=store, clock=clock)
+    limiter.take('a', 'cheap')
+    limiter.take('a', 'cheap')
+    limiter.take('b', 'cheap')
+    snapshot = limiter.metrics.snapshot()
+    assert snapshot['allowed'] == {'cheap': 2}
+    assert snapshot['rejected'] == {'cheap': 1}
+    assert snapshot['top_rejected_clients'] == [('a', 1)]
+
+    assert len(store) == 2
+    store.prune(clock.now + 1)
+    assert len(store) == 0
+
+
+def test_sqlite_store_is_shared(tmp_path):
+    path = str(tmp_path / 'buckets.db')
+    clock = FakeClock()
+    budgets = [Budget('expensive', 4, 0.1)]
+    first = RateLimiter(budgets, SQLiteBucketStore(path), clock=clock)
+    second = RateLimiter(budgets, SQLiteBucketStore(path), clock=clock)
+    assert first.take('a', 'expensive').allowed
+    assert second.take('a', 'expensive').allowed
+    assert first.take('a', 'expensive').remaining == 1
+    assert second.take('a', 'expensive').allowed
+    assert not first.take('a', 'expensive').allowed
+
+
+def test_concurrent_takes_never_overspend(tmp_path):
+    budgets = [Budget('cheap', 50, 0.001)]
+    for store in [MemoryBucketStore(), SQLiteBucketStore(str(tmp_path / 'b.db'))]:
+        limiter = RateLimiter(budgets, store)
+        allowed = []
+
+        def worker():
+            for _ in range(20):
+                allowed.append(limiter.take('a', 'cheap').allowed)
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert sum(allowed) == 50
+
+
+def test_expensive_routes_limited_separately(limiter):
+    client = app.test_client()
+    form = {'entry_type': 'random', 'num_singers': '12'}
+    assert client.post('/configure', data=form).status_code == 200
+    assert client.post('/configure', data=form).status_code == 200
+    rejected = client.post('/configure', data=form)
+    assert rejected.status_code == 429
+    assert rejected.headers['Retry-After'] == '2'
+    assert b'Too many requests' in rejected.data
+
+    # Cheap routes still have their own budget
+    assert client.get('/').status_code == 200
+    assert client.post('/lint/missing/ops', json={'ops': []}).status_code == 404
+
+    limiter.clock.now += 2
+    assert client.post('/configure', data=form).status_code == 200
+
+    metrics = client.get('/metrics/limits').get_json()
+    assert metrics['rejected'] == {'expensive': 1}
+    assert metrics['allowed'] == {'expensive': 3, 'cheap': 2}
+
+
+def test_api_routes_get_json_429(limiter):
+    client = app.test_client()
+    for _ in range(5):
+        client.get('/collab/missing/search?q=a')
+    response = client.get('/collab/missing/search?q=a')
+    assert response.status_code == 429
+    assert 'Too many requests' in response.get_json()['error']
+
+
+def test_oversized_upload_rejected_before_reading(limiter, monkeypatch):
+    monkeypatch.setitem(app.config, 'MAX_CONTENT_LENGTH', 1024)
+    client = app.test_client()
+    data = {'file': (io.BytesIO(b'name,voice_part\n' + b'A,Alto\n' * 500), 'roster.csv')}
+    response = client.post('/upload', data=data, content_type='multipart/form-data')
+    assert response.status_code == 413
+    assert b'too large' in response.data
+    assert client.get('/metrics/limits').get_json()['too_large'] == 1
+    # Rejected before the rate limiter, so no expensive token was spent
+    assert 'expensive' not in limiter.metrics.snapshot()['allowed']
+
+
+def test_oversized_roster_update_gets_413(limiter, monkeypatch):
+    monkeypatch.setitem(app.config, 'MAX_CONTENT_LENGTH', 1024)
+    data = {'file': (io.BytesIO(b'name,voice_part\n' + b'A,Alto\n' * 500), 'roster.csv')}
+    response = app.test_client().post('/roster/update', data=data,
+                                      content_type='multipart/form-data')
+    assert response.status_code == 413
+    assert b'too large' in response.data
+
+
+def test_roster_update_needs_a_csv():
+    data = {'file': (io.BytesIO(b'name,voice_part\nA,Alto\n'), 'roster.txt')}
+    response = app.test_client().post('/roster/update', data=data,
+                                      content_type='multipart/form-data', follow_redirects=True)
+    assert b'Please upload a CSV file' in response.data
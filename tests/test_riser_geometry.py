@@ -0,0 +1,62 @@
+"""Tests for riser seat geometry and the pixel layouts drawn from it."""
+
+import math
+
+import pytest
+
+from riser_geometry import SEAT_PITCH_PX, SHAPES, seat_positions, screen_layout
+
+
+def test_straight_rows_are_centered_and_evenly_spaced():
+    rows = seat_positions([6, 4], 'straight')
+    assert [p.x for p in rows[0]] == [-2.5, -1.5, -0.5, 0.5, 1.5, 2.5]
+    assert [p.x for p in rows[1]] == [-1.5, -0.5, 0.5, 1.5]
+    # Row 0 is the back row
+    assert rows[0][0].y > rows[1][0].y == 0
+    assert all(p.angle == 0 for row in rows for p in row)
+
+
+def test_stagger_and_aisle_shift_seats():
+    rows = seat_positions([4, 4], 'straight', stagger_offsets=[False, True], aisle_after=2)
+    assert rows[1][0].x - rows[0][0].x == pytest.approx(0.5)
+    # Seats either side of the aisle are further apart than neighbours
+    assert rows[0][2].x - rows[0][1].x > rows[0][1].x - rows[0][0].x
+
+
+@pytest.mark.parametrize('shape', SHAPES)
+def test_shapes_are_symmetric(shape):
+    for row in seat_positions([9, 7, 5], shape):
+        for left, right in zip(row, reversed(row)):
+            assert left.x == pytest.approx(-right.x)
+            assert left.y == pytest.approx(right.y)
+            assert left.angle == pytest.approx(-right.angle)
+
+
+def test_arc_keeps_seats_one_width_apart():
+    for row in seat_positions([12, 10, 8], 'arc'):
+        for a, b in zip(row, row[1:]):
+            assert math.dist((a.x, a.y), (b.x, b.y)) == pytest.approx(1.0, abs=0.02)
+        # Seats turn to face the conductor: right side clockwise
+        assert row[-1].angle > 0 > row[0].angle
+        # Sides curve forward
+        assert row[0].y < row[len(row) // 2].y
+
+
+def test_screen_layout_applies_stagger():
+    plain = screen_layout((5, 5), 'straight')
+    staggered = screen_layout((5, 5), 'straight', stagger_offsets=(False, True))
+    back, front = staggered.seats
+    # The flagged front row sits half a seat pitch right of the back row
+    assert front[0][0] - back[0][0] == pytest.approx(SEAT_PITCH_PX / 2, abs=0.1)
+    assert plain.seats[1][0][0] == plain.seats[0][0][0]
+    assert screen_layout((5, 5), 'arc', stagger_offsets=(False, True)) != screen_layout((5, 5), 'arc')
+
+
+def test_results_are_cached():
+    assert seat_positions([5, 3], 'arc') is seat_positions([5, 3], 'arc')
+    assert screen_layout((5, 3), 'chevron') is screen_layout((5, 3), 'chevron')
+
+
+def test_unknown_shape_raises():
+    with pytest.raises(ValueError):
+        seat_positions([4], 'spiral')
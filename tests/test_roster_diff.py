@@ -0,0 +1,197 @@
+"""Tests for roster diffing and incremental chart updates."""
+
+import base64
+import io
+import json
+import random
+import time
+from dataclasses import replace
+
+from app import app, encode_chart
+from chart_lint import lint_chart
+from massed_choir import combine_rosters
+from name_index import TrigramIndex, normalize_name
+from roster_diff import apply_roster_diff, diff_rosters
+from seating_algorithm import (
+    Singer, calculate_min_width, generate_random_roster, generate_seating_chart
+)
+
+PARTS = ['Soprano', 'Alto', 'Tenor', 'Bass']
+
+
+def seat_of(chart, name):
+    for row in chart:
+        for seat in row:
+            if seat.singer is not None and seat.singer.name == name:
+                return seat.row, seat.position
+    return None
+
+
+def unique_roster(count, seed):
+    singers = generate_random_roster(count, PARTS, seed=seed)
+    for i, singer in enumerate(singers):
+        singer.name = f'{singer.name} {i}'
+    return singers
+
+
+def test_normalize_name():
+    assert normalize_name('Patel, Priya') == 'priya patel'
+    assert normalize_name('  José   O\'Brien ') == 'jose obrien'
+
+
+def test_trigram_search_ranks_closest_first():
+    index = TrigramIndex()
+    for key, name in enumerate(['John Smith', 'Joan Smythe', 'Priya Patel']):
+        index.add(key, name)
+    results = index.search('Jon Smith')
+    assert results[0][0] == 0
+    assert all(key != 2 for key, _ in results)
+
+
+def test_diff_sets():
+    old = [Singer('Priya Patel', 'Alto', 64), Singer('John Smith', 'Tenor', 70),
+           Singer('Ann Lee', 'Soprano', 62), Singer('Bo Kim', 'Bass', 72)]
+    new = [Singer('patel, priya', 'Alto', 64), Singer('Jon Smith', 'Bass', 70),
+           Singer('Bo Kim', 'Bass', 73), Singer('Zoe Ng', 'Soprano', 61)]
+    diff = diff_rosters(old, new)
+    assert [s.name for s in diff.added] == ['Zoe Ng']
+    assert [s.name for s in diff.removed] == ['Ann Lee']
+    changes = {c.old.name: c.fields for c in diff.changed}
+    assert changes['John Smith'] == ['name', 'voice_part']
+    assert changes['Bo Kim'] == ['height']
+    assert changes['Priya Patel'] == ['name']
+
+
+def test_weekly_update_keeps_everyone_else_in_place():
+    rng = random.Random(3)
+    old = unique_roster(300, seed=3)
+    chart = generate_seating_chart(old, 8, calculate_min_width(old, PARTS, 8), PARTS)
+    before = {s.name: seat_of(chart, s.name) for s in old}
+
+    new = [replace(s) for s in old]
+    dropped = rng.sample(new, 6)
+    for singer in dropped:
+        new.remove(singer)
+    part_change = new[0]
+    part_change.voice_part = 'Bass' if part_change.voice_part != 'Bass' else 'Tenor'
+    added = [Singer(f'New Singer {i}', rng.choice(PARTS), rng.randint(60, 76)) for i in range(5)]
+    new.extend(added)
+
+    diff = diff_rosters(old, new)
+    assert len(diff.added) == 5 and len(diff.removed) == 6 and len(diff.changed) == 1
+    update = apply_roster_diff(chart, diff, PARTS)
+
+    placed = [seat.singer for row in chart for seat in row if seat.singer is not None]
+    assert sorted(s.name for s in placed) == sorted(s.name for s in new)
+    assert 'unplaced' not in {f.rule for f in lint_chart(chart, [s.name for s in new])}
+    # New singers sit beside their own part
+    for singer in added:
+        r, p = seat_of(chart, singer.name)
+        neighbours = [chart[r][q].singer for q in (p - 1, p + 1) if 0 <= q < len(chart[r])]
+        assert any(n is not None and n.voice_part == singer.voice_part for n in neighbours)
+    # Only singers in rows that changed can have moved, and only a few of them
+    stayed = sum(seat_of(chart, name) == pos for name, pos in before.items()
+                 if name in {s.name for s in new})
+    assert stayed >= len(new) - len(added) - 1 - update.moved
+    assert update.moved < 40
+
+
+def test_fixed_venue_rows_are_never_widened():
+    old = unique_roster(20, seed=4)
+    blocked = {(0, 3), (1, 7)}
+    chart = generate_seating_chart(old, 2, 12, PARTS, row_sizes=[12, 11], blocked_seats=blocked)
+    free = sum(seat.singer is None and not seat.blocked for row in chart for seat in row)
+    assert free == 1
+
+    added = [Singer(f'New Singer {i}', PARTS[i % 4], 64) for i in range(3)]
+    update = apply_roster_diff(chart, diff_rosters(old, old + added), PARTS, fixed_rows=True)
+    assert [len(row) for row in chart] == [12, 11]
+    assert update.seats_added == 0
+    assert all(seat.singer is None for row in chart for seat in row if seat.blocked)
+    assert len(update.placed) == 1 and len(update.unplaced) == 2
+    assert all(seat.position == p for row in chart for p, seat in enumerate(row))
+
+    # Without fixed rows the same update adds seats instead
+    chart = generate_seating_chart(old, 2, 12, PARTS, row_sizes=[12, 11], blocked_seats=blocked)
+    update = apply_roster_diff(chart, diff_rosters(old, old + added), PARTS)
+    assert not update.unplaced and update.seats_added >= 2
+
+
+def test_diff_scales_with_index():
+    old = unique_roster(5000, seed=9)
+    new = [replace(s, name=s.name + 'x') if i % 10 == 0 else replace(s)
+           for i, s in enumerate(old)]
+    start = time.perf_counter()
+    diff = diff_rosters(old, new)
+    elapsed = time.perf_counter() - start
+    assert not diff.added and not diff.removed
+    assert len(diff.changed) == 500
+    assert elapsed < 5
+
+
+def test_roster_update_route():
+    old = unique_roster(40, seed=2)
+    chart = generate_seating_chart(old, 4, calculate_min_width(old, PARTS, 4), PARTS)
+    lines = ['name,voice_part,height'] + [f'{s.name},{s.voice_part},{s.height}' for s in old[1:]]
+    lines.append('Brand New,Alto,65')
+    response = app.test_client().post('/roster/update', data={
+        'file': (io.BytesIO('\n'.join(lines).encode()), 'roster.csv'),
+        'chart_data': encode_chart(chart),
+        'singers_data': base64.b64encode(json.dumps([s.to_dict() for s in old]).encode()).decode(),
+        'part_order': ', '.join(PARTS),
+    }, content_type='multipart/form-data')
+    html = response.data.decode()
+    assert response.status_code == 200
+    assert 'Roster updated' in html and 'Brand New' in html
+    assert f'Removed: {old[0].name}' in html
+
+
+def test_roster_update_diffs_against_current_chart():
+    old = unique_roster(24, seed=6)
+    chart = generate_seating_chart(old, 3, calculate_min_width(old, PARTS, 3), PARTS)
+    # A part changed in the editor after the roster was first uploaded
+    edited = next(seat.singer for seat in chart[0] if seat.singer is not None)
+    stale_singers_data = base64.b64encode(
+        json.dumps([s.to_dict() for s in old]).encode()).decode()
+    edited.voice_part = 'Tenor' if edited.voice_part != 'Tenor' else 'Bass'
+    current = [seat.singer for row in chart for seat in row if seat.singer is not None]
+
+    lines = ['name,voice_part,height'] + [f'{s.name},{s.voice_part},{s.height:g}' for s in current]
+    response = app.test_client().post('/roster/update', data={
+        'file': (io.BytesIO('\n'.join(lines).encode()), 'roster.csv'),
+        'chart_data': encode_chart(chart),
+        'singers_data': stale_singers_data,
+        'part_order': ', '.join(PARTS),
+    }, content_type='multipart/form-data')
+    html = response.data.decode()
+    assert 'No changes in the uploaded roster' in html
+    assert '→' not in html
+
+
+def test_massed_choir_updates_stay_in_ensemble_blocks():
+    ensembles = ['North', 'South', 'East']
+    old = combine_rosters({name: unique_roster(30, seed=10 + i) for i, name in enumerate(ensembles)})
+    for i, singer in enumerate(old):
+        singer.name = f'{singer.name} {singer.ensemble} {i}'
+    width = calculate_min_width(old, PARTS, 4, ensemble_order=ensembles)
+    chart = generate_seating_chart(old, 4, width, PARTS, ensemble_order=ensembles)
+
+    rng = random.Random(3)
+    removed = rng.sample(old, 12)
+    added = [Singer(f'New {i}', PARTS[i % 4], 60 + i, ensemble=ensembles[i % 3]) for i in range(12)]
+    new = [s for s in old if s not in removed] + added
+    update = apply_roster_diff(chart, diff_rosters(old, new), PARTS)
+    assert not update.unplaced
+
+    rank = {(p, e): i for i, (p, e) in enumerate((p, e) for p in PARTS for e in ensembles)}
+    for row in chart:
+        # Every row still reads left to right in (part, ensemble) order
+        ranks = [rank[seat.singer.voice_part, seat.singer.ensemble]
+                 for seat in row if seat.singer is not None]
+        assert ranks == sorted(ranks)
+    for singer in added:
+        r, pos = seat_of(chart, singer.name)
+        neighbours = [seat.singer for seat in chart[r][max(0, pos - 1):pos + 2]
+                      if seat.singer is not None and seat.singer is not singer]
+        assert any((n.voice_part, n.ensemble) == (singer.voice_part, singer.ensemble)
+                   for n in neighbours)
@@ -0,0 +1,253 @@
+"""
+Property and scaling tests for the placement functions.
+
+Invariants are checked across thousands of generated rosters, plus the
+sample rosters shipped in sample_rosters/.
+"""
+
+import glob
+import math
+import os
+import random
+import time
+
+import pytest
+
+from app import parse_csv
+from seating_algorithm import (
+    Singer, generate_seating_chart, generate_random_roster, calculate_min_width,
+    calculate_dimensions_with_user_input, get_unique_parts
+)
+
+SAMPLE_DIR = os.path.join(os.path.dirname(__file__), '..', 'sample_rosters')
+NUM_CASES = 1500
+
+
+def random_case(seed: int):
+    """Build a random roster, part order and chart shape for one test case."""
+    rng = random.Random(seed)
+    parts = [f'Part {i}' for i in range(rng.randint(1, 8))]
+    distribution = [rng.randint(0, 40) for _ in parts]
+    if sum(distribution) == 0:
+        distribution[0] = 1
+    singers = generate_random_roster(sum(distribution), parts,
+                                     distribution=distribution, seed=seed)
+    # Some singers have no known height
+    for singer in rng.sample(singers, len(singers) // 5):
+        singer.height = None
+    rng.shuffle(singers)
+    return rng, singers, parts
+
+
+def placed_singers(chart):
+    return [seat.singer for row in chart for seat in row if seat.singer is not None]
+
+
+def assert_each_singer_placed_once(chart, singers):
+    placed = placed_singers(chart)
+    assert len(placed) == len(singers)
+    assert {id(s) for s in placed} == {id(s) for s in singers}
+
+
+def assert_rows_contiguous(chart, part_order):
+    """Within each row, parts appear in part order and each part's singers are adjacent."""
+    for row in chart:
+        occupied = [(seat.position, part_order.index(seat.singer.voice_part))
+                    for seat in row if seat.singer is not None]
+        part_indices = [idx for _, idx in occupied]
+        assert part_indices == sorted(part_indices)
+        for part_idx in set(part_indices):
+            positions = [pos for pos, idx in occupied if idx == part_idx]
+            assert positions == list(range(positions[0], positions[0] + len(positions)))
+
+
+def assert_taller_behind(chart, part_order):
+    """Within each part, every known height in a row is >= every known height in front of it."""
+    for part in part_order:
+        row_heights = [[seat.singer.height for seat in row
+                        if seat.singer is not None and seat.singer.voice_part == part
+                        and seat.singer.height is not None]
+                       for row in chart]
+        shortest_behind = math.inf
+        for heights in row_heights:
+            if heights:
+                assert max(heights) <= shortest_behind
+                shortest_behind = min(shortest_behind, min(heights))
+
+
+def generate_like_app(singers, part_order, layout, user_rows=None, user_max_per_row=None):
+    """Size and generate a chart the way app.generate_chart_from_form does."""
+    rows, seats_per_row = calculate_dimensions_with_user_input(
+        len(singers), len(part_order), layout, user_rows, user_max_per_row
+    )
+    seats_per_row = max(seats_per_row, calculate_min_width(singers, part_order, rows, layout))
+    return generate_seating_chart(singers, rows, seats_per_row, part_order, layout)
+
+
+@pytest.mark.parametrize('chunk', range(5))
+def test_side_by_side_invariants(chunk):
+    for seed in range(chunk, NUM_CASES, 5):
+        rng, singers, parts = random_case(seed)
+        rows = rng.randint(1, 8)
+        min_width = calculate_min_width(singers, parts, rows)
+        chart = generate_seating_chart(singers, rows, min_width, parts)
+
+        assert_each_singer_placed_once(chart, singers)
+        assert_rows_contiguous(chart, parts)
+        assert_taller_behind(chart, parts)
+        # The back row spans exactly the minimum width, and no row is wider
+        assert all(len(row) == min_width for row in chart)
+        assert all(seat.singer is not None for seat in chart[0])
+
+
+@pytest.mark.parametrize('chunk', range(5))
+def test_side_by_side_variable_invariants(chunk):
+    for seed in range(chunk, NUM_CASES, 5):
+        rng, singers, parts = random_case(seed)
+        rows = rng.randint(1, 8)
+        row_sizes = [rng.randint(1, 30) for _ in range(rows)]
+        # Make sure there are enough seats in total
+        while sum(row_sizes) < len(singers):
+            row_sizes[rng.randrange(rows)] += rng.randint(1, 10)
+
+        chart = generate_seating_chart(singers, rows, max(row_sizes), parts,
+                                       'side-by-side', row_sizes)
+
+        assert [len(row) for row in chart] == row_sizes
+        assert_each_singer_placed_once(chart, singers)
+        assert_rows_contiguous(chart, parts)
+        assert_taller_behind(chart, parts)
+
+
+@pytest.mark.parametrize('chunk', range(5))
+def test_stacked_invariants(chunk):
+    for seed in range(chunk, NUM_CASES, 5):
+        rng, singers, parts = random_case(seed)
+        rows = rng.randint(len(parts), len(parts) * 3)
+        chart = generate_seating_chart(
+            singers, rows, calculate_min_width(singers, parts, rows, 'stacked'),
+            parts, 'stacked'
+        )
+
+        assert_each_singer_placed_once(chart, singers)
+        assert_taller_behind(chart, parts)
+        # Each row holds a single part, and parts go back to front in part order
+        row_parts = []
+        for row in chart:
+            row_part_set = {seat.singer.voice_part for seat in row if seat.singer is not None}
+            assert len(row_part_set) <= 1
+            row_parts.extend(parts.index(p) for p in row_part_set)
+        assert row_parts == sorted(row_parts)
+
+
+def test_auto_dimensions_place_everyone():
+    for seed in range(NUM_CASES):
+        rng, singers, parts = random_case(seed)
+        layout = rng.choice(['side-by-side', 'stacked'])
+        user_rows = rng.choice([None, rng.randint(len(parts), 10)])
+        user_max = rng.choice([None, rng.randint(1, 20)])
+        chart = generate_like_app(singers, parts, layout, user_rows, user_max)
+        assert_each_singer_placed_once(chart, singers)
+
+
+def test_row_sizes_too_small_raises():
+    singers = generate_random_roster(20, ['Soprano', 'Alto'], seed=1)
+    with pytest.raises(ValueError):
+        generate_seating_chart(singers, 2, 8, ['Soprano', 'Alto'], 'side-by-side', [8, 8])
+
+
+def test_fixed_width_too_small_raises():
+    singers = generate_random_roster(20, ['Soprano', 'Alto'], seed=1)
+    with pytest.raises(ValueError):
+        generate_seating_chart(singers, 2, 6, ['Soprano', 'Alto'])
+
+
+def test_singers_outside_part_order_are_left_out():
+    singers = [Singer('A', 'Soprano', 64), Singer('B', 'Alto', 65), Singer('C', 'Tenor', 70)]
+    chart = generate_seating_chart(singers, 1, 2, ['Soprano', 'Alto'])
+    assert {s.name for s in placed_singers(chart)} == {'A', 'B'}
+
+
+@pytest.mark.parametrize('path', sorted(glob.glob(os.path.join(SAMPLE_DIR, '*.csv'))))
+@pytest.mark.parametrize('layout', ['side-by-side', 'stacked'])
+def test_sample_rosters(path, layout):
+    with open(path, encoding='utf-8') as f:
+        singers = parse_csv(f.read())
+    parts = get_unique_parts(singers)
+    chart = generate_like_app(singers, parts, layout)
+    assert_each_singer_placed_once(chart, singers)
+    assert_taller_behind(chart, parts)
+    if layout == 'side-by-side':
+        assert_rows_contiguous(chart, parts)
+
+
+def best_time(func, repeats: int = 3) -> float:
+    """Return the fastest of several runs, to reduce timing noise."""
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+@pytest.mark.parametrize('variable_rows', [False, True])
+def test_generation_scales_linearly(variable_rows):
+    parts = ['Soprano 1', 'Soprano 2', 'Alto 1', 'Alto 2', 'Tenor', 'Bass']
+    small_n, large_n = 1_000, 16_000
+
+    def timed(n):
+        singers = generate_random_roster(n, parts, seed=n)
+        rows = 10
+        if variable_rows:
+            row_sizes = [math.ceil(n / rows) + 2] * rows
+            return best_time(lambda: generate_seating_chart(
+                singers, rows, max(row_sizes), parts, 'side-by-side', row_sizes))
+        width = calculate_min_width(singers, parts, rows)
+        return best_time(lambda: generate_seating_chart(singers, rows, width, parts))
+
+    ratio = timed(large_n) / timed(small_n)
+    growth = large_n / small_n
+    # Sorting makes generation O(n log n); allow generous slack for timer noise,
+    # but fail well before quadratic growth (which would be 256x here)
+    assert ratio < growth * 3, f'{growth:.0f}x more singers took {ratio:.1f}x longer'
+
+
+def test_random_roster_is_reproducible():
+    parts = ['Soprano', 'Alto', 'Tenor', 'Bass', 'Descant']
+    first = generate_random_roster(200, parts, seed=42)
+    assert [s.to_dict() for s in first] == [s.to_dict() for s in generate_random_roster(200, parts, seed=42)]
+    assert [s.to_dict() for s in first] != [s.to_dict() for s in generate_random_roster(200, parts, seed=43)]
+
+
+@pytest.mark.parametrize('num_singers', [3, 40, 97, 1000])
+def test_random_roster_part_counts(num_singers):
+    parts = ['Soprano', 'Alto', 'Tenor', 'Bass']
+    for seed in range(50):
+        singers = generate_random_roster(num_singers, parts, seed=seed)
+        assert len(singers) == num_singers
+        counts = [sum(s.voice_part == part for s in singers) for part in parts]
+        even = num_singers / len(parts)
+        # ±5 per part, plus whatever rescaling to the exact total moves it
+        assert all(abs(count - even) <= 10 for count in counts)
+        if num_singers >= len(parts):
+            assert min(counts) >= 1
+
+
+def test_large_random_roster_is_fast():
+    start = time.perf_counter()
+    singers = generate_random_roster(100_000, ['Soprano', 'Alto', 'Tenor', 'Bass'], seed=1)
+    elapsed = time.perf_counter() - start
+    assert len(singers) == 100_000
+    assert elapsed < 2, f'100k singers took {elapsed:.2f}s'
+
+
+def test_global_random_state_is_left_alone():
+    parts = ['Soprano', 'Alto', 'Tenor', 'Bass']
+    random.seed(1234)
+    state = random.getstate()
+    singers = generate_random_roster(120, parts, seed=5)
+    generate_random_roster(40, parts)
+    generate_seating_chart(singers, 4, calculate_min_width(singers, parts, 4), parts)
+    generate_seating_chart(singers, 8, 20, parts, 'stacked')
+    assert random.getstate() == state
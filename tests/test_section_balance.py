@@ -0,0 +1,102 @@
+"""Tests for section balance constraints."""
+
+import random
+
+from app import parse_csv
+from seating_algorithm import (
+    Singer, calculate_min_width, generate_random_roster, generate_seating_chart
+)
+from section_balance import BalanceOptions, balance_sections, has_constraints
+
+PARTS = ['Soprano', 'Alto', 'Tenor', 'Bass']
+
+
+def section_seats(chart):
+    return {(seat.row, seat.position): seat.singer.voice_part
+            for row in chart for seat in row if seat.singer is not None}
+
+
+def roster_with_attributes(count, seed):
+    """A roster where about a quarter of singers are strong and a sixth are new."""
+    rng = random.Random(seed)
+    singers = generate_random_roster(count, PARTS, seed=seed)
+    for singer in singers:
+        singer.strength = rng.choice([1, 2, 3, 3, 3, 3, 4, 5])
+        singer.experience = rng.choice([0, 1, 2, 3, 5, 8])
+    for _ in range(3):
+        a, b = rng.sample(singers, 2)
+        a.keep_apart.append(b.name)
+    return singers
+
+
+def test_balancing_keeps_part_sections_and_meets_constraints():
+    satisfied = 0
+    for seed in range(40):
+        singers = roster_with_attributes(60, seed)
+        chart = generate_seating_chart(singers, 4, calculate_min_width(singers, PARTS, 4), PARTS)
+        before = section_seats(chart)
+        unbalanced = balance_sections(chart, BalanceOptions(time_budget=0))
+
+        report = balance_sections(chart, BalanceOptions(time_budget=5))
+
+        assert section_seats(chart) == before
+        placed = [seat.singer for row in chart for seat in row if seat.singer]
+        assert sorted(id(s) for s in placed) == sorted(id(s) for s in singers)
+        assert len(report.unmet) <= len(unbalanced.unmet)
+        satisfied += report.satisfied
+    assert satisfied >= 36
+
+
+def test_keep_apart_pair_is_separated():
+    singers = [Singer(f'S{i}', 'Soprano', 64) for i in range(6)]
+    singers[0].keep_apart = ['S1']
+    chart = generate_seating_chart(singers, 1, 6, ['Soprano'])
+    balance_sections(chart)
+    positions = {seat.singer.name: seat.position for seat in chart[0]}
+    assert abs(positions['S0'] - positions['S1']) > 1
+
+
+def test_impossible_constraints_are_reported():
+    # A new singer with no veteran anywhere in the choir
+    singers = [Singer('New', 'Alto', 65, experience=0), Singer('Other', 'Alto', 66, experience=1)]
+    chart = generate_seating_chart(singers, 1, 2, ['Alto'])
+    report = balance_sections(chart)
+    assert [u.kind for u in report.unmet] == ['new_singer']
+    assert report.unmet[0].singers == ['New']
+
+
+def test_tagged_singers_are_spread():
+    singers = [Singer(f'S{i}', 'Soprano', 64, tags=['descant'] if i < 3 else []) for i in range(9)]
+    chart = generate_seating_chart(singers, 1, 9, ['Soprano'])
+    report = balance_sections(chart, BalanceOptions(spread_tags=['descant']))
+    assert report.satisfied
+    tagged = sorted(seat.position for seat in chart[0] if 'descant' in seat.singer.tags)
+    assert all(b - a > 1 for a, b in zip(tagged, tagged[1:]))
+
+
+def test_csv_attribute_columns_round_trip():
+    singers = parse_csv(
+        'name,voice_part,height,strength,experience,tags,keep_apart\n'
+        'Jane Doe,Soprano,64.5,5,12,descant;soloist,\n'
+        'Amy Lee,Soprano,63,,0,,Kim Park\n'
+    )
+    assert singers[0].strength == 5 and singers[0].tags == ['descant', 'soloist']
+    assert singers[1].strength is None and singers[1].keep_apart == ['Kim Park']
+    assert has_constraints(singers)
+    assert Singer(**singers[0].to_dict()) == singers[0]
+    assert Singer('A', 'Alto').to_dict() == {'name': 'A', 'voice_part': 'Alto', 'height': None}
+
+
+def test_bad_attribute_values_keep_the_singer():
+    singers = parse_csv(
+        'name,voice_part,height,strength,experience\n'
+        'Jane Doe,Soprano,64.5,strong,12\n'
+        'Amy Lee,Soprano,63,3.5,two\n'
+        'Kim Park,Alto,62,4,1\n'
+    )
+    assert [s.name for s in singers] == ['Jane Doe', 'Amy Lee', 'Kim Park']
+    assert (singers[0].strength, singers[0].experience) == (None, 12)
+    assert (singers[1].strength, singers[1].experience) == (None, None)
+    assert singers[2].strength == 4
+    chart = generate_seating_chart(singers, 1, 3, ['Soprano', 'Alto'])
+    assert sum(seat.singer is not None for seat in chart[0]) == 3
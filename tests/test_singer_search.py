@@ -0,0 +1,107 @@
+"""Tests for singer search."""
+
+import random
+
+from app import app, collab_hub, run_on_hub
+from collaboration import ChartSession
+from name_index import SingerSearchIndex
+from seating_algorithm import (
+    Seat, Singer, calculate_min_width, generate_random_roster, generate_seating_chart
+)
+
+PARTS = ['Soprano 1', 'Soprano 2', 'Alto', 'Tenor', 'Bass']
+
+
+def make_index(entries):
+    index = SingerSearchIndex()
+    for key, name, part in entries:
+        index.add(key, name, part)
+    return index
+
+
+def test_prefix_search():
+    index = make_index([
+        (1, 'Priya Patel', 'Alto'),
+        (2, 'Patrick Young', 'Bass'),
+        (3, 'Anna Prince', 'Soprano 1'),
+        (4, 'Olivia Smith', 'Soprano 2'),
+    ])
+    assert index.search('pat') == [1, 2]
+    assert index.search('pri pat') == [1]
+    assert index.search('Patel, Priya') == [1]
+    assert index.search('sop') == [3, 4]
+    assert index.search('soprano 2') == [4]
+    assert index.search('pr', limit=1) == [3]
+    assert index.search('') == []
+    assert index.search('zz') == []
+
+
+def test_fuzzy_fallback():
+    index = make_index([(1, 'Priya Patel', 'Alto'), (2, 'Olivia Smith', 'Soprano 1')])
+    assert index.search('priya patle') == [1]
+    assert index.search('olivai smith') == [2]
+    assert index.search('qqqq') == []
+
+
+def test_add_replaces_and_remove():
+    index = make_index([(1, 'Priya Patel', 'Alto')])
+    index.add(1, 'Priya Patel', 'Tenor')
+    assert len(index) == 1
+    assert index.search('alto') == []
+    assert index.search('tenor') == [1]
+    index.remove(1)
+    index.remove(1)
+    assert len(index) == 0
+    assert index.search('priya') == []
+
+
+def test_updates_match_rebuild():
+    rng = random.Random(3)
+    singers = generate_random_roster(120, PARTS, seed=3)
+    chart = generate_seating_chart(singers, 5, calculate_min_width(singers, PARTS, 5), PARTS)
+    session = ChartSession(chart=chart)
+    session.find_singers('a')
+    seats = [(seat.row, seat.position) for row in chart for seat in row]
+    for version in range(200):
+        a, b = rng.sample(seats, 2)
+        singer = chart[a[0]][a[1]].singer
+        if singer is not None and rng.random() < 0.3:
+            op = {'type': 'set_part', 'seat': list(a), 'old': singer.voice_part,
+                  'new': rng.choice(PARTS)}
+        else:
+            op = {'type': 'swap', 'a': list(a), 'b': list(b)}
+        assert session.submit(op, version)['accepted']
+
+    rebuilt = ChartSession(chart=chart)
+    for query in ['a', 'so', 'soprano 2', 'ten', 'bass', 'e', 'j m']:
+        found = session.find_singers(query, 500)
+        assert sorted(map(str, found)) == sorted(map(str, rebuilt.find_singers(query, 500)))
+        for match in found:
+            seat = chart[match['seat'][0]][match['seat'][1]]
+            assert (seat.singer.name, seat.singer.voice_part) == (match['name'], match['voice_part'])
+
+
+def test_session_search_follows_swaps():
+    chart = [[Seat(0, 0, Singer('Priya Patel', 'Alto', 64)),
+              Seat(0, 1, Singer('Olivia Smith', 'Soprano 1', 62)),
+              Seat(0, 2)]]
+    session = ChartSession(chart=chart)
+    assert session.find_singers('priya') == [
+        {'name': 'Priya Patel', 'voice_part': 'Alto', 'seat': [0, 0]}]
+    session.submit({'type': 'swap', 'a': [0, 0], 'b': [0, 2]}, 0)
+    assert session.find_singers('priya')[0]['seat'] == [0, 2]
+    session.submit({'type': 'set_part', 'seat': [0, 2], 'old': 'Alto', 'new': 'Tenor'}, 1)
+    assert session.find_singers('alto') == []
+    assert session.find_singers('tenor')[0]['name'] == 'Priya Patel'
+
+
+def test_search_route():
+    chart = [[Seat(0, 0, Singer('Priya Patel', 'Alto', 64)),
+              Seat(0, 1, Singer('Olivia Smith', 'Soprano 1', 62))]]
+    chart_id = run_on_hub(collab_hub.create_session(chart))
+    client = app.test_client()
+    response = client.get(f'/collab/{chart_id}/search?q=oli')
+    assert response.get_json() == {
+        'matches': [{'name': 'Olivia Smith', 'voice_part': 'Soprano 1', 'seat': [0, 1]}]}
+    assert client.get(f'/collab/{chart_id}/search?q=a&limit=x').status_code == 400
+    assert client.get('/collab/missing/search?q=a').status_code == 404
@@ -0,0 +1,134 @@
+"""Tests for venue layouts and aisle/blocked-seat aware placement."""
+
+import pytest
+
+from seating_algorithm import (
+    Singer, _snap_sections_to_aisles, generate_random_roster, generate_seating_chart
+)
+from venues import Venue, VenueLibrary, VenueRow
+
+PARTS = ['Soprano', 'Alto', 'Tenor', 'Bass']
+
+
+def venue_chart(venue, singers, parts=PARTS, layout='side-by-side'):
+    return generate_seating_chart(singers, len(venue.rows), max(venue.row_sizes), parts,
+                                  layout, venue.row_sizes, venue.blocked_seats,
+                                  venue.aisles, venue.accessible_seats)
+
+
+@pytest.fixture
+def hall():
+    return Venue('hall', 'Hall', [
+        VenueRow(20, aisles_after=[10], blocked=[1, 20]),
+        VenueRow(18, aisles_after=[9]),
+        VenueRow(16, aisles_after=[8], accessible=[1, 16]),
+    ])
+
+
+def test_venue_seat_sets_are_zero_indexed(hall):
+    assert hall.row_sizes == [20, 18, 16]
+    assert hall.capacity == 52
+    assert hall.blocked_seats == {(0, 0), (0, 19)}
+    assert hall.accessible_seats == {(2, 0), (2, 15)}
+    assert hall.aisles == [[10], [9], [8]]
+
+
+@pytest.mark.parametrize('count', [10, 30, 52])
+def test_blocked_seats_stay_empty(hall, count):
+    singers = generate_random_roster(count, PARTS, seed=count)
+    chart = venue_chart(hall, singers)
+    assert [len(row) for row in chart] == hall.row_sizes
+    assert chart[0][0].blocked and chart[0][0].singer is None
+    assert chart[0][19].blocked and chart[0][19].singer is None
+    assert chart[2][0].accessible
+    assert sum(seat.singer is not None for row in chart for seat in row) == count
+
+
+def test_sections_snap_to_aisles(hall):
+    singers = generate_random_roster(52, ['Soprano', 'Alto'], distribution=[26, 26], seed=3)
+    chart = venue_chart(hall, singers, ['Soprano', 'Alto'])
+    # Two equal parts split at the center aisle
+    for row, aisle in zip(chart, hall.aisles):
+        parts = [seat.singer.voice_part for seat in row if seat.singer]
+        boundary = next(i for i, p in enumerate(parts) if p == 'Alto')
+        offset = sum(seat.blocked for seat in row[:aisle[0]])
+        assert abs(boundary + offset - aisle[0]) <= 1
+
+
+@pytest.mark.parametrize('sopranos', [8, 12])
+def test_boundary_two_seats_from_aisle_snaps(sopranos):
+    # A proportional split puts the boundary at seat 10 or 14; the aisle is after seat 12
+    singers = generate_random_roster(20, ['Soprano', 'Alto'], distribution=[sopranos, 20 - sopranos],
+                                     seed=4)
+    chart = generate_seating_chart(singers, 1, 24, ['Soprano', 'Alto'], row_sizes=[24],
+                                   aisles=[[12]])
+    for seat in chart[0]:
+        if seat.singer is not None:
+            assert (seat.singer.voice_part == 'Soprano') == (seat.position < 12)
+
+
+def test_snap_tolerance():
+    near, far = [10, 14], [9, 15]
+    _snap_sections_to_aisles(near, [12])
+    _snap_sections_to_aisles(far, [12])
+    assert near == [12, 12] and far == [9, 15]
+    # The nearest of several aisles wins
+    widths = [11, 13]
+    _snap_sections_to_aisles(widths, [9, 12])
+    assert widths == [12, 12]
+
+
+def test_too_many_singers_for_venue_raises(hall):
+    singers = generate_random_roster(hall.capacity + 1, PARTS, seed=1)
+    with pytest.raises(ValueError, match=f'only have {hall.capacity} seats for {len(singers)} singers'):
+        venue_chart(hall, singers)
+
+
+def test_library_round_trip(tmp_path, hall):
+    library = VenueLibrary(str(tmp_path))
+    library.save(hall)
+    reloaded = VenueLibrary(str(tmp_path)).get('hall')
+    assert reloaded == hall
+    reloaded_library = VenueLibrary(str(tmp_path))
+    with pytest.raises(ValueError):
+        reloaded_library.get('missing')
+
+
+def test_bundled_venues_load():
+    import app
+    venues = app.venue_library.all()
+    assert venues
+    for venue in venues:
+        assert venue.capacity > 0
+
+
+def test_check_fit_gives_venue_advice(hall):
+    parts = ['Soprano', 'Alto', 'Tenor', 'Bass', 'Descant']
+    singers = generate_random_roster(40, parts, seed=2)
+    with pytest.raises(ValueError, match='Hall has 3 rows, too few to stack 5 voice parts'):
+        hall.check_fit(singers, parts, 'stacked')
+    hall.check_fit(singers, parts, 'side-by-side')
+
+    # Sopranos get the back two rows: 18 + 18 usable seats
+    sopranos = [Singer(f'S{i}', 'Soprano', 64) for i in range(37)]
+    altos = [Singer(f'A{i}', 'Alto', 64) for i in range(4)]
+    with pytest.raises(ValueError, match='36 seats in the Soprano rows for 37 singers'):
+        hall.check_fit(sopranos + altos, ['Soprano', 'Alto'], 'stacked')
+
+    with pytest.raises(ValueError, match='Hall has 52 seats for 53 singers'):
+        hall.check_fit(generate_random_roster(53, PARTS, seed=1), PARTS, 'side-by-side')
+
+
+def test_stacked_venue_error_from_route():
+    import base64
+    import json
+
+    import app
+    singers = generate_random_roster(40, PARTS, seed=3)
+    response = app.app.test_client().post('/preview', data={
+        'singers_data': base64.b64encode(json.dumps([s.to_dict() for s in singers]).encode()).decode(),
+        'part_order': ', '.join(PARTS), 'layout': 'stacked', 'venue': 'rehearsal-room-chairs',
+    }, follow_redirects=True)
+    page = response.get_data(as_text=True)
+    assert 'too few to stack 4 voice parts' in page
+    assert 'add rows' not in page
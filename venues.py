@@ -0,0 +1,167 @@
+"""
+Reusable venue layouts.
+
+A venue describes the risers or chairs in a room: how many seats each row
+has, where the aisles are, which spots are unusable and which are wheelchair
+accessible. Venues are stored as JSON files in the venues/ directory and
+indexed by file name, so a director can pick "Main Hall risers" instead of
+retyping row sizes for every concert.
+
+Venue file format (rows back to front, seats numbered from 1 as on the chart):
+
+    {
+        "name": "Main Hall risers",
+        "description": "Four-step risers with a center aisle",
+        "rows": [
+            {"seats": 18, "aisles_after": [9], "blocked": [1, 18]},
+            {"seats": 16, "aisles_after": [8], "accessible": [1, 16]}
+        ]
+    }
+"""
+
+import json
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set, Tuple
+
+from seating_algorithm import Singer, stacked_part_rows
+
+
+@dataclass
+class VenueRow:
+    seats: int
+    aisles_after: List[int] = field(default_factory=list)  # Aisle after this many seats
+    blocked: List[int] = field(default_factory=list)       # Seat numbers, from 1
+    accessible: List[int] = field(default_factory=list)    # Seat numbers, from 1
+
+
+@dataclass
+class Venue:
+    slug: str
+    name: str
+    rows: List[VenueRow]
+    description: str = ""
+
+    @property
+    def row_sizes(self) -> List[int]:
+        return [row.seats for row in self.rows]
+
+    @property
+    def capacity(self) -> int:
+        """Number of seats singers can use."""
+        return sum(row.seats for row in self.rows) - len(self.blocked_seats)
+
+    @property
+    def blocked_seats(self) -> Set[Tuple[int, int]]:
+        """(row, position) of every blocked seat, 0-indexed like the chart."""
+        return {(r, n - 1) for r, row in enumerate(self.rows)
+                for n in row.blocked if 1 <= n <= row.seats}
+
+    @property
+    def accessible_seats(self) -> Set[Tuple[int, int]]:
+        return {(r, n - 1) for r, row in enumerate(self.rows)
+                for n in row.accessible if 1 <= n <= row.seats}
+
+    @property
+    def aisles(self) -> List[List[int]]:
+        """Per row, the chart positions that come right after an aisle."""
+        return [[n for n in row.aisles_after if 0 < n < row.seats] for row in self.rows]
+
+    def check_fit(self, singers: List[Singer], part_order: List[str], layout: str) -> None:
+        """
+        Raise ValueError if the singers can't be seated here with this layout.
+
+        Rows and seats are fixed by the venue, so the message suggests another
+        layout or venue rather than more rows. Stacked layout needs a row per
+        voice part, and each part's band of rows must hold that part.
+        """
+        counts = {part: 0 for part in part_order}
+        for singer in singers:
+            if singer.voice_part in counts:
+                counts[singer.voice_part] += 1
+        total = sum(counts.values())
+        if total > self.capacity:
+            raise ValueError(f'{self.name} has {self.capacity} seats for {total} singers; '
+                             f'choose a larger venue')
+        if layout != 'stacked':
+            return
+        if len(self.rows) < len(part_order):
+            raise ValueError(f'{self.name} has {len(self.rows)} rows, too few to stack '
+                             f'{len(part_order)} voice parts; use side-by-side or another venue')
+        blocked = self.blocked_seats
+        start = 0
+        for part, band in zip(part_order, stacked_part_rows(len(self.rows), len(part_order))):
+            seats = sum(self.rows[r].seats - sum(1 for b in blocked if b[0] == r)
+                        for r in range(start, start + band))
+            if counts[part] > seats:
+                raise ValueError(f'{self.name} has {seats} seats in the {part} rows for '
+                                 f'{counts[part]} singers; use side-by-side or another venue')
+            start += band
+
+    def to_dict(self) -> dict:
+        return {
+            'name': self.name,
+            'description': self.description,
+            'rows': [
+                {key: value for key, value in vars(row).items() if value or key == 'seats'}
+                for row in self.rows
+            ]
+        }
+
+    @classmethod
+    def from_dict(cls, slug: str, data: dict) -> 'Venue':
+        rows = [VenueRow(seats=int(row['seats']),
+                         aisles_after=[int(n) for n in row.get('aisles_after', [])],
+                         blocked=[int(n) for n in row.get('blocked', [])],
+                         accessible=[int(n) for n in row.get('accessible', [])])
+                for row in data['rows']]
+        if not rows or any(row.seats < 1 for row in rows):
+            raise ValueError(f'Venue {slug} needs at least one row with seats')
+        return cls(slug=slug, name=data.get('name', slug), rows=rows,
+                   description=data.get('description', ''))
+
+
+def slugify(name: str) -> str:
+    """Turn a venue name into a file-safe slug."""
+    return re.sub(r'[^a-z0-9]+', '-', name.lower()).strip('-') or 'venue'
+
+
+class VenueLibrary:
+    """Venues stored as JSON files in a directory, indexed by slug."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._index: Optional[Dict[str, Venue]] = None
+
+    def _load(self) -> Dict[str, Venue]:
+        if self._index is None:
+            index = {}
+            if os.path.isdir(self.directory):
+                for filename in sorted(os.listdir(self.directory)):
+                    slug, ext = os.path.splitext(filename)
+                    if ext != '.json':
+                        continue
+                    with open(os.path.join(self.directory, filename), encoding='utf-8') as f:
+                        index[slug] = Venue.from_dict(slug, json.load(f))
+            self._index = index
+        return self._index
+
+    def all(self) -> List[Venue]:
+        """Every venue, sorted by name."""
+        return sorted(self._load().values(), key=lambda v: v.name.lower())
+
+    def get(self, slug: str) -> Venue:
+        venues = self._load()
+        if slug not in venues:
+            raise ValueError(f'Unknown venue: {slug}')
+        return venues[slug]
+
+    def save(self, venue: Venue) -> None:
+        """Write a venue to disk and add it to the index."""
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f'{venue.slug}.json')
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(venue.to_dict(), f, indent=4)
+            f.write('\n')
+        self._load()[venue.slug] = venue